@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Dispatch benchmark: the overhead of routing a message to its command, from the legacy locals()-based argument
+passing to the precompiled command table. Commands do nothing, so that only the dispatch is measured.
+The cost of a chatter event is measured separately, parsed by the command table or discarded by the chatter filter.
+
+Usage: python -m benchmarks.dispatch [--rounds 200000]
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+
+import argparse
+import sqlite3
+import time
+from builtins import object
+from builtins import range
+
+from bot.chatter import ChatterFilter
+from bot.dispatcher import CommandTable
+from game.game import Game
+
+CHATTER = {"type": "message", "channel": "C1", "user": "U1", "text": "did anyone look at the build? it is red again"}
+
+MESSAGES = ["!take 12", "!score week", "!scores", "!tasks 2", "!help", "hello there", "!unknown command"]
+
+
+def noop_commands():
+    """
+    :return: The commands of the game, with a no-op function each (aliases included) and their argument parser.
+    """
+
+    game = Game(None, sqlite3.connect(":memory:"))
+    functions = {}
+    commands = dict((name, (functions.setdefault(entry[0], lambda player_id, argument: (True, "")),) + entry[1:])
+                    for name, entry in game.commands_dict.items())
+    game.close()
+    return commands
+
+
+class LegacyDispatcher(object):
+    """
+    The dispatch of MessagesHandler before the command table: arguments copied from locals() into a dict.
+    """
+
+    def __init__(self, commands):
+        self.commands = commands
+
+    def on_message(self, channel, from_player_id, msg):
+        split = msg.split(None, 1)
+        if len(split) == 0:
+            return
+
+        command = split[0].lower()
+
+        if len(split) == 2:
+            argument = split[1]
+        else:
+            argument = ""
+
+        self.handle_bot_command(command, argument, channel, from_player_id)
+
+    def handle_bot_command(self, command, argument, channel, player_id):
+        args = locals()
+        del args["self"]
+        del args["command"]
+        del args["channel"]
+
+        if command not in self.commands:
+            return
+
+        command_func = self.commands[command][0]
+        command_func(**args)
+
+
+class TableDispatcher(object):
+
+    def __init__(self, commands):
+        self.table = CommandTable(commands)
+
+    def on_message(self, channel, from_player_id, msg):
+        call = self.table.parse(msg, channel, from_player_id)
+        if call is None:
+            return
+
+        call.execute()
+
+
+def measure(name, rounds, dispatcher):
+    start = time.time()
+    for index in range(rounds):
+        dispatcher.on_message("C1", "U1", MESSAGES[index % len(MESSAGES)])
+    elapsed = time.time() - start
+    print("%-32s %8.0f ns/message" % (name, elapsed * 1e9 / rounds))
+
+
+def measure_chatter(name, rounds, accepts):
+    start = time.time()
+    for _ in range(rounds):
+        accepts(CHATTER)
+    elapsed = time.time() - start
+    print("%-32s %8.0f ns/event" % (name, elapsed * 1e9 / rounds))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares the legacy dispatch with the command table.")
+    parser.add_argument("--rounds", type=int, default=200000, help="number of dispatched messages")
+    args = parser.parse_args()
+
+    commands = noop_commands()
+    measure("legacy: locals()", args.rounds, LegacyDispatcher(commands))
+    measure("command table", args.rounds, TableDispatcher(commands))
+
+    table = CommandTable(commands)
+    measure_chatter("chatter: command table", args.rounds,
+                    lambda event: table.parse(event["text"], event["channel"], event["user"]))
+    measure_chatter("chatter: chatter filter", args.rounds, ChatterFilter("UBOT").accepts)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Write throughput benchmark: one commit per statement against group commit.
+
+A burst of !add and !take commands, spread over several channels, is executed by a worker pool
+on a database file. The throughput is measured once every reply has been sent.
+
+Usage: python -m benchmarks.group_commit [--commands 2000] [--channels 8] [--workers 8] [--window 5]
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+from builtins import object
+from builtins import range
+
+from bot.workers import ChannelWorkerPool
+from game import Game
+from game.events import DEFAULT_SNAPSHOT_INTERVAL
+from gamifybot import MessagesHandler
+
+
+class BenchConf(object):
+
+    def __init__(self, db_file_name, window, pragmas=None):
+        self.db_file_name_value = db_file_name
+        self.window = window
+        self.pragmas_value = pragmas
+
+    def db_file_name(self):
+        return self.db_file_name_value
+
+    def pragmas(self):
+        if self.pragmas_value is None:
+            return {}
+        return self.pragmas_value
+
+    def group_commit_window_ms(self):
+        return self.window
+
+    @staticmethod
+    def group_commit_max_batch():
+        return 64
+
+    @staticmethod
+    def db_readers():
+        return 0
+
+    @staticmethod
+    def player_cache_size():
+        return 0
+
+    @staticmethod
+    def shared_database():
+        return False
+
+    @staticmethod
+    def snapshot_interval():
+        return DEFAULT_SNAPSHOT_INTERVAL
+
+    @staticmethod
+    def slow_query_ms():
+        return None
+
+    @staticmethod
+    def admin_list():
+        return []
+
+    @staticmethod
+    def max_task_points():
+        return 42
+
+
+class CountingClient(object):
+
+    def __init__(self, expected):
+        self.lock = threading.Lock()
+        self.replies = 0
+        self.expected = expected
+        self.done = threading.Event()
+
+    def rtm_send_message(self, channel, out):
+        with self.lock:
+            self.replies += 1
+            if self.replies == self.expected:
+                self.done.set()
+
+
+def run(commands, channels, workers, window):
+    directory = tempfile.mkdtemp()
+    try:
+        game = Game(BenchConf(os.path.join(directory, "bench.db"), window))
+        client = CountingClient(commands + channels)
+        handler = MessagesHandler(client, game, ChannelWorkerPool(workers=workers, queue_depth=commands))
+
+        for channel in range(channels):
+            handler.on_message("C" + str(channel), "U" + str(channel), "!join user" + str(channel))
+
+        start = time.time()
+        for index in range(commands):
+            channel = index % channels
+            if index // channels % 2 == 0:
+                msg = "!add 1 Task " + str(index)
+            else:
+                msg = "!take " + str(index - channels + 1)
+            handler.on_message("C" + str(channel), "U" + str(channel), msg)
+
+        client.done.wait()
+        elapsed = time.time() - start
+        handler.close()
+        game.close()
+        return elapsed
+    finally:
+        shutil.rmtree(directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares the write throughput with and without group commit.")
+    parser.add_argument("--commands", type=int, default=2000, help="number of commands in the burst")
+    parser.add_argument("--channels", type=int, default=8, help="number of channels")
+    parser.add_argument("--workers", type=int, default=8, help="number of workers")
+    parser.add_argument("--window", type=float, default=5, help="group commit window (ms)")
+    args = parser.parse_args()
+
+    for name, window in [("per-statement", None), ("group", args.window)]:
+        elapsed = run(args.commands, args.channels, args.workers, window)
+        print("%-14s commands=%d elapsed=%.2fs throughput=%.0f commands/s" % (
+            name, args.commands, elapsed, args.commands / elapsed))
+
+
+if __name__ == "__main__":
+    main()
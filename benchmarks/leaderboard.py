@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Leaderboard benchmark: the two paths serving a page of !score.
+- snapshot: PlayerScores on a read-only connection, the path taken with db.readers > 0 (the shipped configuration)
+- leaderboard: the in-memory leaderboard of PlayerRepository, the path taken with db.readers: 0
+
+Usage: python -m benchmarks.leaderboard [--players 10000] [--rounds 200] [--page 1]
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from builtins import range
+
+from game.buckets import ScoreBuckets
+from game.connections import ConnectionManager
+from game.game import PAGE_SIZE, MEDALS_COUNT
+from game.player import PlayerRepository, Player
+from game.task import TaskRepository
+
+
+def read_page(players, page):
+    """
+    The reads of Game.render_high_scores.
+    """
+
+    offset = (page - 1) * PAGE_SIZE
+    players.count()
+    scores = players.scores(PAGE_SIZE, offset)
+    if offset > 0:
+        players.place_of(scores[0].points, MEDALS_COUNT + 1)
+
+
+def read_snapshot_page(manager, page):
+    with manager.snapshot() as snapshot:
+        read_page(snapshot.players, page)
+
+
+def measure(name, rounds, func):
+    start = time.time()
+    for _ in range(rounds):
+        func()
+    elapsed = time.time() - start
+    print("%-32s %8.3f ms/op" % (name, elapsed * 1000 / rounds))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares the snapshot and in-memory paths of !score.")
+    parser.add_argument("--players", type=int, default=10000, help="number of players")
+    parser.add_argument("--rounds", type=int, default=200, help="number of measured operations")
+    parser.add_argument("--page", type=int, default=1, help="page of scores read")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    manager = ConnectionManager(os.path.join(directory, "leaderboard.db"), readers=2)
+    try:
+        # Read-only connections cannot create the tables they read
+        TaskRepository(manager.writer)
+        ScoreBuckets(manager.writer)
+        players = PlayerRepository(manager.writer)
+        for index in range(args.players):
+            players.add(Player("U" + str(index), "user" + str(index), random.randint(0, 1000)))
+
+        measure("snapshot: page %d" % args.page, args.rounds, lambda: read_snapshot_page(manager, args.page))
+
+        start = time.time()
+        players.scores(1)
+        print("%-32s %8.3f ms" % ("leaderboard: initial load", (time.time() - start) * 1000))
+
+        measure("leaderboard: page %d" % args.page, args.rounds, lambda: read_page(players, args.page))
+        measure("leaderboard: update_points", args.rounds,
+                lambda: players.update_points("U" + str(random.randrange(args.players)), random.randint(-10, 10)))
+    finally:
+        manager.close()
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
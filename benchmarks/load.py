@@ -0,0 +1,306 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Synthetic load benchmark: a stream of Slack message events fed to MessagesHandler.on_message.
+
+Every player joins, a backlog of tasks is added, then a mix of !join, !add, !take, !roulette, !drop, !tasks and
+!score commands is played, new players registering during the mix. The stream follows the state of the game,
+so that the commands succeed as they would with real players: tasks are taken and rouletted while unassigned,
+and dropped by their assignee.
+
+The throughput and the p50/p95/p99 latencies of each command are printed, and appended as a JSON line to
+the results file along with the commit and the parameters, so that runs can be compared between commits.
+
+Usage: python -m benchmarks.load [--profile small|medium|large] [--players N] [--tasks N] [--commands 10000]
+                                 [--backend sqlite-memory|sqlite-file|memory] [--output FILE]
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import time
+from builtins import object
+from builtins import range
+
+from benchmarks.group_commit import BenchConf
+from benchmarks.rtm_latency import percentile
+from game import Game
+from game.game import PAGE_SIZE
+from game.memory import MemoryStorage
+from gamifybot import MessagesHandler, dispatch_event
+
+# (players, initial tasks) of each profile
+PROFILES = {
+    "small": (10, 100),
+    "medium": (1000, 10000),
+    "large": (10000, 100000)
+}
+
+# Share of each command in the mix played after the setup
+MIX = (("!join", 0.05), ("!add", 0.15), ("!take", 0.25), ("!roulette", 0.10), ("!drop", 0.10), ("!tasks", 0.18),
+       ("!score", 0.17))
+
+# Results are kept next to the benchmark, and ignored by git
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "load-results.jsonl")
+
+BACKENDS = ("sqlite-memory", "sqlite-file", "memory")
+
+
+class DiscardingClient(object):
+
+    def rtm_send_message(self, channel, out):
+        pass
+
+
+class EventStream(object):
+    """
+    Generates the events of the benchmark, and keeps track of the tasks they should assign.
+    """
+
+    def __init__(self, players, seed=42):
+        self.rng = random.Random(seed)
+        self.players = players
+        self.tasks = 0
+        self.unassigned = []  # Ids of unassigned tasks, in no particular order
+        self.assigned = {}  # task_id -> player_id
+        self.assigned_ids = []
+
+    @staticmethod
+    def event(player_id, text):
+        return {"type": "message", "channel": "C" + player_id, "user": player_id, "text": text}
+
+    def player(self):
+        return "U" + str(self.rng.randrange(self.players))
+
+    def joins(self):
+        return [self.event("U" + str(index), "!join user" + str(index)) for index in range(self.players)]
+
+    def join(self):
+        # A new player, who can be drawn by the following commands
+        player_id = str(self.players)
+        self.players += 1
+        return self.event("U" + player_id, "!join user" + player_id)
+
+    def add(self):
+        self.tasks += 1
+        self.unassigned.append(self.tasks)
+        return self.event(self.player(), "!add " + str(self.rng.randint(1, 10)) + " Task " + str(self.tasks))
+
+    def pop_unassigned(self):
+        index = self.rng.randrange(len(self.unassigned))
+        self.unassigned[index], self.unassigned[-1] = self.unassigned[-1], self.unassigned[index]
+        return self.unassigned.pop()
+
+    def assign(self, task_id, player_id):
+        self.assigned[task_id] = player_id
+        self.assigned_ids.append(task_id)
+
+    def take(self):
+        task_id = self.pop_unassigned()
+        player_id = self.player()
+        self.assign(task_id, player_id)
+        return self.event(player_id, "!take " + str(task_id))
+
+    def roulette(self):
+        # The assignee is drawn by the game, the stream only knows that the task is not available anymore
+        task_id = self.pop_unassigned()
+        return self.event(self.player(), "!roulette " + str(task_id))
+
+    def drop(self):
+        index = self.rng.randrange(len(self.assigned_ids))
+        self.assigned_ids[index], self.assigned_ids[-1] = self.assigned_ids[-1], self.assigned_ids[index]
+        task_id = self.assigned_ids.pop()
+        player_id = self.assigned.pop(task_id)
+        self.unassigned.append(task_id)
+        return self.event(player_id, "!drop " + str(task_id))
+
+    def read(self, command):
+        # Tasks stay pending once assigned, as there is no !close in the mix
+        listed = self.players if command == "!score" else self.tasks
+        page = self.rng.randint(1, max(1, min(3, (listed + PAGE_SIZE - 1) // PAGE_SIZE)))
+        if page == 1:
+            return self.event(self.player(), command)
+        return self.event(self.player(), command + " " + str(page))
+
+    def next_event(self):
+        draw = self.rng.random()
+        for command, share in MIX:
+            if draw < share:
+                break
+            draw -= share
+
+        if command in ("!take", "!roulette") and len(self.unassigned) == 0:
+            command = "!add"
+        if command == "!drop" and len(self.assigned_ids) == 0:
+            command = "!take" if len(self.unassigned) > 0 else "!add"
+
+        if command == "!join":
+            return self.join()
+        if command == "!add":
+            return self.add()
+        if command == "!take":
+            return self.take()
+        if command == "!roulette":
+            return self.roulette()
+        if command == "!drop":
+            return self.drop()
+        return self.read(command)
+
+
+def create_game(backend, directory):
+    if backend == "sqlite-file":
+        return Game(BenchConf(os.path.join(directory, "load.db"), None))
+    if backend == "memory":
+        return Game(BenchConf(None, None), storage=MemoryStorage())
+    return Game(BenchConf(None, None), sqlite3.connect(":memory:"))
+
+
+def play(handler, events, latencies):
+    """
+    Feeds the events to the handler, commands are executed inline.
+
+    :param latencies: A dict command -> list of latencies in seconds, updated in place.
+    :return: The elapsed time in seconds.
+    """
+
+    start = time.time()
+    for event in events:
+        command = event["text"].split(None, 1)[0]
+        before = time.time()
+        dispatch_event(handler, event)
+        latencies.setdefault(command, []).append(time.time() - before)
+
+    return time.time() - start
+
+
+def summarize(latencies):
+    """
+    :return: A dict command -> statistics, the throughput being the commands per second of handling time.
+    """
+
+    summary = {}
+    for command, values in latencies.items():
+        total = sum(values)
+        summary[command] = {
+            "count": len(values),
+            "throughput": len(values) / total if total > 0 else 0.0,
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000
+        }
+
+    return summary
+
+
+def current_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.STDOUT).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def previous_result(output, parameters):
+    """
+    :return: The last result saved in the output file with the same parameters, None if there is none.
+    """
+
+    if not os.path.exists(output):
+        return None
+
+    previous = None
+    with open(output) as results:
+        for line in results:
+            result = json.loads(line)
+            if result.get("parameters") == parameters:
+                previous = result
+
+    return previous
+
+
+def report(result, previous):
+    print("%-12s %8s %10s %9s %9s %9s %s" % ("command", "count", "ops/s", "p50 ms", "p95 ms", "p99 ms",
+                                             "p99 vs previous" if previous is not None else ""))
+    for command in sorted(result["commands"]):
+        stats = result["commands"][command]
+        delta = ""
+        if previous is not None and command in previous["commands"]:
+            before = previous["commands"][command]["p99_ms"]
+            if before > 0:
+                delta = "%+.0f%%" % ((stats["p99_ms"] - before) * 100 / before)
+
+        print("%-12s %8d %10.0f %9.2f %9.2f %9.2f %s" % (command, stats["count"], stats["throughput"],
+                                                          stats["p50_ms"], stats["p95_ms"], stats["p99_ms"], delta))
+
+    print("setup %.2fs, mix %d commands in %.2fs: %.0f commands/s" % (
+        result["setup_s"], result["mix_commands"], result["mix_s"], result["mix_commands"] / result["mix_s"]))
+    if previous is not None:
+        print("compared with commit %s of %s" % (previous.get("commit"), previous.get("date")))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plays a synthetic stream of Slack events through the handler.")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="small",
+                        help="number of players and initial tasks: small (10, 100), medium (1k, 10k), "
+                             "large (10k, 100k)")
+    parser.add_argument("--players", type=int, help="number of players, overrides the profile")
+    parser.add_argument("--tasks", type=int, help="number of tasks added before the mix, overrides the profile")
+    parser.add_argument("--commands", type=int, default=10000, help="number of commands of the mix")
+    parser.add_argument("--backend", choices=BACKENDS, default="sqlite-memory", help="storage backend")
+    parser.add_argument("--seed", type=int, default=42, help="seed of the event stream")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="file the results are appended to")
+    args = parser.parse_args()
+
+    (players, tasks) = PROFILES[args.profile]
+    if args.players is not None:
+        players = args.players
+    if args.tasks is not None:
+        tasks = args.tasks
+
+    parameters = {"players": players, "tasks": tasks, "commands": args.commands, "backend": args.backend,
+                  "seed": args.seed}
+    stream = EventStream(players, args.seed)
+    setup = stream.joins() + [stream.add() for _ in range(tasks)]
+    mix = [stream.next_event() for _ in range(args.commands)]
+
+    directory = tempfile.mkdtemp()
+    try:
+        handler = MessagesHandler(DiscardingClient(), create_game(args.backend, directory))
+        latencies = {}
+        setup_elapsed = play(handler, setup, latencies)
+        # The setup only fills the game, the latencies of its commands are not reported
+        latencies = {}
+        mix_elapsed = play(handler, mix, latencies)
+        handler.close()
+        handler.game.close()
+    finally:
+        shutil.rmtree(directory)
+
+    result = {
+        "commit": current_commit(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "parameters": parameters,
+        "setup_s": setup_elapsed,
+        "mix_commands": len(mix),
+        "mix_s": mix_elapsed,
+        "commands": summarize(latencies)
+    }
+
+    previous = previous_result(args.output, parameters)
+    report(result, previous)
+
+    with open(args.output, "a") as results:
+        results.write(json.dumps(result, sort_keys=True) + "\n")
+    print("results appended to " + args.output)
+
+
+if __name__ == "__main__":
+    main()
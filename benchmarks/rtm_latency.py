@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Reply latency benchmark: the legacy sleep-based RTM polling loop against the asyncio runtime.
+
+Events are pushed by a producer thread at random intervals into a fake RTM client,
+and forwarded to a MessagesHandler backed by an in-memory game.
+The latency of an event is measured from its emission to the end of the send of its reply,
+sent by the outbound queue of the bot in the asyncio runtime.
+Like slackclient, the fake client only returns one event per rtm_read call.
+
+Usage: python -m benchmarks.rtm_latency [--events 30] [--interval 0.5] [--delay 1.0] [--send-time 0.005]
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+
+import argparse
+import random
+import socket
+import sqlite3
+import threading
+import time
+from builtins import object
+from builtins import range
+
+from bot.outbound import OutboundQueue
+from bot.runtime import RtmRuntime
+from game import Game
+from gamifybot import MessagesHandler, dispatch_event
+
+
+class FakeWebsocket(object):
+
+    def __init__(self, sock):
+        self.sock = sock
+
+
+class FakeServer(object):
+
+    def __init__(self, sock):
+        self.websocket = FakeWebsocket(sock)
+
+
+class FakeRtmClient(object):
+    """
+    Mimics slackclient's RTM API: rtm_read returns one pending event at most,
+    and a byte written on a socket pair signals each event to the selector.
+    """
+
+    def __init__(self, send_time):
+        self.reader, self.writer = socket.socketpair()
+        self.reader.setblocking(False)
+        self.server = FakeServer(self.reader)
+        self.send_time = send_time
+        self.lock = threading.Lock()
+        self.events = []
+        self.emitted = {}
+        self.latencies = []
+        self.done = threading.Event()
+        self.expected = 0
+
+    def push(self, event):
+        with self.lock:
+            self.emitted[event["channel"]] = time.time()
+            self.events.append(event)
+        self.writer.send(b"x")
+
+    def rtm_read(self):
+        try:
+            self.reader.recv(1)
+        except socket.error:
+            pass
+
+        with self.lock:
+            if len(self.events) == 0:
+                return []
+            return [self.events.pop(0)]
+
+    def rtm_send_message(self, channel, out):
+        time.sleep(self.send_time)
+        with self.lock:
+            self.latencies.append(time.time() - self.emitted[channel])
+            if len(self.latencies) == self.expected:
+                self.done.set()
+
+    def close(self):
+        self.reader.close()
+        self.writer.close()
+
+
+def produce(client, events, interval):
+    client.expected = events
+    for index in range(events):
+        time.sleep(random.expovariate(1.0 / interval))
+        client.push({"type": "message", "channel": "C" + str(index), "user": "U1", "text": "!tasks"})
+
+
+def run_polling_loop(client, events, interval, delay):
+    handler = MessagesHandler(client, Game(None, sqlite3.connect(":memory:")))
+    producer = threading.Thread(target=produce, args=(client, events, interval))
+    producer.start()
+
+    while not client.done.is_set():
+        for event in client.rtm_read():
+            dispatch_event(handler, event)
+
+        time.sleep(delay)
+
+    producer.join()
+
+
+def stop_when_done(client, runtime):
+    client.done.wait()
+    runtime.stop()
+
+
+def run_asyncio_runtime(client, events, interval):
+    sender = OutboundQueue(client)
+    handler = MessagesHandler(sender, Game(None, sqlite3.connect(":memory:")))
+    runtime = RtmRuntime(client, lambda event: dispatch_event(handler, event))
+
+    producer = threading.Thread(target=produce, args=(client, events, interval))
+    producer.start()
+    threading.Thread(target=stop_when_done, args=(client, runtime)).start()
+
+    runtime.run_forever()
+    runtime.close()
+    sender.close()
+    producer.join()
+
+
+def percentile(values, ratio):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * ratio), len(ordered) - 1)]
+
+
+def report(name, latencies):
+    print("%-10s events=%d p50=%.1fms p95=%.1fms p99=%.1fms max=%.1fms" % (
+        name, len(latencies),
+        percentile(latencies, 0.50) * 1000, percentile(latencies, 0.95) * 1000,
+        percentile(latencies, 0.99) * 1000, max(latencies) * 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares the reply latency of the RTM reading loops.")
+    parser.add_argument("--events", type=int, default=30, help="number of events to emit")
+    parser.add_argument("--interval", type=float, default=0.5, help="mean interval between events (s)")
+    parser.add_argument("--delay", type=float, default=1.0, help="delay of the polling loop (s)")
+    parser.add_argument("--send-time", type=float, default=0.005, help="simulated Slack send time (s)")
+    args = parser.parse_args()
+
+    client = FakeRtmClient(args.send_time)
+    run_polling_loop(client, args.events, args.interval, args.delay)
+    client.close()
+    report("polling", client.latencies)
+
+    client = FakeRtmClient(args.send_time)
+    run_asyncio_runtime(client, args.events, args.interval)
+    client.close()
+    report("asyncio", client.latencies)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Write latency benchmark: SQLite defaults against the tuning profile of bot-config.yml.
+
+Commands are executed one after the other on a database file, each of them committing its writes,
+so the latency is dominated by the journal and the fsync calls.
+
+Usage: python -m benchmarks.sqlite_pragmas [--commands 500]
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from builtins import range
+
+from benchmarks.group_commit import BenchConf
+from game import Game
+
+PRODUCTION_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -65536,
+    "mmap_size": 268435456,
+    "temp_store": "MEMORY"
+}
+
+
+def percentile(sorted_values, ratio):
+    return sorted_values[min(int(len(sorted_values) * ratio), len(sorted_values) - 1)]
+
+
+def run(commands, pragmas):
+    directory = tempfile.mkdtemp()
+    try:
+        game = Game(BenchConf(os.path.join(directory, "bench.db"), None, pragmas))
+        game.join("U1", "user1")
+
+        latencies = []
+        for index in range(commands):
+            start = time.time()
+            if index % 2 == 0:
+                game.add_task("U1", "1 Task " + str(index))
+            else:
+                game.take_task("U1", str(index))
+            latencies.append(time.time() - start)
+
+        game.close()
+        return sorted(latencies)
+    finally:
+        shutil.rmtree(directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares the write latency with and without the SQLite tuning.")
+    parser.add_argument("--commands", type=int, default=500, help="number of commands")
+    args = parser.parse_args()
+
+    for name, pragmas in [("defaults", None), ("production", PRODUCTION_PRAGMAS)]:
+        latencies = run(args.commands, pragmas)
+        print("%-10s commands=%d mean=%.3fms p50=%.3fms p99=%.3fms" % (
+            name, args.commands, 1000 * sum(latencies) / len(latencies),
+            1000 * percentile(latencies, 0.5), 1000 * percentile(latencies, 0.99)))
+
+
+if __name__ == "__main__":
+    main()
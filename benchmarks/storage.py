@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Storage backends benchmark: the same workload of commands against each backend.
+
+Players join, then add, take, drop and list tasks, and print the high scores.
+The SQLite backend runs on a database file and on an in-memory database.
+
+Usage: python -m benchmarks.storage [--players 200] [--commands 5000]
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from builtins import range
+
+from benchmarks.group_commit import BenchConf
+from game import Game
+from game.memory import MemoryStorage
+
+
+def workload(players, commands, seed=42):
+    """
+    :return: A list of tuples (command, player_id, argument), the same for every backend.
+    """
+
+    rng = random.Random(seed)
+    steps = [("!join", "U" + str(index), "user" + str(index)) for index in range(players)]
+
+    tasks = 0
+    for index in range(commands):
+        player_id = "U" + str(rng.randrange(players))
+        draw = rng.random()
+        if tasks == 0 or draw < 0.3:
+            steps.append(("!add", player_id, str(rng.randint(1, 10)) + " Task " + str(index)))
+            tasks += 1
+        elif draw < 0.6:
+            steps.append(("!take", player_id, str(rng.randint(1, tasks))))
+        elif draw < 0.7:
+            steps.append(("!drop", player_id, str(rng.randint(1, tasks))))
+        elif draw < 0.85:
+            steps.append(("!tasks", player_id, str(rng.randint(1, 3))))
+        else:
+            steps.append(("!score", player_id, ""))
+
+    return steps
+
+
+def run(game, steps):
+    commands = game.commands_dict
+    start = time.time()
+    for command, player_id, argument in steps:
+        function = commands[command][0]
+        function(player_id, argument)
+        # Read-only commands would be served from the render cache otherwise
+        game.renders.invalidate()
+
+    elapsed = time.time() - start
+    game.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs the same workload against each storage backend.")
+    parser.add_argument("--players", type=int, default=200, help="number of players")
+    parser.add_argument("--commands", type=int, default=5000, help="number of commands after the joins")
+    args = parser.parse_args()
+
+    steps = workload(args.players, args.commands)
+    directory = tempfile.mkdtemp()
+    try:
+        backends = [
+            ("sqlite-file", lambda: Game(BenchConf(os.path.join(directory, "bench.db"), None))),
+            ("sqlite-memory", lambda: Game(BenchConf(None, None), sqlite3.connect(":memory:"))),
+            ("memory", lambda: Game(BenchConf(None, None), storage=MemoryStorage()))
+        ]
+
+        for name, create_game in backends:
+            elapsed = run(create_game(), steps)
+            print("%-14s commands=%d elapsed=%.2fs throughput=%.0f commands/s" % (
+                name, len(steps), elapsed, len(steps) / elapsed))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+from __future__ import absolute_import
+from .runtime import RtmRuntime
+from .workers import ChannelWorkerPool, QueueMetrics
+from .scheduler import AssignmentScheduler
+from .metrics import CommandMetrics, MetricsServer
+from .dispatcher import Command, CommandCall, CommandTable
+from .chatter import ChatterFilter
+from .outbound import OutboundQueue
+from .events_api import EventsApiServer, WebApiSender
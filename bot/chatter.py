@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Pre-filter of the Slack events, discarding the ones that cannot be commands before they are parsed:
+most messages of a busy channel are conversation, they should cost a couple of dict lookups at most.
+"""
+from __future__ import absolute_import
+
+from builtins import object
+
+COMMAND_PREFIX = "!"
+
+
+class ChatterFilter(object):
+    """
+    Accepts the messages that may be commands: posted by a user other than the bot itself, neither edited
+    nor carrying any other subtype, and starting with the command prefix.
+
+    The skipped attribute counts the discarded events, it is only incremented by the thread reading the events.
+    """
+
+    def __init__(self, bot_id=None, prefix=COMMAND_PREFIX):
+        """
+        :param bot_id: User id of the bot, its own messages are discarded. None if unknown.
+        """
+
+        self.bot_id = bot_id
+        self.prefix = prefix
+        self.skipped = 0
+
+    def accepts(self, event):
+        """
+        The checks are ordered from the most selective for chatter, so that most events only go through the first one.
+
+        :param event: An event received from Slack.
+        :return: True if the event is a message which may be a command.
+        """
+
+        text = event.get("text")
+        if (text is None or not text.startswith(self.prefix) or
+                event.get("type") != "message" or
+                "subtype" in event or
+                "channel" not in event):
+            self.skipped += 1
+            return False
+
+        user = event.get("user")
+        if user is None or user == self.bot_id:
+            self.skipped += 1
+            return False
+
+        return True
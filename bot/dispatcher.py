@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Dispatch table of the commands, compiled once from the commands of the game:
+- Names sharing a function are aliases of the first one, for instance !scores for !score
+- An unambiguous prefix of a name stands for its command, for instance !sco for !score,
+  except for the commands which cannot be undone: they are only matched by their full name
+- A message is parsed once into a CommandCall, which carries everything needed to execute it,
+  including the argument typed by the parser of its command, see game/arguments.py
+"""
+from __future__ import absolute_import
+
+import collections
+from builtins import object
+from builtins import range
+
+MIN_PREFIX_LENGTH = 3  # Prefixes are at least "!" and two letters long
+
+ADMIN_MARKER = ":"  # Admin commands, such as !admin:reset, are only matched by their full name
+
+EXACT_NAMES = ("!leave", "!close", "!drop")  # Commands which cannot be undone, only matched by their full name
+
+
+class Command(object):
+
+    __slots__ = ("name", "function", "description", "aliases", "prefixable", "parser")
+
+    def __init__(self, name, function, description, prefixable=True, parser=None):
+        """
+        :param prefixable: False if the command is only matched by its full name or an alias.
+        :param parser: Function parsing the argument string into the typed argument of the function,
+        None if the function is given the string.
+        """
+
+        self.name = name
+        self.function = function
+        self.description = description
+        self.aliases = []
+        self.prefixable = prefixable
+        self.parser = parser
+
+    def argument_from(self, argument):
+        """
+        :param argument: Argument string of a message.
+        :return: The argument of the function.
+        """
+
+        if self.parser is None:
+            return argument
+
+        return self.parser(argument)
+
+
+class CommandCall(object):
+    """
+    A message parsed into the command it invokes, and the argument of its function.
+    """
+
+    __slots__ = ("command", "player_id", "argument", "channel")
+
+    def __init__(self, command, player_id, argument, channel):
+        self.command = command
+        self.player_id = player_id
+        self.argument = argument
+        self.channel = channel
+
+    def execute(self):
+        """
+        :return: A tuple, (success:boolean, msg:string)
+        """
+
+        return self.command.function(self.player_id, self.argument)
+
+
+class CommandTable(object):
+
+    def __init__(self, commands, min_prefix_length=MIN_PREFIX_LENGTH, exact_names=EXACT_NAMES):
+        """
+        :param commands: An ordered dict of names and their (function, description[, parser]), see Game.commands().
+        :param min_prefix_length: Shortest prefix standing for a command, "!" included.
+        :param exact_names: Names of the commands which are not prefixable, admin commands being never.
+        """
+
+        self.commands = collections.OrderedDict()  # Name -> Command, aliases excluded
+        names = {}  # Name or alias -> Command
+        by_function = {}
+        for name, entry in commands.items():
+            function = entry[0]
+            command = by_function.get(function)
+            if command is None:
+                prefixable = ADMIN_MARKER not in name and name not in exact_names
+                parser = entry[2] if len(entry) > 2 else None
+                command = by_function[function] = self.commands[name] = Command(name, function, entry[1],
+                                                                                 prefixable, parser)
+            else:
+                command.aliases.append(name)
+            names[name] = command
+
+        # Names and prefixes are resolved by a single lookup
+        self.lookup = self.compile_prefixes(names, min_prefix_length)
+        self.lookup.update(names)
+
+    @staticmethod
+    def compile_prefixes(names, min_prefix_length):
+        """
+        :return: A dict of the prefixes that stand for a single prefixable command.
+        """
+
+        prefixes = {}
+        for name, command in names.items():
+            for end in range(min_prefix_length, len(name)):
+                prefix = name[:end]
+                if not command.prefixable:
+                    # Not resolved to another command either, it could be a mistyped name of this one
+                    prefixes[prefix] = None
+                elif prefixes.get(prefix, command) is not command:
+                    prefixes[prefix] = None  # Ambiguous
+                else:
+                    prefixes[prefix] = command
+
+        return dict((prefix, command) for prefix, command in prefixes.items() if command is not None)
+
+    def resolve(self, word):
+        """
+        :param word: A command name, alias or prefix, in lower case.
+        :return: The Command, None if the word does not designate a single one.
+        """
+
+        return self.lookup.get(word)
+
+    def parse(self, msg, channel, player_id):
+        """
+        :param msg: Received message contents.
+        :return: A CommandCall, None if the message is not a command.
+        """
+
+        split = msg.split(None, 1)
+        if len(split) == 0:
+            return None
+
+        command = self.lookup.get(split[0].lower())
+        if command is None:
+            return None
+
+        if len(split) == 2:
+            return CommandCall(command, player_id, command.argument_from(split[1]), channel)
+        return CommandCall(command, player_id, command.argument_from(""), channel)
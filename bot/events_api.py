@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Ingestion of the Slack Events API callbacks, an alternative to the RTM websocket:
+- A local HTTP server acknowledges each callback as soon as it is verified and queued
+- A single thread passes the queued events to the dispatch function, in the order they were received
+- Replies are posted with the Web API, the RTM API not being connected in this mode
+
+The HTTP side being stateless, bot processes can be put behind a reverse proxy or a load balancer,
+provided that they share their database with db.shared set to true (see SqliteStorage).
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+
+import collections
+import hashlib
+import hmac
+import json
+import threading
+import time
+import traceback
+from builtins import object
+from builtins import str
+from http.server import BaseHTTPRequestHandler
+from queue import Queue, Full
+
+from bot.metrics import ThreadingHTTPServer
+
+SIGNATURE_VERSION = "v0"
+
+MAX_REQUEST_AGE = 300  # Seconds, older callbacks are rejected to prevent replays
+
+DEFAULT_QUEUE_DEPTH = 1000  # Callbacks are answered with a 503 when that many events are waiting
+
+RECENT_EVENTS = 1000  # Number of event ids remembered to discard the callbacks retried by Slack
+
+
+def signature(secret, timestamp, body):
+    """
+    :param body: The raw request body, in bytes.
+    :return: The X-Slack-Signature of a request signed with the signing secret of the Slack app.
+    """
+
+    base = (SIGNATURE_VERSION + ":" + timestamp + ":").encode("utf-8") + body
+    return SIGNATURE_VERSION + "=" + hmac.new(secret.encode("utf-8"), base, hashlib.sha256).hexdigest()
+
+
+class WebApiSender(object):
+    """
+    Slack client proxy posting the replies with chat.postMessage.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def rtm_send_message(self, channel, out):
+        response = self.client.api_call("chat.postMessage", channel=channel, text=out)
+        if not response.get("ok", False):
+            raise IOError("chat.postMessage failed: " + str(response.get("error")))
+
+
+class EventsApiServer(object):
+    """
+    Receives the Slack Events API callbacks on http://host:port/, and dispatches their events from a worker thread.
+    """
+
+    def __init__(self, dispatch, port, host="127.0.0.1", signing_secret=None, queue_depth=DEFAULT_QUEUE_DEPTH):
+        """
+        :param dispatch: Function called with each event, for instance a message event.
+        :param port: TCP port, 0 to let the system pick a free one (see the port attribute).
+        :param signing_secret: Signing secret of the Slack app, requests are not verified when None.
+        :param queue_depth: Maximum number of events waiting to be dispatched.
+        """
+
+        self.dispatch = dispatch
+        self.signing_secret = signing_secret
+        self.queue = Queue(queue_depth)
+        self.lock = threading.Lock()
+        self.recent = collections.OrderedDict()  # Ids of the last queued events
+        self.server = ThreadingHTTPServer((host, port), self.request_handler())
+        self.port = self.server.server_address[1]
+        self.thread = None
+        self.worker = None
+
+    def request_handler(self):
+        events_server = self
+
+        class EventsRequestHandler(BaseHTTPRequestHandler):
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                (status, out) = events_server.receive(self.headers, body)
+
+                out = out.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "text/plain; charset=utf-8")
+                self.send_header("Content-Length", str(len(out)))
+                self.end_headers()
+                self.wfile.write(out)
+
+            def log_message(self, format, *args):
+                pass  # One line per Slack event would flood the console
+
+        return EventsRequestHandler
+
+    def receive(self, headers, body):
+        """
+        :param headers: HTTP headers of the callback.
+        :param body: Raw body of the callback.
+        :return: A tuple, (HTTP status:int, response body:string)
+        """
+
+        if self.signing_secret is not None and not self.verified(headers, body):
+            return 401, "Invalid signature"
+
+        try:
+            payload = json.loads(body.decode("utf-8"))
+        except ValueError:
+            return 400, "Invalid JSON"
+
+        if payload.get("type") == "url_verification":
+            return 200, payload.get("challenge", "")
+
+        event = payload.get("event")
+        if payload.get("type") != "event_callback" or not isinstance(event, dict):
+            return 200, ""  # Acknowledged, nothing to dispatch
+
+        if self.is_duplicate(payload.get("event_id")):
+            return 200, ""
+
+        try:
+            self.queue.put_nowait(event)
+        except Full:
+            self.forget(payload.get("event_id"))
+            return 503, "Too many pending events"  # Slack retries the callback later
+        return 200, ""
+
+    def verified(self, headers, body, now=None):
+        timestamp = headers.get("X-Slack-Request-Timestamp")
+        received = headers.get("X-Slack-Signature")
+        if timestamp is None or received is None:
+            return False
+
+        if now is None:
+            now = time.time()
+        try:
+            if abs(now - int(timestamp)) > MAX_REQUEST_AGE:
+                return False
+        except ValueError:
+            return False
+
+        return hmac.compare_digest(signature(self.signing_secret, timestamp, body), received)
+
+    def is_duplicate(self, event_id):
+        """
+        Remembers an event id: Slack retries the callbacks which it considers failed, for instance too slow.
+
+        :return: True if the event was already received.
+        """
+
+        if event_id is None:
+            return False
+
+        with self.lock:
+            if event_id in self.recent:
+                return True
+
+            self.recent[event_id] = True
+            if len(self.recent) > RECENT_EVENTS:
+                self.recent.popitem(last=False)
+            return False
+
+    def forget(self, event_id):
+        with self.lock:
+            self.recent.pop(event_id, None)
+
+    def work(self):
+        while True:
+            event = self.queue.get()
+            if event is None:
+                return
+
+            # noinspection PyBroadException
+            try:
+                self.dispatch(event)
+            except Exception:
+                print("Exception occurred while dispatching event: " + repr(event))
+                traceback.print_exc()
+
+    def start_worker(self):
+        self.worker = threading.Thread(target=self.work, name="events-worker")
+        self.worker.daemon = True
+        self.worker.start()
+
+    def start(self):
+        """
+        Serves the callbacks from a daemon thread.
+        """
+
+        self.start_worker()
+        self.thread = threading.Thread(target=self.server.serve_forever, name="events-server")
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def run_forever(self):
+        """
+        Serves the callbacks from the calling thread, until it is interrupted.
+        """
+
+        self.start_worker()
+        try:
+            self.server.serve_forever()
+        finally:
+            self.stop()
+
+    def stop(self):
+        """
+        Stops receiving callbacks, and waits for the queued events to be dispatched.
+        """
+
+        if self.thread is not None:
+            self.server.shutdown()
+            self.thread.join()
+            self.thread = None
+        self.server.server_close()
+
+        if self.worker is not None:
+            self.queue.put(None)
+            self.worker.join()
+            self.worker = None
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Size limits of the messages sent to Slack.
+"""
+from __future__ import absolute_import
+
+MAX_MESSAGE_SIZE = 4000  # Slack truncates longer messages, and rejects RTM messages over 16 kB
+
+
+def split_message(text, max_size=MAX_MESSAGE_SIZE):
+    """
+    Splits a message in chunks that fit in a Slack message, preferably on line breaks.
+
+    :param text: The message to split.
+    :param max_size: Maximum size of a chunk.
+    :return: A generator of chunks, which concatenation is the message.
+    """
+
+    if len(text) <= max_size:
+        yield text
+        return
+
+    chunk = []
+    size = 0
+    for line in text.splitlines(True):
+        if size + len(line) > max_size and size > 0:
+            yield "".join(chunk)
+            chunk = []
+            size = 0
+
+        while len(line) > max_size:  # A single line too long for a message
+            yield line[:max_size]
+            line = line[max_size:]
+
+        chunk.append(line)
+        size += len(line)
+
+    if size > 0:
+        yield "".join(chunk)
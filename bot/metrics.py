@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Per-command metrics of the bot, exposed in the Prometheus text format:
+- Counters of the handled commands, by command and result
+- Latency histograms, by command and phase: parse, queue (waiting for a worker), lock (waiting for the game lock),
+  game, db and send (handing the reply over to the client)
+- Metrics maintained elsewhere, such as the events skipped by the chatter filter, read when rendered
+- An optional HTTP endpoint serving them on /metrics
+"""
+from __future__ import absolute_import
+
+import threading
+from builtins import object
+from builtins import str
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+PHASES = ("parse", "queue", "lock", "game", "db", "send")
+
+# Replied with a success, replied with an error message, raised an exception, rejected by the overloaded worker pool
+RESULTS = ("success", "failure", "error", "rejected")
+
+# Upper bounds of the latency buckets, in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram(object):
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # The last count is the +Inf bucket
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        index = 0
+        while index < len(BUCKETS) and seconds > BUCKETS[index]:
+            index += 1
+
+        self.counts[index] += 1
+        self.total += seconds
+        self.count += 1
+
+    def lines(self, name, labels=""):
+        """
+        :param labels: The labels of the histogram, such as 'command="!take"', none when empty.
+        """
+
+        out = []
+        cumulated = 0
+        bucket_labels = labels + "," if labels else ""
+        for index, bound in enumerate(BUCKETS + ("+Inf",)):
+            cumulated += self.counts[index]
+            out.append(name + "_bucket{" + bucket_labels + 'le="' + str(bound) + '"} ' + str(cumulated) + "\n")
+
+        labels = "{" + labels + "}" if labels else ""
+        out.append(name + "_sum" + labels + " " + repr(self.total) + "\n")
+        out.append(name + "_count" + labels + " " + str(self.count) + "\n")
+        return out
+
+
+class CommandMetrics(object):
+    """
+    Thread-safe counters and latency histograms of the commands.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.results = {}  # (command, result) -> count
+        self.histograms = {}  # (command, phase) -> Histogram
+        self.counters = []  # (name, type, description, function returning the value)
+        self.collectors = []  # Functions returning lines of metrics in the text format
+
+    def add_counter(self, name, description, value, kind="counter"):
+        """
+        :param value: Function returning the current value of the counter, called by render().
+        :param kind: Type of the metric, "gauge" for a value which can go down.
+        """
+
+        with self.lock:
+            self.counters.append((name, kind, description, value))
+
+    def add_collector(self, collect):
+        """
+        :param collect: Function returning a list of lines of metrics, with their HELP and TYPE lines.
+        """
+
+        with self.lock:
+            self.collectors.append(collect)
+
+    def observe(self, command, phase, seconds):
+        with self.lock:
+            histogram = self.histograms.get((command, phase))
+            if histogram is None:
+                histogram = self.histograms[(command, phase)] = Histogram()
+            histogram.observe(seconds)
+
+    def record(self, command, result):
+        with self.lock:
+            self.results[(command, result)] = self.results.get((command, result), 0) + 1
+
+    def count(self, command, result):
+        with self.lock:
+            return self.results.get((command, result), 0)
+
+    def render(self):
+        """
+        :return: The metrics in the Prometheus text exposition format.
+        """
+
+        with self.lock:
+            out = ["# HELP gamify_commands_total Commands handled, by command and result.\n",
+                   "# TYPE gamify_commands_total counter\n"]
+            for (command, result), count in sorted(self.results.items()):
+                out.append('gamify_commands_total{command="' + escape(command) + '",result="' + result + '"} ' +
+                           str(count) + "\n")
+
+            out.append("# HELP gamify_command_duration_seconds Time spent handling commands, by command and phase.\n")
+            out.append("# TYPE gamify_command_duration_seconds histogram\n")
+            for (command, phase), histogram in sorted(self.histograms.items()):
+                labels = 'command="' + escape(command) + '",phase="' + phase + '"'
+                out.extend(histogram.lines("gamify_command_duration_seconds", labels))
+
+            for name, kind, description, value in self.counters:
+                out.append("# HELP " + name + " " + description + "\n")
+                out.append("# TYPE " + name + " " + kind + "\n")
+                out.append(name + " " + str(value()) + "\n")
+
+            for collect in self.collectors:
+                out.extend(collect())
+
+            return "".join(out)
+
+
+def escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class MetricsServer(object):
+    """
+    Serves the metrics on http://host:port/metrics from a daemon thread.
+    Binds to the loopback interface by default, the metrics are not meant to be public.
+    """
+
+    def __init__(self, metrics, port, host="127.0.0.1"):
+        """
+        :param port: TCP port, 0 to let the system pick a free one (see the port attribute).
+        """
+
+        self.metrics = metrics
+        self.server = ThreadingHTTPServer((host, port), self.request_handler())
+        self.port = self.server.server_address[1]
+        self.thread = None
+
+    def request_handler(self):
+        metrics = self.metrics
+
+        class MetricsRequestHandler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes are not worth a line on the console
+
+        return MetricsRequestHandler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-server")
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.thread is not None:
+            self.server.shutdown()
+            self.thread.join()
+        self.server.server_close()
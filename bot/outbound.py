@@ -0,0 +1,328 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Outbound queue of the replies, sent by a background thread:
+- Each channel has a token bucket, so that a burst of replies does not go over Slack's rate limit
+- Consecutive replies waiting for the same channel are merged into a single message when they fit
+- A failed send is retried with an exponential backoff, and reported once the retries are exhausted
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+
+import collections
+import threading
+import time
+import traceback
+from builtins import object
+
+from bot.messages import MAX_MESSAGE_SIZE
+from bot.metrics import Histogram
+
+DEFAULT_RATE = 1.0  # Messages per second and channel, the rate Slack allows over time
+
+DEFAULT_BURST = 5  # Messages sent at once to a channel which was quiet
+
+DEFAULT_RETRIES = 5
+
+DEFAULT_BACKOFF = 0.5  # Seconds before the first retry, doubled on each retry
+
+DEFAULT_MAX_BACKOFF = 30.0
+
+DEFAULT_CLOSE_TIMEOUT = 10.0  # Seconds given to the pending replies to be sent on close
+
+
+class TokenBucket(object):
+
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = now
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now):
+        """
+        :return: Seconds to wait for a token, 0 if one is available.
+        """
+
+        self.refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        self.refill(now)
+        self.tokens -= 1
+
+
+class Outgoing(object):
+    """
+    A message waiting to be sent, made of one or several replies.
+    """
+
+    __slots__ = ("text", "queued", "attempts")
+
+    def __init__(self, text, queued):
+        self.text = text
+        self.queued = queued  # Time of its first reply
+        self.attempts = 0
+
+
+class ChannelQueue(object):
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.pending = collections.deque()
+        self.not_before = 0.0  # Time of the next attempt after a failure
+
+    def delay(self, now):
+        return max(self.bucket.delay(now), self.not_before - now)
+
+
+class OutboundMetrics(object):
+    """
+    Counters and latency statistics of an outbound queue: the time spent in the Slack client for each message,
+    and the latency of a reply, from its submission to the successful send of the message which contains it.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queued = 0
+        self.coalesced = 0
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.max_latency = 0.0
+        self.send_time = Histogram()
+        self.latency = Histogram()
+
+    def record_queued(self, coalesced):
+        with self.lock:
+            self.queued += 1
+            if coalesced:
+                self.coalesced += 1
+
+    def record_sent(self, latency):
+        with self.lock:
+            self.sent += 1
+            self.max_latency = max(self.max_latency, latency)
+            self.latency.observe(latency)
+
+    def record_send_time(self, seconds):
+        with self.lock:
+            self.send_time.observe(seconds)
+
+    def record_retried(self):
+        with self.lock:
+            self.retried += 1
+
+    def record_failed(self):
+        with self.lock:
+            self.failed += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {"queued": self.queued,
+                    "coalesced": self.coalesced,
+                    "sent": self.sent,
+                    "retried": self.retried,
+                    "failed": self.failed,
+                    "max_latency": self.max_latency}
+
+    def register(self, metrics):
+        """
+        Exposes the counters with the command metrics.
+
+        :param metrics: CommandMetrics serving the counters.
+        """
+
+        for name, description in (("queued", "Replies submitted to the outbound queue."),
+                                  ("coalesced", "Replies merged into the message of a previous one."),
+                                  ("sent", "Messages sent to Slack."),
+                                  ("retried", "Failed sends of a message which were retried."),
+                                  ("failed", "Messages given up after their last retry.")):
+            metrics.add_counter("gamify_outbound_" + name + "_total", description, self.reader(name))
+        metrics.add_collector(self.histogram_lines)
+
+    def histogram_lines(self):
+        with self.lock:
+            out = []
+            for name, description, histogram in (
+                    ("gamify_outbound_send_seconds", "Time spent in the Slack client sending each message, "
+                                                     "failed attempts included.", self.send_time),
+                    ("gamify_outbound_latency_seconds", "Time from the submission of a reply to the send of "
+                                                        "its message.", self.latency)):
+                out.append("# HELP " + name + " " + description + "\n")
+                out.append("# TYPE " + name + " histogram\n")
+                out.extend(histogram.lines(name))
+            return out
+
+    def reader(self, name):
+        return lambda: self.snapshot()[name]
+
+
+def report_failure(channel, text, error):
+    print("Failed to send message to channel " + channel + ": '" + text + "'")
+    traceback.print_exception(type(error), error, error.__traceback__)
+
+
+class OutboundQueue(object):
+    """
+    Slack client proxy queueing every rtm_send_message call, the messages being sent by a background thread.
+
+    Messages of a channel are sent in the order they were emitted. When several channels can send,
+    the one with the oldest pending reply goes first.
+    """
+
+    def __init__(self, client, rate=DEFAULT_RATE, burst=DEFAULT_BURST, retries=DEFAULT_RETRIES,
+                 backoff=DEFAULT_BACKOFF, max_backoff=DEFAULT_MAX_BACKOFF, max_size=MAX_MESSAGE_SIZE,
+                 on_failure=report_failure):
+        """
+        :param rate: Messages per second and channel.
+        :param burst: Capacity of the token bucket of each channel.
+        :param retries: Number of retries of a failed send, before it is given up.
+        :param max_size: Maximum size of a message merging several replies.
+        :param on_failure: Function called with the channel, the text and the last error of a message given up.
+        """
+
+        if rate <= 0 or burst < 1:
+            raise ValueError("an outbound queue needs a positive rate and a burst of at least one message")
+
+        self.client = client
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_size = max_size
+        self.on_failure = on_failure
+        self.metrics = OutboundMetrics()
+
+        self.condition = threading.Condition()
+        self.channels = {}  # Channel id -> ChannelQueue
+        self.pending = 0
+        self.closed = False
+        self.abandoned = False
+
+        self.thread = threading.Thread(target=self.work, name="outbound-sender")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def rtm_send_message(self, channel, out):
+        """
+        Queues a reply, merged with the last pending message of the channel when the result fits in a message.
+
+        :raise RuntimeError: If the queue is closed.
+        """
+
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("the outbound queue is closed")
+
+            queue = self.channels.get(channel)
+            if queue is None:
+                queue = self.channels[channel] = ChannelQueue(TokenBucket(self.rate, self.burst, time.time()))
+
+            last = queue.pending[-1] if len(queue.pending) > 0 else None
+            coalesced = last is not None and len(last.text) + 1 + len(out) <= self.max_size
+            if coalesced:
+                last.text += "\n" + out
+            else:
+                queue.pending.append(Outgoing(out, time.time()))
+                self.pending += 1
+            self.metrics.record_queued(coalesced)
+            self.condition.notify()
+
+    def next_ready(self, now):
+        """
+        :return: A tuple (channel, seconds to wait), the channel being None if none can send yet.
+        The seconds to wait are None if no message is pending.
+        """
+
+        ready = None
+        wait = None
+        for channel, queue in self.channels.items():
+            if len(queue.pending) == 0:
+                continue
+
+            delay = queue.delay(now)
+            if delay > 0:
+                wait = delay if wait is None else min(wait, delay)
+            elif ready is None or queue.pending[0].queued < self.channels[ready].pending[0].queued:
+                ready = channel
+
+        return ready, wait
+
+    def work(self):
+        while True:
+            with self.condition:
+                while True:
+                    if self.abandoned or (self.closed and self.pending == 0):
+                        return
+
+                    now = time.time()
+                    channel, wait = self.next_ready(now)
+                    if channel is not None:
+                        break
+                    self.condition.wait(wait)
+
+                queue = self.channels[channel]
+                outgoing = queue.pending.popleft()
+                queue.bucket.take(now)
+
+            error = None
+            started = time.time()
+            try:
+                self.client.rtm_send_message(channel, outgoing.text)
+            except Exception as e:
+                error = e
+            self.metrics.record_send_time(time.time() - started)
+
+            self.sent(channel, queue, outgoing, error)
+
+    def sent(self, channel, queue, outgoing, error):
+        with self.condition:
+            if error is None:
+                self.pending -= 1
+                self.metrics.record_sent(time.time() - outgoing.queued)
+                return
+
+            outgoing.attempts += 1
+            if outgoing.attempts <= self.retries:
+                # Back at the head of its channel, replies queued meanwhile stay behind it
+                queue.pending.appendleft(outgoing)
+                queue.not_before = time.time() + min(self.backoff * 2 ** (outgoing.attempts - 1), self.max_backoff)
+                self.metrics.record_retried()
+                return
+
+            self.pending -= 1
+            self.metrics.record_failed()
+
+        self.on_failure(channel, outgoing.text, error)
+
+    def close(self, timeout=DEFAULT_CLOSE_TIMEOUT):
+        """
+        Stops accepting replies, and waits for the pending ones to be sent.
+        The messages still pending after the timeout are reported as failures.
+        """
+
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join(timeout)
+
+        with self.condition:
+            self.abandoned = True
+            self.condition.notify()
+            left = [(channel, outgoing) for channel, queue in self.channels.items() for outgoing in queue.pending]
+            for queue in self.channels.values():
+                queue.pending.clear()
+            self.pending = 0
+
+        for channel, outgoing in left:
+            self.metrics.record_failed()
+            self.on_failure(channel, outgoing.text, RuntimeError("not sent before the outbound queue was closed"))
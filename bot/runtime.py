@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Runtime of the bot: an asyncio event loop woken up as soon as the RTM websocket becomes readable.
+Replies are sent from a background thread by the outbound queue (see the outbound module).
+"""
+from __future__ import absolute_import
+
+import asyncio
+from builtins import object
+
+
+class RtmRuntime(object):
+    """
+    Reads the RTM stream of a connected Slack client from an asyncio event loop.
+
+    Instead of polling with a fixed delay, the loop watches the websocket file descriptor and drains
+    all available events as soon as it becomes readable, each event being passed to the dispatch function.
+    """
+
+    def __init__(self, client, dispatch, loop=None):
+        self.client = client
+        self.dispatch = dispatch
+        self.error = None
+        self.fd = None
+
+        if loop is not None:
+            self.loop = loop
+        else:
+            self.loop = asyncio.new_event_loop()
+
+    def rtm_socket(self):
+        return self.client.server.websocket.sock
+
+    def start(self):
+        self.fd = self.rtm_socket().fileno()
+        self.loop.add_reader(self.fd, self.on_readable)
+        # Events may already be buffered by the SSL layer, which is invisible to the selector
+        self.loop.call_soon(self.on_readable)
+
+    def on_readable(self):
+        """
+        Drains the websocket: one rtm_read only decodes a single frame,
+        and the selector is not notified again for frames already buffered by the SSL layer.
+        """
+
+        try:
+            while True:
+                events = self.client.rtm_read()
+                if len(events) == 0:
+                    return
+
+                for event in events:
+                    self.dispatch(event)
+        except Exception as e:
+            self.error = e
+            self.loop.stop()
+
+    def run_forever(self):
+        """
+        Runs the event loop until stop() is called or reading from the websocket fails.
+
+        :return: void, the read error is raised if any.
+        """
+
+        self.start()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.remove_reader(self.fd)
+
+        if self.error is not None:
+            raise self.error
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    def close(self):
+        self.loop.close()
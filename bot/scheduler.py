@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Automatic assignment of the tasks nobody took before the end of the assignment period:
+- The deadlines of the pending tasks are kept in a min-heap, the table of tasks is only read at startup
+- A single thread sleeps until the nearest deadline, then assigns the task with the roulette
+- Taken or closed tasks are not removed from the heap, they are skipped when their deadline is reached
+- A dropped task gets a new assignment period, a task which could not be assigned is retried later
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+
+import heapq
+import threading
+import time
+import traceback
+from builtins import object
+
+from game.task import TASK_ASSIGNMENT_PERIOD
+
+RETRY_DELAY = 60  # Seconds before assigning again a task which could not be assigned, for instance without players
+
+
+class AssignmentScheduler(object):
+
+    def __init__(self, game, send, default_channel=None, period=TASK_ASSIGNMENT_PERIOD, retry_delay=RETRY_DELAY):
+        """
+        :param game: The game whose tasks are assigned.
+        :param send: Function (channel, message) announcing an assignment.
+        :param default_channel: Channel announcing the assignment of the tasks added before the bot started,
+        their assignment is not announced when None.
+        :param period: Seconds after which a task is assigned.
+        :param retry_delay: Seconds before assigning again a task which could not be assigned.
+        """
+
+        self.game = game
+        self.send = send
+        self.default_channel = default_channel
+        self.period = period
+        self.retry_delay = retry_delay
+        self.deadlines = []  # Heap of (deadline, task_id, channel)
+        self.latest = {}  # Task id -> its latest deadline, the earlier entries of the task are outdated
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        with self.game.lock:
+            pending = self.game.tasks.unassigned()
+
+        with self.condition:
+            for task in pending:
+                self.deadlines.append((task.deadline(self.period), task.uid, self.default_channel))
+                self.latest[task.uid] = task.deadline(self.period)
+            heapq.heapify(self.deadlines)
+            self.running = True
+
+        self.thread = threading.Thread(target=self.run, name="assignment-scheduler")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def schedule(self, task, channel=None, deadline=None):
+        """
+        :param task: A task that was just added, or which is no longer assigned.
+        :param channel: Channel announcing the assignment, the default channel when None.
+        :param deadline: Time at which the task is assigned, the end of its assignment period when None.
+        :return: void
+        """
+
+        if channel is None:
+            channel = self.default_channel
+        if deadline is None:
+            deadline = task.deadline(self.period)
+
+        self.push(deadline, task.uid, channel)
+
+    def push(self, deadline, task_id, channel):
+        with self.condition:
+            heapq.heappush(self.deadlines, (deadline, task_id, channel))
+            self.latest[task_id] = deadline
+            # Only the thread sleeping for a later deadline needs to wake up
+            if self.deadlines[0][1] == task_id:
+                self.condition.notify()
+
+    def __len__(self):
+        with self.condition:
+            return len(self.deadlines)
+
+    def next_expired(self):
+        """
+        Waits for the nearest deadline to be over.
+
+        :return: A tuple (task_id, channel), None once the scheduler is stopped.
+        """
+
+        with self.condition:
+            while self.running:
+                if len(self.deadlines) == 0:
+                    self.condition.wait()
+                    continue
+
+                delay = self.deadlines[0][0] - time.time()
+                if delay < 0:
+                    (deadline, task_id, channel) = heapq.heappop(self.deadlines)
+                    if self.latest.get(task_id) != deadline:
+                        continue  # The task was scheduled again since
+                    del self.latest[task_id]
+                    return task_id, channel
+
+                self.condition.wait(delay)
+
+        return None
+
+    def run(self):
+        while True:
+            expired = self.next_expired()
+            if expired is None:
+                return
+
+            (task_id, channel) = expired
+            # noinspection PyBroadException
+            try:
+                self.assign(task_id, channel)
+            except Exception:
+                print("Exception occurred while assigning task: " + str(task_id))
+                traceback.print_exc()
+                self.retry(task_id, channel)
+
+    def assign(self, task_id, channel):
+        with self.game.lock:
+            (status, out) = self.game.auto_assign(task_id, self.period)
+            pending = not status and self.is_pending(task_id)
+        if pending:
+            self.retry(task_id, channel)
+        if not status:
+            return
+
+        self.game.wait_durable()
+        if channel is not None:
+            self.send(channel, out)
+
+    def is_pending(self, task_id):
+        """
+        :return: True if the task still exists and nobody is assigned to it.
+        """
+
+        return self.game.tasks.get(task_id) is not None and self.game.assignments.user_of_task(task_id) is None
+
+    def retry(self, task_id, channel):
+        with self.condition:
+            if task_id in self.latest:
+                return  # Already scheduled again, for instance after a drop
+        self.push(time.time() + self.retry_delay, task_id, channel)
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+
+        if self.thread is not None:
+            self.thread.join()
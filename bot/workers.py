@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Bounded pool of worker threads executing commands:
+- Commands of a given channel are executed one at a time, in submission order
+- Commands of different channels are executed in parallel
+- Channels with pending commands are served round-robin, so a busy channel cannot starve the others
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+
+import collections
+import threading
+import time
+import traceback
+from builtins import object
+from builtins import range
+
+DEFAULT_WORKERS = 4
+
+DEFAULT_QUEUE_DEPTH = 100  # Maximum number of pending commands, all channels included
+
+DEFAULT_CHANNEL_QUEUE_DEPTH = 20  # Maximum number of pending commands for a single channel
+
+
+class QueueMetrics(object):
+    """
+    Counters and queue wait time statistics of a worker pool.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.submitted = 0
+        self.rejected = 0
+        self.executed = 0
+        self.errors = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_submitted(self):
+        with self.lock:
+            self.submitted += 1
+
+    def record_rejected(self):
+        with self.lock:
+            self.rejected += 1
+
+    def record_executed(self, wait, failed):
+        with self.lock:
+            self.executed += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            if failed:
+                self.errors += 1
+
+    def register(self, metrics):
+        """
+        Exposes the counters and the queue wait times with the command metrics.
+
+        :param metrics: CommandMetrics serving them.
+        """
+
+        for name, description in (("submitted", "Commands submitted to the worker pool."),
+                                  ("rejected", "Commands rejected by the full worker pool."),
+                                  ("executed", "Commands executed by the worker pool."),
+                                  ("errors", "Commands of the worker pool which raised an exception.")):
+            metrics.add_counter("gamify_pool_" + name + "_total", description, self.reader(name))
+        metrics.add_counter("gamify_pool_wait_seconds_total", "Time the executed commands waited for a worker.",
+                            self.reader("total_wait"))
+        metrics.add_counter("gamify_pool_wait_seconds_max", "Longest time a command waited for a worker.",
+                            self.reader("max_wait"), "gauge")
+
+    def reader(self, name):
+        return lambda: self.snapshot()[name]
+
+    def snapshot(self):
+        with self.lock:
+            mean_wait = 0.0
+            if self.executed > 0:
+                mean_wait = self.total_wait / self.executed
+
+            return {"submitted": self.submitted,
+                    "rejected": self.rejected,
+                    "executed": self.executed,
+                    "errors": self.errors,
+                    "total_wait": self.total_wait,
+                    "mean_wait": mean_wait,
+                    "max_wait": self.max_wait}
+
+
+class ChannelWorkerPool(object):
+    """
+    Executes functions submitted for a channel on a fixed number of worker threads.
+
+    When the pool is full, submit() blocks the caller (backpressure) until a slot is freed,
+    or until the timeout expires, in which case the function is rejected.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, queue_depth=DEFAULT_QUEUE_DEPTH,
+                 channel_queue_depth=DEFAULT_CHANNEL_QUEUE_DEPTH, timeout=None):
+        if workers < 1:
+            raise ValueError("a worker pool needs at least one worker")
+
+        self.queue_depth = queue_depth
+        self.channel_queue_depth = channel_queue_depth
+        self.timeout = timeout
+        self.metrics = QueueMetrics()
+
+        self.condition = threading.Condition()
+        self.queues = {}  # Pending functions per channel
+        self.ready = collections.deque()  # Channels having pending functions, and not being executed
+        self.running = set()  # Channels being executed by a worker
+        self.pending = 0
+        self.closed = False
+
+        self.threads = []
+        for index in range(workers):
+            thread = threading.Thread(target=self.work, name="command-worker-" + str(index))
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, channel, func, *args):
+        """
+        Queues a function to be executed after the ones previously submitted for the same channel.
+
+        :param channel: Channel id used to order the executions.
+        :param func: The function to be executed.
+        :param args: Arguments of the function.
+        :return: False if the function was rejected because the pool stayed full until the timeout.
+        """
+
+        deadline = None
+        if self.timeout is not None:
+            deadline = time.time() + self.timeout
+
+        with self.condition:
+            while not self.closed and self.is_full(channel):
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        self.metrics.record_rejected()
+                        return False
+
+                self.condition.wait(remaining)
+
+            if self.closed:
+                raise RuntimeError("the worker pool is shut down")
+
+            queue = self.queues.get(channel)
+            if queue is None:
+                queue = collections.deque()
+                self.queues[channel] = queue
+
+            if len(queue) == 0 and channel not in self.running:
+                self.ready.append(channel)
+
+            queue.append((time.time(), func, args))
+            self.pending += 1
+            self.metrics.record_submitted()
+            self.condition.notify_all()
+
+        return True
+
+    def is_full(self, channel):
+        if self.pending >= self.queue_depth:
+            return True
+
+        return channel in self.queues and len(self.queues[channel]) >= self.channel_queue_depth
+
+    def work(self):
+        while True:
+            with self.condition:
+                while len(self.ready) == 0 and not self.closed:
+                    self.condition.wait()
+
+                if len(self.ready) == 0:
+                    return  # Shut down, and nothing left to execute
+
+                channel = self.ready.popleft()
+                queue = self.queues[channel]
+                (enqueued, func, args) = queue.popleft()
+                self.pending -= 1
+                self.running.add(channel)
+                self.condition.notify_all()
+
+            wait = time.time() - enqueued
+            failed = False
+            # noinspection PyBroadException
+            try:
+                func(*args)
+            except Exception:
+                failed = True
+                print("Exception occurred while executing a command for channel: '" + channel + "'")
+                traceback.print_exc()
+
+            self.metrics.record_executed(wait, failed)
+
+            with self.condition:
+                self.running.discard(channel)
+                if len(queue) > 0:
+                    self.ready.append(channel)  # Back of the line, other channels are served first
+                else:
+                    del self.queues[channel]
+                self.condition.notify_all()
+
+    def shutdown(self, wait=True):
+        """
+        Stops accepting functions, pending ones are still executed.
+
+        :param wait: Blocks until all pending functions are executed.
+        :return: void
+        """
+
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+        if wait:
+            for thread in self.threads:
+                thread.join()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Typed arguments of the commands, and their parsers:
+- The dispatch table parses the argument of a message once, with the parser of its command
+- The game executes a command with its typed argument, a string being parsed by the same parser
+- An invalid argument carries the error reported by its command
+"""
+from __future__ import absolute_import
+
+from builtins import object
+from datetime import date, datetime
+
+from .buckets import first_day_of_month, month_of
+from .player import PlayerRepository
+from .task import TaskRepository
+
+SCORE_WINDOWS = ("week", "month", "since")
+
+ADD_USAGE = "`!add &lt;points&gt; &lt;description&gt;`"
+TASKS_USAGE = ", usage: `!tasks [page]`"
+SCORE_USAGE = ", usage: `!score [week|month|since &lt;yyyy-mm-dd&gt;] [page]`"
+
+
+class NameArgument(object):
+    """
+    Argument of !join.
+    """
+
+    __slots__ = ("name", "error")
+
+    def __init__(self, name, error=""):
+        self.name = name
+        self.error = error
+
+
+class NewTaskArgument(object):
+    """
+    Argument of !add.
+    """
+
+    __slots__ = ("points", "description", "error")
+
+    def __init__(self, points, description, error=""):
+        self.points = points
+        self.description = description
+        self.error = error
+
+
+class TaskIdArgument(object):
+    """
+    Argument of !take, !roulette, !drop and !close.
+    """
+
+    __slots__ = ("task_id", "error")
+
+    def __init__(self, task_id, error=""):
+        self.task_id = task_id
+        self.error = error
+
+
+class PageArgument(object):
+    """
+    Argument of !tasks.
+    """
+
+    __slots__ = ("page", "error")
+
+    def __init__(self, page, error=""):
+        self.page = page
+        self.error = error
+
+
+class ScoreArgument(object):
+    """
+    Argument of !score: the window is None for the all-time leaderboard, else a tuple (first_day, label, command).
+    """
+
+    __slots__ = ("window", "page", "error")
+
+    def __init__(self, window, page, error=""):
+        self.window = window
+        self.page = page
+        self.error = error
+
+
+def name_from(argument):
+    """
+    :param argument: A NameArgument, or the argument of !join to parse.
+    :return: A NameArgument.
+    """
+
+    if isinstance(argument, NameArgument):
+        return argument
+
+    if len(argument) == 0:
+        return NameArgument(None, "you have to provide a user name: `!join &lt;user name&gt;`")
+
+    if PlayerRepository.validate_name_format(argument) is False:
+        return NameArgument(None, PlayerRepository.invalid_name_message())
+
+    return NameArgument(argument)
+
+
+def new_task_from(argument, max_task_points=None):
+    """
+    :param argument: A NewTaskArgument, or the argument of !add to parse.
+    :param max_task_points: Maximum points of a task, the default maximum if None.
+    :return: A NewTaskArgument.
+    """
+
+    if isinstance(argument, NewTaskArgument):
+        return argument
+
+    (points, msg) = TaskRepository.points_from(argument, max_task_points)
+    if points is None:
+        return NewTaskArgument(None, None, msg + ", usage: " + ADD_USAGE)
+
+    split = argument.split(None, 1)
+    if len(split) != 2:
+        return NewTaskArgument(None, None, "invalid arguments: " + ADD_USAGE)
+
+    return NewTaskArgument(points, TaskRepository.remove_trailing_quotes(split[1]))
+
+
+def task_id_from(argument):
+    """
+    :param argument: A TaskIdArgument, or the task id to parse.
+    :return: A TaskIdArgument.
+    """
+
+    if isinstance(argument, TaskIdArgument):
+        return argument
+
+    task_id = TaskRepository.check_task_id(argument)
+    if task_id is None:
+        return TaskIdArgument(None, "invalid task id")
+
+    return TaskIdArgument(task_id)
+
+
+def tasks_page_from(argument):
+    """
+    :param argument: A PageArgument, or the optional page number of !tasks to parse.
+    :return: A PageArgument.
+    """
+
+    if isinstance(argument, PageArgument):
+        return argument
+
+    (page, msg) = page_from(argument)
+    if page is None:
+        return PageArgument(None, msg + TASKS_USAGE)
+
+    return PageArgument(page)
+
+
+def score_from(argument, today=None):
+    """
+    :param argument: A ScoreArgument, or the optional period then page number of !score to parse.
+    :param today: Ordinal of the current day, today by default.
+    :return: A ScoreArgument.
+    """
+
+    if isinstance(argument, ScoreArgument):
+        return argument
+
+    (window, argument, msg) = window_from(argument, today)
+    if msg:
+        return ScoreArgument(None, None, msg + SCORE_USAGE)
+
+    (page, msg) = page_from(argument)
+    if page is None:
+        return ScoreArgument(None, None, msg + SCORE_USAGE)
+
+    return ScoreArgument(window, page)
+
+
+def window_from(argument, today=None):
+    """
+    Parses the period of the leaderboard that starts the argument of !score, if any.
+
+    :param argument: Argument of the command.
+    :param today: Ordinal of the current day, today by default.
+    :return: A tuple (window, remaining argument, error message): the window is None for the all-time
+    leaderboard, else a tuple (first_day, label, command).
+    """
+
+    words = []
+    if argument is not None:
+        words = argument.split()
+    if len(words) == 0 or words[0].lower() not in SCORE_WINDOWS:
+        return None, argument, ""
+
+    if today is None:
+        today = date.today().toordinal()
+
+    kind = words[0].lower()
+    if kind == "week":
+        window = (today - date.fromordinal(today).weekday(), "of the week", "!score week")
+    elif kind == "month":
+        window = (first_day_of_month(month_of(today)), "of the month", "!score month")
+    else:
+        if len(words) < 2:
+            return None, argument, "missing date"
+
+        try:
+            first_day = datetime.strptime(words[1], "%Y-%m-%d").date().toordinal()
+        except ValueError:
+            return None, argument, "invalid date"
+
+        words = words[1:]
+        window = (first_day, "since " + words[0], "!score since " + words[0])
+
+    return window, " ".join(words[1:]), ""
+
+
+def page_from(argument):
+    if argument is None or len(argument.strip()) == 0:
+        return 1, ""
+
+    try:
+        page = int(argument)
+    except ValueError:
+        return None, "invalid page number"
+
+    if page < 1:
+        return None, "invalid page number"
+
+    return page, ""
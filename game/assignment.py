@@ -16,6 +16,7 @@ class AssignmentRepository(object):
 
         cursor = self.con.cursor()
         self.create_assignment_table(cursor)
+        self.create_indexes(cursor)
         self.con.commit()
 
     def __str__(self):
@@ -44,6 +45,12 @@ class AssignmentRepository(object):
         cursor.execute("DELETE FROM ASSIGNMENT WHERE task_id=?", (task_id,))
         self.con.commit()
 
+    def remove_all_of(self, player_id):
+        cursor = self.con.cursor()
+        cursor.execute("DELETE FROM ASSIGNMENT WHERE player_id=?", (player_id,))
+        self.con.commit()
+        return cursor.rowcount
+
     def user_of_task(self, task_id):
         cursor = self.con.cursor()
         cursor.execute("SELECT player_id FROM ASSIGNMENT WHERE task_id=?", (task_id,))
@@ -85,6 +92,10 @@ class AssignmentRepository(object):
 
         con.commit()
 
+    @staticmethod
+    def create_indexes(cursor):
+        cursor.execute("CREATE INDEX IF NOT EXISTS ASSIGNMENT_PLAYER_ID ON ASSIGNMENT(player_id)")
+
     @staticmethod
     def create_assignment_table(cursor):
         cursor.execute("CREATE TABLE IF NOT EXISTS ASSIGNMENT "
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Scores earned per period, for the leaderboards of a time window:
+- The points earned or lost by a player are added to the bucket of the day, and to the bucket of the month
+- Points lost are those actually taken from the score, which never goes below 0
+- An admin reset empties every bucket: the leaderboards of all windows start again from 0
+- A window starting on a given day sums the day buckets until the first full month, then the month buckets,
+  so that at most about 30 day buckets and one bucket per month are read
+"""
+from __future__ import absolute_import
+
+import time
+from builtins import object
+from datetime import date
+
+from .events import JOIN, LEAVE, TAKE, DROP, RESET, apply_event, decode
+from .player import Player
+
+DAY = "D"
+MONTH = "M"
+
+
+def day_of(timestamp):
+    """
+    :return: The proleptic Gregorian ordinal of the local day of an epoch timestamp.
+    """
+
+    return date.fromtimestamp(timestamp).toordinal()
+
+
+def month_of(day):
+    current = date.fromordinal(day)
+    return current.year * 12 + current.month - 1
+
+
+def first_day_of_month(month):
+    return date(month // 12, month % 12 + 1, 1).toordinal()
+
+
+def buckets_since(first_day):
+    """
+    :param first_day: Ordinal of the first day of the window, which ends now.
+    :return: A tuple (first_day, end_day, first_month): the day buckets in [first_day, end_day),
+    and the month buckets from first_month, cover the window.
+    """
+
+    first_month = month_of(first_day)
+    if first_day_of_month(first_month) < first_day:
+        first_month += 1
+
+    return first_day, first_day_of_month(first_month), first_month
+
+
+class ScoreBuckets(object):
+    """
+    This class is responsible for the storage of the points earned per day and per month.
+    """
+
+    def __init__(self, connection):
+        self.con = connection
+
+        cursor = self.con.cursor()
+        self.create_tables(cursor)
+        self.con.commit()
+
+    @staticmethod
+    def create_tables(cursor):
+        cursor.execute("CREATE TABLE IF NOT EXISTS SCORE_BUCKET ("
+                       "size TEXT NOT NULL, "
+                       "bucket INTEGER NOT NULL, "
+                       "player_id TEXT NOT NULL, "
+                       "points INTEGER NOT NULL, "
+                       "PRIMARY KEY (size, bucket, player_id)) WITHOUT ROWID")
+        cursor.execute("CREATE INDEX IF NOT EXISTS SCORE_BUCKET_PLAYER_ID ON SCORE_BUCKET(player_id)")
+
+    @staticmethod
+    def upgrade_from_4_to_5(con):
+        """
+        Fills the buckets by replaying the event log, with the rules the commands apply to the buckets.
+        """
+
+        cursor = con.cursor()
+        ScoreBuckets.create_tables(cursor)
+
+        cursor.execute("SELECT COUNT(*) FROM SCORE_BUCKET")
+        if cursor.fetchone()[0] == 0:
+            ScoreBuckets.replay(con)
+
+        con.commit()
+
+    @staticmethod
+    def replay(con):
+        # Scores before the log are those of its baseline snapshot, when it was not pruned yet
+        cursor = con.cursor()
+        cursor.execute("SELECT scores FROM SCORE_SNAPSHOT WHERE event_id=0")
+        row = cursor.fetchone()
+        scores = decode(row[0]) if row is not None else {}
+
+        cursor.execute("SELECT time, kind, player_id, points FROM EVENT ORDER BY id")
+        for timestamp, kind, player_id, points in cursor.fetchall():
+            if kind in (TAKE, DROP):
+                delta = points if kind == TAKE else -points
+                if player_id in scores:  # Otherwise the score is unknown, and a loss cannot be floored
+                    previous = scores[player_id]
+                    apply_event(scores, kind, player_id, points)
+                    delta = scores[player_id] - previous
+                ScoreBuckets.write(cursor, player_id, delta, day_of(timestamp))
+            elif kind == LEAVE:
+                cursor.execute("DELETE FROM SCORE_BUCKET WHERE player_id=?", (player_id,))
+                apply_event(scores, kind, player_id, points)
+            elif kind == RESET:
+                cursor.execute("DELETE FROM SCORE_BUCKET")
+                apply_event(scores, kind, player_id, points)
+            elif kind == JOIN:
+                apply_event(scores, kind, player_id, points)
+
+    def add(self, player_id, points, timestamp=None):
+        """
+        Adds points earned, or lost when negative, to the buckets of the day and of the month of the timestamp.
+
+        :param timestamp: Epoch seconds, now by default.
+        :return: void
+        """
+
+        if timestamp is None:
+            timestamp = time.time()
+
+        self.write(self.con.cursor(), player_id, points, day_of(timestamp))
+        self.con.commit()
+
+    @staticmethod
+    def write(cursor, player_id, points, day):
+        # Not an upsert, which needs SQLite 3.24: the row is inserted when the update finds none
+        for size, bucket in ((DAY, day), (MONTH, month_of(day))):
+            cursor.execute("UPDATE SCORE_BUCKET SET points=points+? WHERE size=? AND bucket=? AND player_id=?",
+                           (points, size, bucket, player_id))
+            if cursor.rowcount == 0:
+                cursor.execute("INSERT INTO SCORE_BUCKET(size, bucket, player_id, points) VALUES (?,?,?,?)",
+                               (size, bucket, player_id, points))
+
+    def remove_all_of(self, player_id):
+        cursor = self.con.cursor()
+        cursor.execute("DELETE FROM SCORE_BUCKET WHERE player_id=?", (player_id,))
+        self.con.commit()
+
+    def clear(self):
+        """
+        Empties the buckets of all players, when their scores are reset.
+        """
+
+        cursor = self.con.cursor()
+        cursor.execute("DELETE FROM SCORE_BUCKET")
+        self.con.commit()
+
+    def scores_since(self, first_day):
+        """
+        :param first_day: Ordinal of the first day of the window, which ends now.
+        :return: A list of the registered players who earned or lost points in the window,
+        by descending points earned in the window, then by registration order.
+        """
+
+        cursor = self.con.cursor()
+        cursor.execute("SELECT P.id, P.name, W.points FROM "
+                       "(SELECT player_id, SUM(points) AS points FROM "
+                       "(SELECT player_id, points FROM SCORE_BUCKET WHERE size=? AND bucket >= ? AND bucket < ? "
+                       "UNION ALL "
+                       "SELECT player_id, points FROM SCORE_BUCKET WHERE size=? AND bucket >= ?) "
+                       "GROUP BY player_id) W "
+                       "JOIN PLAYER P ON P.id = W.player_id "
+                       "ORDER BY W.points DESC, P.rowid",
+                       self.window_params(first_day))
+        return [Player(player_id, name, points) for player_id, name, points in cursor.fetchall()]
+
+    @staticmethod
+    def window_params(first_day):
+        (first_day, end_day, first_month) = buckets_since(first_day)
+        return DAY, first_day, end_day, MONTH, first_month
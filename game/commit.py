@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Group commit of the writes performed on a shared SQLite connection.
+"""
+from __future__ import absolute_import
+
+import threading
+from builtins import object
+
+MAX_KEPT_ERRORS = 16  # Number of failed batches remembered for late waiters
+
+
+class GroupCommitConnection(object):
+    """
+    Wraps a SQLite connection so that commits requested by the repositories are batched:
+    a batch is committed when its window has elapsed, or as soon as it holds max_batch commits.
+
+    The connection is shared by several threads, and every access to it must be serialized by the given lock.
+    After releasing that lock, a thread calls wait_durable() to block until its writes are committed.
+    """
+
+    def __init__(self, connection, lock, window, max_batch):
+        self.connection = connection
+        self.lock = lock
+        self.window = window
+        self.max_batch = max_batch
+
+        self.condition = threading.Condition()
+        self.local = threading.local()
+        self.generation = 0  # Id of the last committed batch, the open batch has the next id
+        self.pending = 0
+        self.timer = None
+        self.errors = {}
+        self.rollback_listeners = []
+        self.commit_listeners = []
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+    def commit(self):
+        """
+        Adds the writes of the calling thread to the open batch, the actual commit is deferred.
+        """
+
+        with self.condition:
+            self.pending += 1
+            self.local.ticket = self.generation + 1
+
+            if self.pending >= self.max_batch:
+                self.flush_batch()
+            elif self.timer is None:
+                self.timer = threading.Timer(self.window, self.on_window_elapsed)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def add_rollback_listener(self, listener):
+        """
+        Registers a function called without arguments when a batch could not be committed.
+        """
+
+        self.rollback_listeners.append(listener)
+
+    def add_commit_listener(self, listener):
+        """
+        Registers a function called without arguments once a batch is committed.
+        """
+
+        self.commit_listeners.append(listener)
+
+    def on_window_elapsed(self):
+        with self.lock:
+            with self.condition:
+                self.flush_batch()
+
+    def flush(self):
+        """
+        Commits the open batch right away.
+        """
+
+        with self.lock:
+            with self.condition:
+                self.flush_batch()
+
+    def flush_batch(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+        if self.pending == 0:
+            return
+
+        self.pending = 0
+        self.generation += 1
+        try:
+            self.connection.commit()
+        except Exception as e:
+            self.connection.rollback()
+            for listener in self.rollback_listeners:
+                listener()
+            self.errors[self.generation] = e
+            self.errors.pop(self.generation - MAX_KEPT_ERRORS, None)
+        else:
+            for listener in self.commit_listeners:
+                listener()
+        finally:
+            self.condition.notify_all()
+
+    def wait_durable(self):
+        """
+        Blocks until the writes of the calling thread are committed, must not be called while holding the lock.
+
+        :return: void, raises the error of the commit if the batch could not be committed.
+        """
+
+        ticket = getattr(self.local, "ticket", 0)
+        self.local.ticket = 0
+
+        with self.condition:
+            while self.generation < ticket:
+                self.condition.wait()
+
+            error = self.errors.get(ticket)
+
+        if error is not None:
+            raise error
+
+    def close(self):
+        self.flush()
+        self.connection.close()
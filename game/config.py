@@ -6,8 +6,12 @@ from builtins import object
 import os.path
 import yaml
 
+from .events import DEFAULT_SNAPSHOT_INTERVAL
+
 DEFAULT_CONFIG_FILE = "bot-config.yml"
 
+DEFAULT_GROUP_COMMIT_MAX_BATCH = 32
+
 
 class Config(object):
 
@@ -15,7 +19,7 @@ class Config(object):
         self.root_path = root_path
 
         with open(config, 'r') as stream:
-            self.conf = yaml.load(stream)
+            self.conf = yaml.safe_load(stream)
 
         if self.conf is None or not isinstance(self.conf, dict):
             raise IOError("invalid YAML file format")
@@ -41,15 +45,83 @@ class Config(object):
             return self.conf['db']['file_name']
         return None
 
+    def group_commit_window_ms(self):
+        return self.value_of('db', 'group_commit_window_ms')
+
+    def group_commit_max_batch(self):
+        return self.value_of('db', 'group_commit_max_batch', DEFAULT_GROUP_COMMIT_MAX_BATCH)
+
+    def pragmas(self):
+        """
+        :return: A dict of the SQLite pragmas applied when opening the database, empty to keep the SQLite defaults.
+        """
+
+        pragmas = self.value_of('db', 'pragmas')
+        if pragmas is None:
+            return {}
+        return pragmas
+
+    def db_readers(self):
+        return self.value_of('db', 'readers', 0)
+
+    def snapshot_interval(self):
+        return self.value_of('db', 'snapshot_interval', DEFAULT_SNAPSHOT_INTERVAL)
+
+    def slow_query_ms(self):
+        return self.value_of('db', 'slow_query_ms')
+
+    def player_cache_size(self):
+        return self.value_of('db', 'player_cache_size', 0)
+
+    def shared_database(self):
+        return self.value_of('db', 'shared', False)
+
     def admin_list(self):
         if 'admin' in self.conf and self.conf['admin'] is not None:
             return self.conf['admin']
         else:
             return []
 
+    def dispatcher_workers(self):
+        return self.value_of('dispatcher', 'workers', 0)
+
+    def dispatcher_queue_depth(self):
+        return self.value_of('dispatcher', 'queue_depth')
+
+    def dispatcher_channel_queue_depth(self):
+        return self.value_of('dispatcher', 'channel_queue_depth')
+
+    def dispatcher_timeout(self):
+        return self.value_of('dispatcher', 'timeout')
+
+    def value_of(self, section, key, default=None):
+        if section in self.conf and \
+                self.conf[section] is not None and \
+                key in self.conf[section]:
+            return self.conf[section][key]
+        return default
+
     def max_task_points(self):
         if 'rules' in self.conf and \
                 self.conf['rules'] is not None and \
                 "max_task_points" in self.conf['rules']:
             return self.conf['rules']['max_task_points']
         return None
+
+    def metrics_port(self):
+        return self.value_of('metrics', 'port')
+
+    def metrics_host(self):
+        return self.value_of('metrics', 'host', '127.0.0.1')
+
+    def events_api_port(self):
+        return self.value_of('events_api', 'port')
+
+    def events_api_host(self):
+        return self.value_of('events_api', 'host', '127.0.0.1')
+
+    def auto_assign(self):
+        return self.value_of('rules', 'auto_assign', False)
+
+    def auto_assign_channel(self):
+        return self.value_of('rules', 'auto_assign_channel')
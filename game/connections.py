@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Connections to the SQLite database of the game:
+- A single writer connection, shared by the repositories and serialized by the game lock
+- A pool of read-only connections, on which read-only commands run against a snapshot of the database
+"""
+from __future__ import absolute_import
+
+import os
+import queue
+import re
+import sqlite3
+import threading
+from builtins import object
+from builtins import str
+from contextlib import contextmanager
+from urllib.request import pathname2url
+
+from .buckets import ScoreBuckets
+from .player import PlayerRepository
+from .task import TaskRepository
+from .timing import TimedConnection
+
+# Pragmas that can be set from the configuration, their values are checked before being applied
+SUPPORTED_PRAGMAS = ("journal_mode", "synchronous", "cache_size", "mmap_size", "temp_store", "busy_timeout",
+                     "wal_autocheckpoint")
+
+# Pragmas of the configuration that are also applied to the read-only connections
+READER_PRAGMAS = ("cache_size", "mmap_size", "temp_store", "busy_timeout")
+
+PRAGMA_VALUE_REGEX = "^-?[a-zA-Z0-9_]+$"
+
+
+def apply_pragmas(connection, pragmas):
+    """
+    :param connection: A SQLite connection, before any statement is executed.
+    :param pragmas: A dict of pragma names and values, for instance {"journal_mode": "WAL"}.
+    :return: void
+    """
+
+    for name, value in pragmas.items():
+        value = str(value)
+        if name not in SUPPORTED_PRAGMAS or re.match(PRAGMA_VALUE_REGEX, value) is None:
+            raise ValueError("Unsupported pragma in db.pragmas: " + name + "=" + value)
+
+        # Pragmas cannot be bound as parameters, hence the checks above
+        connection.execute("PRAGMA " + name + "=" + value).fetchall()
+
+
+class PlayerScores(object):
+    """
+    Read-only queries of the high scores, answered by the PLAYER(points) index.
+    Offers the same reads as the in-memory leaderboard of PlayerRepository.
+    """
+
+    def __init__(self, connection):
+        self.con = connection
+
+    def count(self):
+        cursor = self.con.cursor()
+        cursor.execute("SELECT COUNT(*) FROM PLAYER")
+        return cursor.fetchone()[0]
+
+    def scores(self, limit=None, offset=0):
+        if limit is None:
+            limit = -1
+
+        cursor = self.con.cursor()
+        cursor.execute("SELECT id, name, points FROM PLAYER ORDER BY points DESC, rowid LIMIT ? OFFSET ?",
+                       (limit, offset))
+        return [PlayerRepository.player_from_row(row) for row in cursor.fetchall()]
+
+    def place_of(self, points, max_place=None):
+        limit = -1
+        if max_place is not None:
+            limit = max_place - 1
+
+        cursor = self.con.cursor()
+        cursor.execute("SELECT COUNT(*) FROM (SELECT DISTINCT points FROM PLAYER WHERE points > ? LIMIT ?)",
+                       (points, limit))
+        return 1 + cursor.fetchone()[0]
+
+
+class Snapshot(object):
+    """
+    A read-only connection and the repositories reading through it.
+    """
+
+    def __init__(self, connection):
+        self.con = connection
+        self.tasks = TaskRepository(connection)
+        self.players = PlayerScores(connection)
+        self.buckets = ScoreBuckets(connection)
+
+    def begin(self):
+        # Every read of the transaction sees the database as it was when the first one started
+        self.con.execute("BEGIN")
+
+    def end(self):
+        self.con.rollback()
+
+
+class ConnectionManager(object):
+    """
+    Opens the writer connection of a database file, and up to 'readers' read-only connections.
+
+    Read-only connections are opened when first needed, once the writer has created the schema.
+    The database is switched to WAL when readers are enabled, so that reads and writes do not block each other.
+    snapshot() may be called from any thread, it blocks while all the read-only connections are in use.
+    """
+
+    def __init__(self, db_file_name, pragmas=None, readers=0, timer=None):
+        """
+        :param timer: A QueryTimer measuring the time spent on the read-only connections, optional.
+        """
+
+        self.db_file_name = db_file_name
+        self.pragmas = pragmas if pragmas is not None else {}
+        self.readers = readers
+        self.timer = timer
+        self.opened = []
+        self.idle = queue.Queue()
+        self.lock = threading.Lock()
+
+        self.writer = sqlite3.connect(db_file_name, check_same_thread=False)
+        apply_pragmas(self.writer, self.pragmas)
+        if readers > 0:
+            apply_pragmas(self.writer, {"journal_mode": "WAL"})
+
+    def has_readers(self):
+        return self.readers > 0
+
+    def open_reader(self):
+        uri = "file:" + pathname2url(os.path.abspath(self.db_file_name)) + "?mode=ro"
+        connection = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        apply_pragmas(connection, dict((name, value) for name, value in self.pragmas.items()
+                                       if name in READER_PRAGMAS))
+        if self.timer is not None:
+            connection = TimedConnection(connection, self.timer)
+        return Snapshot(connection)
+
+    def acquire(self):
+        with self.lock:
+            if self.idle.empty() and len(self.opened) < self.readers:
+                snapshot = self.open_reader()
+                self.opened.append(snapshot)
+                return snapshot
+
+        return self.idle.get()
+
+    @contextmanager
+    def snapshot(self):
+        """
+        Lends a read-only connection, in a transaction reading a consistent state of the database.
+
+        :return: A Snapshot, whose tasks and players repositories can only be read.
+        """
+
+        snapshot = self.acquire()
+        try:
+            snapshot.begin()
+            yield snapshot
+        finally:
+            snapshot.end()
+            self.idle.put(snapshot)
+
+    def close(self):
+        with self.lock:
+            for snapshot in self.opened:
+                snapshot.con.close()
+            self.opened = []
+            self.readers = 0
+
+        self.writer.close()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Append-only log of the events of the game, the source of truth for the scores:
+- Each command changing the game appends a compact event, in the same transaction as its writes
+- The scores are folded from the events, and saved in a snapshot every 'interval' events
+- Recovering the scores reads the last snapshot, then replays at most 'interval' events
+"""
+from __future__ import absolute_import
+
+import json
+import time
+from builtins import object
+
+JOIN = "J"  # player_id, data: name
+LEAVE = "L"  # player_id
+ADD = "A"  # task_id, player_id: author, points, data: description
+TAKE = "T"  # task_id, player_id, points: earned by the player
+DROP = "D"  # task_id, player_id, points: lost by the player
+CLOSE = "C"  # task_id, player_id: closer
+RESET = "R"  # player_id: admin, points: new score of every player
+
+DEFAULT_SNAPSHOT_INTERVAL = 1000
+
+SNAPSHOTS_KEPT = 3
+
+
+def apply_event(scores, kind, player_id, points):
+    """
+    Folds an event into the scores, following the rules of PlayerRepository: a score is never negative.
+
+    :param scores: A dict player_id -> points, updated in place.
+    :return: void
+    """
+
+    if kind == JOIN:
+        scores[player_id] = 0
+    elif kind == LEAVE:
+        scores.pop(player_id, None)
+    elif kind == TAKE:
+        scores[player_id] = max(scores.get(player_id, 0) + points, 0)
+    elif kind == DROP:
+        scores[player_id] = max(scores.get(player_id, 0) - points, 0)
+    elif kind == RESET:
+        for scored_player_id in scores:
+            scores[scored_player_id] = points
+
+
+class EventLog(object):
+    """
+    This class is responsible for the storage of the events and of the snapshots of the scores.
+    """
+
+    def __init__(self, connection, interval=DEFAULT_SNAPSHOT_INTERVAL):
+        self.con = connection
+        self.interval = interval
+
+        cursor = self.con.cursor()
+        self.create_tables(cursor)
+        self.con.commit()
+
+        self.scores = None  # Folded scores, loaded by the first append
+        self.last_event_id = 0
+        self.snapshot_event_id = 0
+
+        if hasattr(self.con, "add_rollback_listener"):
+            self.con.add_rollback_listener(self.invalidate)
+
+    @staticmethod
+    def create_tables(cursor):
+        cursor.execute("CREATE TABLE IF NOT EXISTS EVENT ("
+                       "id INTEGER PRIMARY KEY NOT NULL, "
+                       "time REAL NOT NULL, "
+                       "kind TEXT NOT NULL, "
+                       "player_id TEXT, "
+                       "task_id INTEGER, "
+                       "points INTEGER, "
+                       "data TEXT)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS EVENT_PLAYER_ID ON EVENT(player_id)")
+        cursor.execute("CREATE TABLE IF NOT EXISTS SCORE_SNAPSHOT ("
+                       "event_id INTEGER PRIMARY KEY NOT NULL, "
+                       "scores TEXT NOT NULL)")
+
+    @staticmethod
+    def upgrade_from_3_to_4(con):
+        cursor = con.cursor()
+        EventLog.create_tables(cursor)
+        EventLog.write_baseline(cursor)
+        con.commit()
+
+    @staticmethod
+    def write_baseline(cursor):
+        """
+        Saves the scores of the PLAYER table as the snapshot the log starts from, unless there is one already.
+        """
+
+        cursor.execute("SELECT COUNT(*) FROM SCORE_SNAPSHOT")
+        if cursor.fetchone()[0] > 0:
+            return
+
+        scores = {}
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='PLAYER'")
+        if cursor.fetchone() is not None:
+            cursor.execute("SELECT id, points FROM PLAYER")
+            scores = dict(cursor.fetchall())
+
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM EVENT")
+        event_id = cursor.fetchone()[0]
+        cursor.execute("INSERT INTO SCORE_SNAPSHOT(event_id, scores) VALUES (?,?)", (event_id, encode(scores)))
+
+    def invalidate(self):
+        self.scores = None
+
+    def append(self, kind, player_id=None, task_id=None, points=None, data=None):
+        """
+        Appends an event, and saves a snapshot of the scores if 'interval' events were appended since the last one.
+        Must be called in the unit of work of the writes the event describes.
+
+        :return: The id of the event.
+        """
+
+        if self.scores is None:
+            self.recover()
+
+        event_id = self.insert_event((time.time(), kind, player_id, task_id, points, data))
+        apply_event(self.scores, kind, player_id, points)
+        self.last_event_id = event_id
+
+        if event_id - self.snapshot_event_id >= self.interval:
+            self.save_snapshot(event_id, self.scores)
+            self.snapshot_event_id = event_id
+
+        self.commit()
+        return event_id
+
+    def commit(self):
+        self.con.commit()
+
+    def recover(self):
+        """
+        Folds the events appended after the last snapshot into it.
+
+        :return: A dict player_id -> points.
+        """
+
+        self.ensure_baseline()
+
+        (self.snapshot_event_id, scores) = self.last_snapshot()
+        self.last_event_id = self.snapshot_event_id
+        for event_id, kind, player_id, points in self.events_after(self.snapshot_event_id):
+            apply_event(scores, kind, player_id, points)
+            self.last_event_id = event_id
+
+        self.scores = scores
+        return dict(scores)
+
+    def ensure_baseline(self):
+        self.write_baseline(self.con.cursor())
+        self.con.commit()
+
+    def insert_event(self, event):
+        cursor = self.con.cursor()
+        cursor.execute("INSERT INTO EVENT(time, kind, player_id, task_id, points, data) VALUES (?,?,?,?,?,?)", event)
+        return cursor.lastrowid
+
+    def save_snapshot(self, event_id, scores):
+        cursor = self.con.cursor()
+        cursor.execute("INSERT INTO SCORE_SNAPSHOT(event_id, scores) VALUES (?,?)", (event_id, encode(scores)))
+        cursor.execute("DELETE FROM SCORE_SNAPSHOT WHERE event_id NOT IN "
+                       "(SELECT event_id FROM SCORE_SNAPSHOT ORDER BY event_id DESC LIMIT ?)", (SNAPSHOTS_KEPT,))
+
+    def last_snapshot(self):
+        """
+        :return: A tuple (event_id, scores:dict).
+        """
+
+        cursor = self.con.cursor()
+        cursor.execute("SELECT event_id, scores FROM SCORE_SNAPSHOT ORDER BY event_id DESC LIMIT 1")
+        (event_id, scores) = cursor.fetchone()
+        return event_id, decode(scores)
+
+    def events_after(self, event_id):
+        """
+        :return: A list of tuples (event_id, kind, player_id, points), in order.
+        """
+
+        cursor = self.con.cursor()
+        cursor.execute("SELECT id, kind, player_id, points FROM EVENT WHERE id > ? ORDER BY id", (event_id,))
+        return cursor.fetchall()
+
+    def history(self, player_id=None, limit=None):
+        """
+        :param player_id: Only returns the events of this player when given.
+        :param limit: Maximum number of events to return, the last ones.
+        :return: A list of tuples (event_id, time, kind, player_id, task_id, points, data), in order.
+        """
+
+        if limit is None:
+            limit = -1
+
+        cursor = self.con.cursor()
+        if player_id is None:
+            cursor.execute("SELECT * FROM EVENT ORDER BY id DESC LIMIT ?", (limit,))
+        else:
+            cursor.execute("SELECT * FROM EVENT WHERE player_id=? ORDER BY id DESC LIMIT ?", (player_id, limit))
+        return list(reversed(cursor.fetchall()))
+
+
+def encode(scores):
+    return json.dumps(scores, separators=(",", ":"), sort_keys=True)
+
+
+def decode(scores):
+    return json.loads(scores)
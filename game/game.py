@@ -19,12 +19,47 @@ from builtins import object
 from builtins import str
 
 import collections
-import sqlite3
+import functools
+import threading
+from contextlib import contextmanager
 
-from .assignment import AssignmentRepository
-from .player import PlayerRepository, Player
-from .task import Task, TaskRepository
-from .upgrade import Upgrade
+from . import arguments
+from . import events
+from .player import Player
+from .render import RenderCache
+from .storage import SqliteStorage
+from .task import Task, TASK_ASSIGNMENT_PERIOD
+
+PAGE_SIZE = 25  # Number of tasks or players listed by a page of !tasks or !score
+
+MEDALS_COUNT = 3
+
+
+def refreshed_command(method):
+    """
+    Runs a command of the game on its latest state, see Game.refreshed().
+    """
+
+    @functools.wraps(method)
+    def command(self, *args, **kwargs):
+        with self.refreshed():
+            return method(self, *args, **kwargs)
+
+    return command
+
+
+def refreshed_query(method):
+    """
+    Runs a read-only command of the game on its latest state, unless it reads a snapshot of the database.
+    """
+
+    @functools.wraps(method)
+    def query(self, *args, **kwargs):
+        if not self.storage.has_snapshots():
+            self.refresh()
+        return method(self, *args, **kwargs)
+
+    return query
 
 
 class Game(object):
@@ -35,83 +70,181 @@ class Game(object):
     and will earn an amount of points that was defined when adding it.
     """
 
-    def __init__(self, config, sqlite_con=None):
-        if sqlite_con is not None:
-            self.connection = sqlite_con
-        else:
-            self.connection = sqlite3.connect(config.db_file_name())
+    def __init__(self, config, sqlite_con=None, storage=None):
+        """
+        :param config: The bot configuration.
+        :param sqlite_con: An open SQLite connection to store the game in, instead of the database of the configuration.
+        :param storage: The storage backend, the SQLite backend when None.
+        """
+
+        # Commands may be executed by worker threads, the access to the game is serialized by its lock
+        self.lock = threading.RLock()
 
-        self.perform_upgrade()
+        if storage is None:
+            storage = SqliteStorage(config, self.lock, sqlite_con)
 
         self.config = config
-        self.players = PlayerRepository(self.connection)
-        self.tasks = TaskRepository(self.connection)
-        self.assignments = AssignmentRepository(self.connection)
+        self.storage = storage
+        self.players = storage.players
+        self.tasks = storage.tasks
+        self.assignments = storage.assignments
+        self.buckets = storage.buckets
+        self.events = storage.events
+        self.renders = RenderCache()
+        self.storage.add_rollback_listener(self.renders.invalidate)
+        # Outputs rendered from a snapshot must not outlive a batch of writes that was not committed yet
+        self.storage.add_commit_listener(self.renders.invalidate)
+        self.task_listeners = []  # Functions called with each added task
+        self.release_listeners = []  # Functions called with each task which is no longer assigned
         self.commands_dict = self.commands()
 
-    def perform_upgrade(self):
-        upgrade = Upgrade(self.connection)
-        upgrade.detect_initial_state()
-        (status, msg) = upgrade.perform_upgrade()
-        if status is False:
-            raise ValueError("Error while performing data model upgrade: " + msg)
-
     def commands(self):
         """
         Each method listed in the below ordered dict must have the following arguments is that exact order:
         (self, player_id, argument)
+        The argument is parsed once by the parser of the command if any, see arguments.py.
 
-        :return: A dict of commands and their associated method and description.
+        :return: A dict of commands and their associated method, description and optional argument parser.
         """
 
         c = collections.OrderedDict()
-        c["!join"] = (self.join, "To register your username as a player in da game, `!join &lt;user name&gt;`")
+        c["!join"] = (self.join, "To register your username as a player in da game, `!join &lt;user name&gt;`",
+                      arguments.name_from)
         c["!leave"] = (self.leave, "To leave the game, `!leave`")
         c["!add"] = (self.add_task, "Will add a new task to the backlog to earn points, which can then be taken "
-                                    "by a player, `!add &lt;points&gt; &lt;description&gt;`")
-        c["!take"] = (self.take_task, "You are taking this task, your score will increase, `!take &lt;task id&gt;`")
+                                    "by a player, `!add &lt;points&gt; &lt;description&gt;`", self.new_task_from)
+        c["!take"] = (self.take_task, "You are taking this task, your score will increase, `!take &lt;task id&gt;`",
+                      arguments.task_id_from)
         c["!roulette"] = (self.assign_with_weighted_random, "The universe will assign this task to someone "
-                                                            "(weighted random)! `!roulette &lt;task id&gt;`")
-        c["!drop"] = (self.drop_task, "You are dropping this task, your score will decrease, `!drop &lt;task id&gt;`")
+                                                            "(weighted random)! `!roulette &lt;task id&gt;`",
+                          arguments.task_id_from)
+        c["!drop"] = (self.drop_task, "You are dropping this task, your score will decrease, `!drop &lt;task id&gt;`",
+                      arguments.task_id_from)
         c["!close"] = (self.close_task, "This removes the task from the backlog, no effect on scores, "
-                                        "`!close &lt;task id&gt;`")
-        c["!score"] = (self.list_high_scores, "Will print the high scores, `!score` or `!scores`")
+                                        "`!close &lt;task id&gt;`", arguments.task_id_from)
+        c["!score"] = (self.list_high_scores, "Will print the high scores, of all time or of a period, "
+                                              "`!score [week|month|since &lt;yyyy-mm-dd&gt;] [page]` "
+                                              "or `!scores ...`", arguments.score_from)
         c["!scores"] = c["!score"]
-        c["!tasks"] = (self.list_tasks, "Will print the opened tasks, `!tasks`")
+        c["!tasks"] = (self.list_tasks, "Will print the opened tasks, `!tasks [page]`", arguments.tasks_page_from)
         c["!admin:reset"] = (self.reset_all_scores, "Will reset all scores to 0! Can only be performed by an admin, "
                                                     "`!admin:reset`")
         c["!help"] = (self.help, "Prints the list of commands")
         return c
 
     def close(self):
-        self.connection.close()
+        self.storage.close()
+
+    def runs_on_snapshot(self, command_func):
+        """
+        :param command_func: A function of the commands dict.
+        :return: True if the command only reads the game, and can run on a snapshot without holding the lock.
+        """
+
+        if not self.storage.has_snapshots():
+            return False
+
+        return command_func in (self.list_tasks, self.list_high_scores, self.help)
+
+    def snapshot(self):
+        """
+        :return: A context manager giving a tuple (tasks, players, buckets) of repositories to read from,
+        on a read-only connection if the storage has some.
+        """
+
+        return self.storage.snapshot()
+
+    def wait_durable(self):
+        """
+        Blocks until the writes of the last command executed by the calling thread are committed.
+        Must be called after releasing the game lock.
+
+        :return: void
+        """
+
+        self.storage.wait_durable()
+
+    def take_query_time(self):
+        """
+        :return: The seconds spent in the database by the calling thread since the previous call.
+        """
+
+        return self.storage.query_timer.take()
+
+    def trace_queries(self):
+        """
+        :return: A context manager giving the list of the queries executed by the calling thread in its block.
+        """
+
+        return self.storage.query_timer.trace()
+
+    def unit_of_work(self):
+        """
+        Runs the statements of a compound command in a single transaction, committed once at the end.
+
+        :return: A context manager, rolling back all the statements if an error is raised.
+        """
+
+        return self.storage.unit_of_work()
+
+    @contextmanager
+    def refreshed(self):
+        """
+        Runs a command on the latest state of the game, must be entered with the game lock held.
+
+        When other bot processes share the storage, the whole command is a unit of work, in which the
+        in-memory state is dropped first if they modified the game: their writes wait until it ends.
+        Otherwise the state kept in memory is always the latest one, and nothing is done.
+        """
+
+        if not self.storage.is_shared():
+            yield
+            return
+
+        with self.unit_of_work():
+            self.refresh()
+            yield
+
+    def refresh(self):
+        """
+        Drops the state kept in memory if other bot processes modified the game, see Storage.refresh().
+
+        :return: void
+        """
 
+        if self.storage.refresh():
+            self.renders.invalidate()
+
+    @refreshed_command
     def join(self, player_id, argument):
         """
         Inserts a new player.
 
         :param player_id: Unique id of the caller that will be registered.
-        :param argument: Desired user name for the player.
+        :param argument: Desired user name for the player, or its NameArgument.
         :return: A tuple, (success:boolean, msg:string)
         """
 
         header = self.header(player_id)
 
-        if self.check_not_empty(argument) is False:
-            return False, header + "you have to provide a user name: `!join &lt;user name&gt;`"
-
-        if self.players.validate_name_format(argument) is False:
-            return False, header + self.players.invalid_name_message()
+        argument = arguments.name_from(argument)
+        if argument.error:
+            return False, header + argument.error
 
         if self.players.get_by_id(player_id) is not None:
             return False, header + "you are already registered"
 
-        if self.players.name_exists(argument):
+        if self.players.name_exists(argument.name):
             return False, header + "someone is already registered with that name"
 
-        self.players.add(Player(player_id, argument))
-        return True, header + "you are now registered as *" + argument + "*"
+        with self.unit_of_work():
+            self.players.add(Player(player_id, argument.name))
+            self.events.append(events.JOIN, player_id, data=argument.name)
 
+        self.renders.invalidate()
+        return True, header + "you are now registered as *" + argument.name + "*"
+
+    @refreshed_command
     def leave(self, player_id, argument=None):
         """
         Deletes a player and its assignments.
@@ -126,20 +259,26 @@ class Game(object):
         if self.players.get_by_id(player_id) is None:
             return False, "you have to register first: `!join &lt;user name&gt;`"
 
-        self.players.remove(player_id)
-
-        for task_id, assignee_id in list(self.assignments.list().items()):
-            if assignee_id == player_id:
-                self.assignments.remove(task_id)
-
+        with self.unit_of_work():
+            # Read in the unit of work, so that no task can be assigned to the player before the removal
+            released = self.tasks.assigned_to(player_id) if len(self.release_listeners) > 0 else []
+            self.players.remove(player_id)
+            self.assignments.remove_all_of(player_id)
+            self.buckets.remove_all_of(player_id)
+            self.events.append(events.LEAVE, player_id)
+
+        self.renders.invalidate()
+        for task in released:
+            self.release(task)
         return True, header + "you are now unregistered."
 
+    @refreshed_command
     def add_task(self, player_id, argument):
         """
         Inserts a new task in the backlog.
 
         :param player_id: Unique id of the player inserting a new task in the backlog.
-        :param argument: String containing parameters (points, description).
+        :param argument: String containing parameters (points, description), or its NewTaskArgument.
         :return: A tuple, (success:boolean, msg:string)
         """
 
@@ -149,29 +288,45 @@ class Game(object):
         if player is None:
             return False, msg
 
-        max_task_points = None
-        if self.config is not None:
-            max_task_points = self.config.max_task_points()
+        argument = self.new_task_from(argument)
+        if argument.error:
+            return False, header + argument.error
 
-        (points, msg) = self.tasks.points_from(argument, max_task_points)
-        if points is None:
-            return False, header + msg + ", usage: `!add &lt;points&gt; &lt;description&gt;`"
+        (points, description) = (argument.points, argument.description)
+        task = Task(description, points)
+        with self.unit_of_work():
+            task_id = self.tasks.insert(task)
+            self.events.append(events.ADD, player_id, task_id, points, description)
 
-        if len(argument.split(None, 1)) == 2:
-            description = self.tasks.remove_trailing_quotes(argument.split(None, 1)[1])
-        else:
-            return False, header + "invalid arguments: `!add &lt;points&gt; &lt;description&gt;`"
+        task.uid = task_id
+        self.renders.invalidate()
+        for listener in self.task_listeners:
+            listener(task)
 
-        task_id = self.tasks.insert(Task(description, points))
         return True, header + "new task *'" + description + "'*, added with id *" + str(task_id) + "* for *" + str(
             points) + "* point(s)!\nYou can take it by saying: `!take " + str(task_id) + "`"
 
+    def new_task_from(self, argument):
+        """
+        Parser of the argument of !add, bounded by the configured maximum points of a task.
+
+        :param argument: A NewTaskArgument, or the argument of !add to parse.
+        :return: A NewTaskArgument.
+        """
+
+        max_task_points = None
+        if self.config is not None:
+            max_task_points = self.config.max_task_points()
+
+        return arguments.new_task_from(argument, max_task_points)
+
+    @refreshed_command
     def take_task(self, player_id, argument):
         """
         Assigns a task to the caller, and increase its score.
 
         :param player_id: Unique id of the caller.
-        :param argument: The task id.
+        :param argument: The task id, or its TaskIdArgument.
         :return: A tuple, (success:boolean, msg:string)
         """
 
@@ -181,19 +336,20 @@ class Game(object):
         if player is None:
             return False, msg
 
-        (task, msg) = self.tasks.validate_task(argument)
+        (task, msg) = self.task_from(argument)
         if task is None:
             return False, header + msg
 
         return self.assign_and_update_score(player_id, task)
 
+    @refreshed_command
     def drop_task(self, player_id, argument):
         """
         Un-assigns a task owned by the caller.
         If the caller is admin, he can invoke this command for task he does not own.
 
         :param player_id: Unique id of the caller.
-        :param argument: The task id.
+        :param argument: The task id, or its TaskIdArgument.
         :return: A tuple, (success:boolean, msg:string)
         """
 
@@ -203,7 +359,7 @@ class Game(object):
         if player is None:
             return False, msg
 
-        (task, msg) = self.tasks.validate_task(argument)
+        (task, msg) = self.task_from(argument)
         if task is None:
             return False, msg
 
@@ -219,18 +375,35 @@ class Game(object):
         else:
             cause = "\nAdmin player <@" + player_id + "> cancelled your assignment."
 
-        self.assignments.remove(task.uid)
-        player = self.players.update_points(player_id, -task.points)
+        with self.unit_of_work():
+            self.assignments.remove(task.uid)
+            previous = player.points
+            player = self.players.update_points(player_id, -task.points)
+            # The score is floored at 0, the buckets lose the points actually taken from it
+            if player.points != previous:
+                self.buckets.add(player_id, player.points - previous)
+            self.events.append(events.DROP, player_id, task.uid, task.points)
+
+        self.renders.invalidate()
+        self.release(task)
         return True, header + "you are not assigned to this task anymore, " \
                               "your new score is *" + str(player.points) + "* point(s)." + cause
 
+    def release(self, task):
+        if task is None:
+            return
+
+        for listener in self.release_listeners:
+            listener(task)
+
+    @refreshed_command
     def assign_with_weighted_random(self, player_id, argument):
         """
         Randomly chose player and assigns the given task to him.
         A weighted random algorithm is used to increase the probability to pick a player with a low score.
 
         :param player_id: Unique id of the caller.
-        :param argument: The task id to be randomly assigned.
+        :param argument: The task id to be randomly assigned, or its TaskIdArgument.
         :return: A tuple, (success:boolean, msg:string)
         """
 
@@ -238,7 +411,7 @@ class Game(object):
         if player is None:
             return False, msg
 
-        (task, msg) = self.tasks.validate_task(argument)
+        (task, msg) = self.task_from(argument)
         if task is None:
             return False, msg
 
@@ -251,12 +424,42 @@ class Game(object):
                                             ":game_die: *The universe has spoken, "
                                             "congrats <@" + assignee.player_id + ">!*\n")
 
+    @refreshed_command
+    def auto_assign(self, task_id, period=TASK_ASSIGNMENT_PERIOD):
+        """
+        Assigns a task nobody took during the assignment period, using the same weighted random as the roulette.
+
+        :param task_id: The task id.
+        :param period: Seconds after which a task is assigned.
+        :return: A tuple, (success:boolean, msg:string)
+        """
+
+        task = self.tasks.get(task_id)
+        if task is None:
+            return False, "this task does not exist."
+
+        if self.assignments.user_of_task(task.uid) is not None:
+            return False, "a player is already assigned to this task."
+
+        if not task.has_expired(period):
+            return False, "this task can still be taken."
+
+        assignee = self.players.pick_random_user()
+        if assignee is None:
+            return False, "no player to assign this task to."
+
+        return self.assign_and_update_score(assignee.player_id, task,
+                                            ":alarm_clock: *Nobody took task " + str(task.uid) +
+                                            " in time, the universe has spoken, congrats <@" +
+                                            assignee.player_id + ">!*\n")
+
+    @refreshed_command
     def close_task(self, player_id, argument):
         """
         Removes a task from the backlog, scores are not updated.
 
         :param player_id: Unique id of the caller.
-        :param argument: The task id.
+        :param argument: The task id, or its TaskIdArgument.
         :return: A tuple, (success:boolean, msg:string)
         """
 
@@ -266,72 +469,157 @@ class Game(object):
         if player is None:
             return False, msg
 
-        (task, msg) = self.tasks.validate_task(argument)
+        (task, msg) = self.task_from(argument)
         if task is None:
             return False, msg
 
-        self.assignments.remove(task.uid)
-        self.tasks.remove(task.uid)
+        with self.unit_of_work():
+            self.assignments.remove(task.uid)
+            self.tasks.remove(task.uid)
+            self.events.append(events.CLOSE, player_id, task.uid)
+
+        self.renders.invalidate()
         # @formatter:off
         return True, header + "the task *" + str(task.uid) + "*, *" + task.description + \
                               "* has been closed by *" + player.name + "*."
         # @formatter:on
 
+    @refreshed_query
     def list_tasks(self, player_id=None, argument=None):
         """
-        Lists all tasks and assignments.
+        Lists a page of tasks and assignments.
 
         :param player_id: Ignored: Necessary to be able to use a dict of commands.
-        :param argument: Ignored: Necessary to be able to use a dict of commands.
+        :param argument: Optional page number, the first page is listed by default, or its PageArgument.
         :return: A tuple, (success:boolean, msg:string)
         """
 
-        pending = self.tasks.pending()
-        assignments = self.assignments.list()
+        argument = arguments.tasks_page_from(argument)
+        if argument.error:
+            return False, argument.error
+
+        return self.render_cached(("!tasks", argument.page), self.render_tasks, argument.page)
+
+    def render_tasks(self, page):
+        with self.snapshot() as (tasks, players, buckets):
+            count = tasks.count()
+            if count == 0:
+                return True, "No pending task."
+
+            pages = self.page_count(count)
+            if page > pages:
+                return False, "there are only " + str(pages) + " page(s) of tasks."
+
+            pending = tasks.pending_with_assignees(PAGE_SIZE, (page - 1) * PAGE_SIZE)
 
-        if len(pending) is 0:
-            return True, "No pending task."
+        header = ":pushpin: *" + str(count) + " pending tasks*"
+        if pages > 1:
+            header += " (" + self.page_label(page, pages) + ")"
 
-        out = ":pushpin: *" + str(len(pending)) + " pending tasks*:\n"
-        for task in pending:
+        out = [header + ":\n"]
+        for task, assignee_name in pending:
             icon = ":white_square:"
             assigned = "`!take " + str(task.uid) + "`"
 
-            player_id = assignments.get(task.uid)
-            if player_id is not None:
-                assigned = ":point_right: *" + self.players.get_by_id(player_id).name + "*"
+            if assignee_name is not None:
+                assigned = ":point_right: *" + assignee_name + "*"
                 icon = ":heavy_check_mark:"
 
-            out += "> " + icon + " [*" + str(task.uid) + "*] *" + task.description + "* [*" + str(
-                task.points) + "* points] " + assigned + "\n"
+            out.append("> " + icon + " [*" + str(task.uid) + "*] *" + task.description + "* [*" + str(
+                task.points) + "* points] " + assigned + "\n")
 
-        return True, out
+        out.append(self.page_footer("!tasks", page, pages))
+        return True, "".join(out)
 
+    @refreshed_query
     def list_high_scores(self, player_id=None, argument=None):
         """
-        Lists all scores.
+        Lists a page of scores, of all time or of the points earned during a period.
 
         :param player_id: Ignored: Necessary to be able to use a dict of commands.
-        :param argument: Ignored: Necessary to be able to use a dict of commands.
+        :param argument: Optional period (week, month or since &lt;yyyy-mm-dd&gt;), then optional page number,
+        the first page is listed by default, or its ScoreArgument.
         :return: A tuple, (success:boolean, msg:string)
         """
 
-        scores = self.players.scores()
+        argument = arguments.score_from(argument)
+        if argument.error:
+            return False, argument.error
+
+        (window, page) = (argument.window, argument.page)
+        if window is None:
+            return self.render_cached(("!score", page), self.render_high_scores, page)
+
+        (first_day, label, command) = window
+        return self.render_cached((command, first_day, page), self.render_window_scores, first_day, label, command,
+                                  page)
+
+    def render_high_scores(self, page):
+        # With read-only connections, the page is read by the PLAYER(points) index rather than from the in-memory
+        # leaderboard, which would need the lock: !score must not wait for the writes in progress
+        with self.snapshot() as (tasks, players, buckets):
+            count = players.count()
+            if count == 0:
+                return True, "No scores yet."
+
+            pages = self.page_count(count)
+            if page > pages:
+                return False, "there are only " + str(pages) + " page(s) of scores."
+
+            offset = (page - 1) * PAGE_SIZE
+            scores = players.scores(PAGE_SIZE, offset)
+
+            # Ex-aequo players share a place, only the first places are awarded a medal
+            place = 1
+            if offset > 0:
+                place = players.place_of(scores[0].points, MEDALS_COUNT + 1)
+
+            players_count = str(count) + " players"
+            if pages > 1:
+                players_count += ", " + self.page_label(page, pages)
 
-        if len(scores) is 0:
-            return True, "No scores yet."
+            out = [":checkered_flag: *High scores* (" + players_count + "):\n"]
+            previous_score = None
+            for index, player in enumerate(scores):
+                place, previous_score = self.place_for_score(place, player, previous_score)
+                out.append(self.score_line(offset + index + 1, place, player))
 
-        out = ":checkered_flag: *High scores* (" + str(len(scores)) + " players):\n"
+            out.append(self.page_footer("!score", page, pages))
+            return True, "".join(out)
+
+    def render_window_scores(self, first_day, label, command, page):
+        with self.snapshot() as (tasks, players, buckets):
+            scores = buckets.scores_since(first_day)
+
+        if len(scores) == 0:
+            return True, "No scores " + label + " yet."
+
+        pages = self.page_count(len(scores))
+        if page > pages:
+            return False, "there are only " + str(pages) + " page(s) of scores " + label + "."
+
+        players_count = str(len(scores)) + " players"
+        if pages > 1:
+            players_count += ", " + self.page_label(page, pages)
+
+        out = [":checkered_flag: *High scores " + label + "* (" + players_count + "):\n"]
+        offset = (page - 1) * PAGE_SIZE
         place = 1
         previous_score = None
-        for index, player in enumerate(scores):
+        # Every player of the window is loaded, the places of the previous pages are counted here
+        for index, player in enumerate(scores[:offset + PAGE_SIZE]):
             place, previous_score = self.place_for_score(place, player, previous_score)
+            if index >= offset:
+                out.append(self.score_line(index + 1, place, player))
 
-            out += "> " + str(index + 1) + ". " + self.medal_from_place(place) + " *" + player.name + \
-                   "* (<@" + player.player_id + ">) with *" + str(player.points) + "* point(s)\n"
+        out.append(self.page_footer(command, page, pages))
+        return True, "".join(out)
 
-        return True, out
+    def score_line(self, rank, place, player):
+        return "> " + str(rank) + ". " + self.medal_from_place(place) + " *" + player.name + "* (<@" + \
+               player.player_id + ">) with *" + str(player.points) + "* point(s)\n"
 
+    @refreshed_command
     def reset_all_scores(self, player_id, argument=None):
         """
         Reset the scores of everyone to 0. player_id must be an admin to do that.
@@ -351,7 +639,12 @@ class Game(object):
             return False, header + "this action can only be performed by an admin."
 
         # Reset all scores to 0
-        self.players.reset_points(0)
+        with self.unit_of_work():
+            self.players.reset_points(0)
+            self.buckets.clear()
+            self.events.append(events.RESET, player_id, points=0)
+
+        self.renders.invalidate()
         return "True", header + " you successfully reset all player scores to 0, hope you meant to do that ¯\_(ツ)_/¯"
 
     def help(self, player_id=None, argument=None):
@@ -363,10 +656,13 @@ class Game(object):
         :return: A tuple, (success:boolean, msg:string)
         """
 
+        return self.render_cached(("!help",), self.render_help)
+
+    def render_help(self):
         out = ":robot_face: *Commands*:\n"
 
-        for command, (function, description) in list(self.commands_dict.items()):
-            out += "> *" + command + "*: " + description + "\n"
+        for command, entry in list(self.commands_dict.items()):
+            out += "> *" + command + "*: " + entry[1] + "\n"
 
         out += "\n_ GamifyBot v%s - github.com/florentw/gamify-bot _\n" % __version__
         return True, out
@@ -380,13 +676,53 @@ class Game(object):
             place += 1
         return place, previous_score
 
+    def render_cached(self, key, render, *args):
+        """
+        Serves the output of a read-only command from the render cache, or renders it if the state has changed.
+
+        :param key: Identifies the command and its arguments.
+        :param render: Function rendering the output, returning a tuple (success:boolean, msg:string).
+        :param args: Arguments of the render function.
+        :return: A tuple, (success:boolean, msg:string), failures are not cached.
+        """
+
+        if self.storage.is_shared() and self.storage.has_snapshots():
+            # Rendered without the game lock, the writes of the other processes cannot be detected
+            return render(*args)
+
+        out = self.renders.get(key)
+        if out is not None:
+            return True, out
+
+        version = self.renders.version
+        (status, out) = render(*args)
+        if status:
+            self.renders.put(version, key, out)
+
+        return status, out
+
+    @staticmethod
+    def page_count(count):
+        return (count + PAGE_SIZE - 1) // PAGE_SIZE
+
+    @staticmethod
+    def page_label(page, pages):
+        return "page " + str(page) + "/" + str(pages)
+
+    @staticmethod
+    def page_footer(command, page, pages):
+        if page == pages:
+            return ""
+
+        return "Next page: `" + command + " " + str(page + 1) + "`\n"
+
     @staticmethod
     def medal_from_place(place):
         if place == 1:
             return ":first_place_medal:"
         if place == 2:
             return ":second_place_medal:"
-        if place == 3:
+        if place == MEDALS_COUNT:
             return ":third_place_medal:"
 
         return ":white_small_square:"
@@ -399,6 +735,22 @@ class Game(object):
 
         return player, ""
 
+    def task_from(self, argument):
+        """
+        :param argument: A TaskIdArgument, or the task id to parse.
+        :return: A tuple (task, error message), the task is None if the id is invalid or the task does not exist.
+        """
+
+        argument = arguments.task_id_from(argument)
+        if argument.error:
+            return None, argument.error
+
+        task = self.tasks.get(argument.task_id)
+        if task is None:
+            return None, "this task does not exist."
+
+        return task, ""
+
     @staticmethod
     def header(player_id):
         return "<@" + player_id + ">, "
@@ -406,14 +758,19 @@ class Game(object):
     def assign_and_update_score(self, player_id, task, additional_msg=""):
         header = self.header(player_id)
 
-        assignee = self.assignments.user_of_task(task.uid)
-        if assignee == player_id:
-            return False, header + "you are already assigned to this task."
+        with self.unit_of_work():
+            assignee = self.assignments.user_of_task(task.uid)
+            if assignee == player_id:
+                return False, header + "you are already assigned to this task."
+
+            if self.assignments.assign(task.uid, player_id) is False:
+                return False, header + "a player is already assigned to this task."
 
-        if self.assignments.assign(task.uid, player_id) is False:
-            return False, header + "a player is already assigned to this task."
+            player = self.players.update_points(player_id, task.points)
+            self.buckets.add(player_id, task.points)
+            self.events.append(events.TAKE, player_id, task.uid, task.points)
 
-        player = self.players.update_points(player_id, task.points)
+        self.renders.invalidate()
         message = self.ownership_message(player, task)
         return True, header + additional_msg + message
 
@@ -422,10 +779,3 @@ class Game(object):
         return "you are taking ownership of *" + task.description + "* for " + str(task.points) + \
                " point(s).\nYour new score is *" + str(player.points) + \
                "* point(s).\nIf you want to drop it, say: `!drop " + str(task.uid) + "`"
-
-    @staticmethod
-    def check_not_empty(argument):
-        if len(argument) is 0:
-            return False
-
-        return True
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+from bisect import bisect_left, insort
+from builtins import object
+
+
+class Leaderboard(object):
+    """
+    In-memory ranking of the players, by descending points then by registration order.
+
+    The ranking is kept sorted as players are added, removed or scored:
+    reading the top k players costs O(k), an update costs a binary search plus a list insertion.
+    """
+
+    def __init__(self, rows=()):
+        self.keys = []  # Sorted list of (-points, rowid, player_id)
+        self.entries = {}  # player_id -> (rowid, name, points)
+
+        for rowid, player_id, name, points in rows:
+            self.entries[player_id] = (rowid, name, points)
+            self.keys.append((-points, rowid, player_id))
+        self.keys.sort()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, rowid, player_id, name, points):
+        self.remove(player_id)
+        self.entries[player_id] = (rowid, name, points)
+        insort(self.keys, (-points, rowid, player_id))
+
+    def remove(self, player_id):
+        entry = self.entries.pop(player_id, None)
+        if entry is None:
+            return
+
+        rowid, name, points = entry
+        del self.keys[bisect_left(self.keys, (-points, rowid, player_id))]
+
+    def set_points(self, player_id, points):
+        entry = self.entries.get(player_id)
+        if entry is None:
+            return
+
+        rowid, name, previous_points = entry
+        if points == previous_points:
+            return
+
+        del self.keys[bisect_left(self.keys, (-previous_points, rowid, player_id))]
+        self.entries[player_id] = (rowid, name, points)
+        insort(self.keys, (-points, rowid, player_id))
+
+    def set_points_for_all(self, points):
+        for player_id, (rowid, name, previous_points) in list(self.entries.items()):
+            self.entries[player_id] = (rowid, name, points)
+
+        # Everyone is ex-aequo: the registration order is the ranking
+        self.keys = sorted((-points, rowid, player_id) for player_id, (rowid, name, _) in self.entries.items())
+
+    def place_of(self, points, max_place=None):
+        """
+        Computes the place of a score, ex-aequo players sharing the same place.
+
+        :param points: The score.
+        :param max_place: The search stops at this place, so that only the first places are walked through.
+        :return: 1 + the number of distinct scores greater than the given one, capped to max_place.
+        """
+
+        place = 1
+        index = 0
+        while index < len(self.keys) and -self.keys[index][0] > points:
+            place += 1
+            if max_place is not None and place >= max_place:
+                return max_place
+
+            index = bisect_left(self.keys, (self.keys[index][0] + 1,))  # Jump to the next distinct score
+
+        return place
+
+    def top(self, limit=None, offset=0):
+        """
+        :param limit: Maximum number of players to return, all remaining players when None.
+        :param offset: Number of best players to skip.
+        :return: A list of rows (player_id, name, points), by descending points.
+        """
+
+        end = None
+        if limit is not None:
+            end = offset + limit
+
+        rows = []
+        for negative_points, rowid, player_id in self.keys[offset:end]:
+            rows.append((player_id, self.entries[player_id][1], -negative_points))
+
+        return rows
@@ -0,0 +1,399 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+In-memory storage backend: the game is kept in dicts and sorted indexes, without any I/O.
+It is meant for tests, simulations and benchmarks, the game is lost when the process ends.
+"""
+from __future__ import absolute_import
+
+import time
+from bisect import bisect_left, insort
+from builtins import object
+from contextlib import contextmanager
+
+from .assignment import AssignmentRepository
+from .buckets import ScoreBuckets, DAY, MONTH, buckets_since, day_of, month_of
+from .events import EventLog, DEFAULT_SNAPSHOT_INTERVAL
+from .leaderboard import Leaderboard
+from .player import PlayerRepository, Player
+from .roulette import Roulette
+from .storage import Storage
+from .task import TaskRepository, Task
+
+
+class UndoLog(object):
+    """
+    Records how to undo the writes of the unit of work in progress.
+    Nested units of work are merged into the outer one, as with SQLite.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.undo = []
+        self.rollback_listeners = []
+
+    def record(self, undo):
+        if self.depth > 0:
+            self.undo.append(undo)
+
+    @contextmanager
+    def unit_of_work(self):
+        self.depth += 1
+        try:
+            yield self
+        except BaseException:
+            self.depth -= 1
+            if self.depth == 0:
+                self.rollback()
+            raise
+
+        self.depth -= 1
+        if self.depth == 0:
+            self.undo = []
+
+    def rollback(self):
+        undo = self.undo
+        self.undo = []
+        for function in reversed(undo):
+            function()
+
+        for listener in self.rollback_listeners:
+            listener()
+
+
+class MemoryPlayerRepository(PlayerRepository):
+    """
+    Players are kept in the leaderboard, which is also their ranking, and indexed by lower case name.
+    Shares the name validation of PlayerRepository.
+    """
+
+    def __init__(self, log):
+        self.log = log
+        self.leaderboard = Leaderboard()
+        self.roulette = Roulette()
+        self.names = {}  # Lower case name -> player_id
+        self.next_rowid = 1
+
+    def invalidate(self, player_id=None):
+        pass  # Nothing is derived from another store
+
+    def get_by_id(self, player_id):
+        entry = self.leaderboard.entries.get(player_id)
+        if entry is None:
+            return None
+
+        rowid, name, points = entry
+        return Player(player_id, name, points)
+
+    def name_exists(self, name):
+        player_id = self.names.get(name.lower())
+        if player_id is None:
+            return None
+
+        return self.get_by_id(player_id)
+
+    def add(self, player, rowid=None):
+        if player.player_id in self.leaderboard.entries:
+            return False
+
+        if rowid is None:
+            rowid = self.next_rowid
+            self.next_rowid += 1
+
+        self.leaderboard.add(rowid, player.player_id, player.name, player.points)
+        self.roulette.add(player.player_id, player.points)
+        self.names[player.name.lower()] = player.player_id
+        self.log.record(lambda: self.remove(player.player_id))
+        return True
+
+    def remove(self, player_id):
+        entry = self.leaderboard.entries.get(player_id)
+        if entry is None:
+            return False
+
+        rowid, name, points = entry
+        self.leaderboard.remove(player_id)
+        self.roulette.remove(player_id)
+        del self.names[name.lower()]
+        self.log.record(lambda: self.add(Player(player_id, name, points), rowid))
+        return True
+
+    def set_points_for_all(self, points):
+        previous = [(player_id, entry[2]) for player_id, entry in self.leaderboard.entries.items()]
+
+        self.leaderboard.set_points_for_all(points)
+        self.roulette = Roulette((player_id, points) for player_id, _ in previous)
+        self.log.record(lambda: [self.set_points_for(player_id, old) for player_id, old in previous])
+
+    def set_points_for(self, player_id, points):
+        entry = self.leaderboard.entries.get(player_id)
+        if entry is None:
+            return
+
+        self.leaderboard.set_points(player_id, points)
+        self.roulette.set_points(player_id, points)
+        self.log.record(lambda: self.set_points_for(player_id, entry[2]))
+
+    def load_leaderboard(self):
+        return self.leaderboard
+
+    def pick_random_user(self):
+        player_id = self.roulette.pick()
+        if player_id is None:
+            return None
+
+        return self.get_by_id(player_id)
+
+
+class MemoryTaskRepository(TaskRepository):
+    """
+    Tasks are kept by id, and indexed by insertion time for the age queries.
+    Shares the argument parsing and validation of TaskRepository.
+    """
+
+    def __init__(self, log, assignments, players):
+        self.log = log
+        self.assignments = assignments
+        self.players = players
+        self.rows = {}  # id -> (inserted, points, description)
+        self.ids = []  # Sorted ids
+        self.by_inserted = []  # Sorted list of (inserted, id)
+        self.next_id = 1
+
+    def get(self, uid):
+        row = self.rows.get(uid)
+        if row is None:
+            return None
+
+        inserted, points, description = row
+        return Task(description, points, inserted, uid)
+
+    def insert(self, task, uid=None):
+        if uid is None:
+            uid = self.next_id
+        self.next_id = max(self.next_id, uid + 1)
+
+        self.rows[uid] = (task.timestamp, task.points, task.description)
+        insort(self.ids, uid)
+        insort(self.by_inserted, (task.timestamp, uid))
+        self.log.record(lambda: self.remove(uid))
+        return uid
+
+    def remove(self, uid):
+        row = self.rows.pop(uid, None)
+        if row is None:
+            return
+
+        del self.ids[bisect_left(self.ids, uid)]
+        del self.by_inserted[bisect_left(self.by_inserted, (row[0], uid))]
+        self.log.record(lambda: self.insert(Task(row[2], row[1], row[0]), uid))
+
+    def pending(self):
+        return [self.get(uid) for uid in self.ids]
+
+    def count(self):
+        return len(self.rows)
+
+    def pending_with_assignees(self, limit=None, offset=0):
+        end = None
+        if limit is not None:
+            end = offset + limit
+
+        pending = []
+        for uid in self.ids[offset:end]:
+            assignee_name = None
+            assignee = self.players.get_by_id(self.assignments.user_of_task(uid))
+            if assignee is not None:
+                assignee_name = assignee.name
+            pending.append((self.get(uid), assignee_name))
+
+        return pending
+
+    def unassigned(self):
+        return [self.get(uid) for inserted, uid in self.by_inserted if self.assignments.user_of_task(uid) is None]
+
+    def assigned_to(self, player_id):
+        tasks = [self.get(uid) for uid in self.assignments.by_player.get(player_id, ())]
+        return sorted(tasks, key=lambda task: (task.timestamp, task.uid))
+
+    def oldest(self, limit):
+        return [self.get(uid) for inserted, uid in self.by_inserted[:limit]]
+
+    def inserted_before(self, timestamp):
+        end = bisect_left(self.by_inserted, (timestamp,))
+        return [self.get(uid) for inserted, uid in self.by_inserted[:end]]
+
+    def older_than(self, seconds):
+        return self.inserted_before(time.time() - seconds)
+
+
+class MemoryAssignmentRepository(AssignmentRepository):
+    """
+    Assignments are kept by task, and indexed by player.
+    """
+
+    def __init__(self, log):
+        self.log = log
+        self.by_task = {}  # task_id -> player_id
+        self.by_player = {}  # player_id -> set of task ids
+
+    def assign(self, task_id, player_id):
+        if task_id in self.by_task:
+            return False
+
+        self.by_task[task_id] = player_id
+        self.by_player.setdefault(player_id, set()).add(task_id)
+        self.log.record(lambda: self.remove(task_id))
+        return True
+
+    def remove(self, task_id):
+        player_id = self.by_task.pop(task_id, None)
+        if player_id is None:
+            return
+
+        tasks = self.by_player[player_id]
+        tasks.discard(task_id)
+        if len(tasks) == 0:
+            del self.by_player[player_id]
+        self.log.record(lambda: self.assign(task_id, player_id))
+
+    def remove_all_of(self, player_id):
+        tasks = list(self.by_player.get(player_id, ()))
+        for task_id in tasks:
+            self.remove(task_id)
+
+        return len(tasks)
+
+    def user_of_task(self, task_id):
+        return self.by_task.get(task_id)
+
+    def list(self):
+        return dict(self.by_task)
+
+
+class MemoryScoreBuckets(ScoreBuckets):
+    """
+    Points are kept by bucket, then by player.
+    """
+
+    def __init__(self, log, players):
+        self.log = log
+        self.players = players
+        self.buckets = {}  # (size, bucket) -> dict player_id -> points
+
+    def add(self, player_id, points, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+
+        day = day_of(timestamp)
+        for key in ((DAY, day), (MONTH, month_of(day))):
+            self.add_to_bucket(key, player_id, points)
+
+    def add_to_bucket(self, key, player_id, points):
+        scores = self.buckets.setdefault(key, {})
+        scores[player_id] = scores.get(player_id, 0) + points
+        self.log.record(lambda: self.add_to_bucket(key, player_id, -points))
+
+    def remove_all_of(self, player_id):
+        for key, scores in list(self.buckets.items()):
+            points = scores.pop(player_id, None)
+            if points is not None:
+                self.log.record(lambda key=key, points=points: self.add_to_bucket(key, player_id, points))
+
+    def clear(self):
+        buckets = self.buckets
+        self.buckets = {}
+        self.log.record(lambda: self.restore(buckets))
+
+    def restore(self, buckets):
+        self.buckets = buckets
+
+    def scores_since(self, first_day):
+        (first_day, end_day, first_month) = buckets_since(first_day)
+
+        window = {}
+        for (size, bucket), scores in self.buckets.items():
+            if (size == DAY and first_day <= bucket < end_day) or (size == MONTH and bucket >= first_month):
+                for player_id, points in scores.items():
+                    window[player_id] = window.get(player_id, 0) + points
+
+        ranked = []
+        for player_id, points in window.items():
+            entry = self.players.leaderboard.entries.get(player_id)
+            if entry is not None:
+                rowid, name, _ = entry
+                ranked.append((-points, rowid, Player(player_id, name, points)))
+
+        return [player for _, _, player in sorted(ranked, key=lambda row: row[:2])]
+
+
+class MemoryEventLog(EventLog):
+    """
+    Events and snapshots are kept in lists.
+    """
+
+    def __init__(self, log, interval=DEFAULT_SNAPSHOT_INTERVAL):
+        self.log = log
+        self.interval = interval
+        self.events = []  # Tuples (event_id, time, kind, player_id, task_id, points, data)
+        self.snapshots = [(0, {})]  # Tuples (event_id, scores)
+        self.scores = None
+        self.last_event_id = 0
+        self.snapshot_event_id = 0
+
+    def commit(self):
+        pass
+
+    def ensure_baseline(self):
+        pass
+
+    def insert_event(self, event):
+        event_id = len(self.events) + 1
+        self.events.append((event_id,) + event)
+        self.log.record(self.undo_event)
+        return event_id
+
+    def undo_event(self):
+        self.events.pop()
+        while self.snapshots[-1][0] > len(self.events):
+            self.snapshots.pop()
+        self.invalidate()
+
+    def save_snapshot(self, event_id, scores):
+        self.snapshots.append((event_id, dict(scores)))
+
+    def last_snapshot(self):
+        (event_id, scores) = self.snapshots[-1]
+        return event_id, dict(scores)
+
+    def events_after(self, event_id):
+        return [(event[0], event[2], event[3], event[5]) for event in self.events[event_id:]]
+
+    def history(self, player_id=None, limit=None):
+        events = [event for event in self.events if player_id is None or event[3] == player_id]
+        if limit is not None:
+            events = events[len(events) - limit:] if limit > 0 else []
+        return events
+
+
+class MemoryStorage(Storage):
+    """
+    Writes are visible right away, and undone if the unit of work they belong to raises.
+    The access to the repositories must be serialized by the game lock.
+    """
+
+    def __init__(self):
+        super(MemoryStorage, self).__init__()
+        self.log = UndoLog()
+        self.assignments = MemoryAssignmentRepository(self.log)
+        self.players = MemoryPlayerRepository(self.log)
+        self.tasks = MemoryTaskRepository(self.log, self.assignments, self.players)
+        self.buckets = MemoryScoreBuckets(self.log, self.players)
+        self.events = MemoryEventLog(self.log)
+
+    def unit_of_work(self):
+        return self.log.unit_of_work()
+
+    def add_rollback_listener(self, listener):
+        self.log.rollback_listeners.append(listener)
@@ -2,10 +2,13 @@
 # coding=utf-8
 from __future__ import division
 
+import collections
 import re
 from builtins import object
 from builtins import str
-from random import randint
+
+from .leaderboard import Leaderboard
+from .roulette import Roulette
 
 MIN_USER_NAME_LEN = 2
 
@@ -27,12 +30,77 @@ class Player(object):
         return self.player_id in admin_list
 
 
+class PlayerCache(object):
+    """
+    Bounded cache of players keyed by id, the least recently used entries are evicted first.
+    Unknown players are cached too, so that commands of unregistered users do not hit the database.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.entries = collections.OrderedDict()  # player_id -> (name, points), or None for an unknown player
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, player_id):
+        """
+        :return: A tuple (found:boolean, player:Player), player is None for a cached unknown player.
+        """
+
+        if player_id not in self.entries:
+            self.misses += 1
+            return False, None
+
+        self.hits += 1
+        entry = self.entries.pop(player_id)
+        self.entries[player_id] = entry
+
+        if entry is None:
+            return True, None
+
+        name, points = entry
+        return True, Player(player_id, name, points)
+
+    def put(self, player_id, player):
+        self.entries.pop(player_id, None)
+        if player is None:
+            self.entries[player_id] = None
+        else:
+            self.entries[player_id] = (player.name, player.points)
+
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def set_points(self, player_id, points):
+        entry = self.entries.get(player_id)
+        if entry is not None:
+            self.entries[player_id] = (entry[0], points)
+
+    def set_points_for_all(self, points):
+        for player_id, entry in list(self.entries.items()):
+            if entry is not None:
+                self.entries[player_id] = (entry[0], points)
+
+    def evict(self, player_id):
+        self.entries.pop(player_id, None)
+
+    def clear(self):
+        self.entries.clear()
+
+
 class PlayerRepository(object):
     """
     This class is responsible for the storage and querying of players.
+
+    An optional write-through cache of players, the leaderboard loaded by the first call to scores(),
+    and the roulette loaded by the first call to pick_random_user(), are kept up to date by the writes
+    of this repository.
+
+    The leaderboard serves !score when the database has no read-only connections (db.readers: 0),
+    otherwise !score reads a snapshot (see connections.PlayerScores) and the leaderboard is never loaded.
     """
 
-    def __init__(self, connection):
+    def __init__(self, connection, cache_size=0):
         self.con = connection
 
         cursor = self.con.cursor()
@@ -40,26 +108,70 @@ class PlayerRepository(object):
                        "id TEXT PRIMARY KEY NOT NULL, "
                        "name TEXT NOT NULL UNIQUE, "
                        "points INTEGER NOT NULL)")
+        self.create_indexes(cursor)
         self.con.commit()
 
+        self.leaderboard = None
+        self.roulette = None
+        self.cache = None
+        if cache_size > 0:
+            self.cache = PlayerCache(cache_size)
+
+        if hasattr(self.con, "add_rollback_listener"):
+            self.con.add_rollback_listener(self.invalidate)
+
+    @staticmethod
+    def create_indexes(cursor):
+        # Names are compared without case, the leaderboard is loaded by descending points
+        cursor.execute("CREATE INDEX IF NOT EXISTS PLAYER_NAME_NOCASE ON PLAYER(name COLLATE NOCASE)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS PLAYER_POINTS ON PLAYER(points DESC)")
+
+    def invalidate(self, player_id=None):
+        """
+        Drops cached players, the leaderboard and the roulette,
+        must be called when the PLAYER table is modified without using this repository.
+
+        :param player_id: The player to drop, all players are dropped when None.
+        :return: void
+        """
+
+        self.leaderboard = None
+        self.roulette = None
+        if self.cache is None:
+            return
+
+        if player_id is None:
+            self.cache.clear()
+        else:
+            self.cache.evict(player_id)
+
     @staticmethod
     def player_from_row(row):
         player_id, name, points = row
         return Player(player_id, name, points)
 
     def get_by_id(self, player_id):
+        if self.cache is not None:
+            (found, player) = self.cache.get(player_id)
+            if found:
+                return player
+
         cursor = self.con.cursor()
         cursor.execute("SELECT * FROM PLAYER WHERE id=?", (player_id,))
         row = cursor.fetchone()
 
-        if row is None:
-            return None
+        player = None
+        if row is not None:
+            player = self.player_from_row(row)
 
-        return self.player_from_row(row)
+        if self.cache is not None:
+            self.cache.put(player_id, player)
+
+        return player
 
     def name_exists(self, name):
         cursor = self.con.cursor()
-        cursor.execute("SELECT * FROM PLAYER WHERE name LIKE ?", (name,))
+        cursor.execute("SELECT * FROM PLAYER WHERE name=? COLLATE NOCASE", (name,))
         row = cursor.fetchone()
 
         if row is None:
@@ -75,6 +187,13 @@ class PlayerRepository(object):
         cursor.execute("INSERT INTO PLAYER(id, name, points) VALUES (?,?,?)",
                        (player.player_id, player.name, player.points))
         self.con.commit()
+
+        if self.leaderboard is not None:
+            self.leaderboard.add(cursor.lastrowid, player.player_id, player.name, player.points)
+        if self.roulette is not None:
+            self.roulette.add(player.player_id, player.points)
+        if self.cache is not None:
+            self.cache.put(player.player_id, player)
         return True
 
     def remove(self, player_id):
@@ -84,6 +203,13 @@ class PlayerRepository(object):
         cursor = self.con.cursor()
         cursor.execute("DELETE FROM PLAYER WHERE id=?", (player_id,))
         self.con.commit()
+
+        if self.leaderboard is not None:
+            self.leaderboard.remove(player_id)
+        if self.roulette is not None:
+            self.roulette.remove(player_id)
+        if self.cache is not None:
+            self.cache.put(player_id, None)
         return True
 
     def reset_points(self, points, player_id=None):
@@ -114,49 +240,71 @@ class PlayerRepository(object):
         cursor.execute("UPDATE PLAYER SET points=?", (points,))
         self.con.commit()
 
+        if self.leaderboard is not None:
+            self.leaderboard.set_points_for_all(points)
+        if self.roulette is not None:
+            self.roulette = Roulette((player_id, points) for player_id in list(self.roulette.slots))
+        if self.cache is not None:
+            self.cache.set_points_for_all(points)
+
     def set_points_for(self, player_id, points):
         cursor = self.con.cursor()
         cursor.execute("UPDATE PLAYER SET points=? WHERE id=?", (points, player_id))
         self.con.commit()
 
-    def scores(self):
-        cursor = self.con.cursor()
-        cursor.execute("SELECT * FROM PLAYER ORDER BY points DESC")
+        if self.leaderboard is not None:
+            self.leaderboard.set_points(player_id, points)
+        if self.roulette is not None:
+            self.roulette.set_points(player_id, points)
+        if self.cache is not None:
+            self.cache.set_points(player_id, points)
+
+    def scores(self, limit=None, offset=0):
+        """
+        :param limit: Maximum number of players to return, all remaining players when None.
+        :param offset: Number of best players to skip.
+        :return: A list of players, by descending points.
+        """
+
+        if self.leaderboard is None:
+            self.leaderboard = self.load_leaderboard()
+
+        return [self.player_from_row(row) for row in self.leaderboard.top(limit, offset)]
+
+    def place_of(self, points, max_place=None):
+        if self.leaderboard is None:
+            self.leaderboard = self.load_leaderboard()
 
-        high_scores = []
-        while True:
-            row = cursor.fetchone()
-            if row is None:
-                break
+        return self.leaderboard.place_of(points, max_place)
 
-            high_scores.append(Player(row[0], row[1], row[2]))
+    def count(self):
+        if self.leaderboard is None:
+            self.leaderboard = self.load_leaderboard()
 
-        return high_scores
+        return len(self.leaderboard)
+
+    def load_leaderboard(self):
+        cursor = self.con.cursor()
+        cursor.execute("SELECT rowid, id, name, points FROM PLAYER ORDER BY points DESC, rowid")
+        return Leaderboard(cursor.fetchall())
 
     def pick_random_user(self):
-        # Preparing the weighted list of players (weights are the inverse of the high scores)
-        scores = self.scores()
-        total = sum(player.points for player in scores)
-        weighted_list = []
-        for player in scores:
-            if player.points is 0:
-                weight = 150  # Skew the distribution to assign more tasks to players with 0 points
-            else:
-                weight = 100 - int(((float(player.points)) // total) * 100)
+        """
+        Picks a player at random, the probability to be picked being higher for players with a low score.
 
-            weighted_list.append((weight, player))
+        :return: A player, None if there is no player.
+        """
 
-        # Random pick
-        return self.weighted_random(weighted_list)
+        if self.roulette is None:
+            cursor = self.con.cursor()
+            cursor.execute("SELECT id, points FROM PLAYER")
+            self.roulette = Roulette(cursor.fetchall())
 
-    @staticmethod
-    def weighted_random(pairs):
-        total = sum(pair[0] for pair in pairs)
-        r = randint(1, total)
-        for (weight, value) in pairs:
-            r -= weight
-            if r <= 0:
-                return value
+        player_id = self.roulette.pick()
+        if player_id is None:
+            return None
+
+        return self.get_by_id(player_id)
 
     @staticmethod
     def validate_name_format(name):
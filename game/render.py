@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+from builtins import object
+
+
+class RenderCache(object):
+    """
+    Keeps the output of read-only commands until the state of the game changes.
+
+    Each entry is stamped with the state version it was rendered from,
+    so an output rendered while the state was being modified is never served.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.entries = {}  # key -> (version, output)
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self):
+        """
+        Must be called after each change of the state of the game.
+        """
+
+        self.version += 1
+        self.entries = {}
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None or entry[0] != self.version:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry[1]
+
+    def put(self, version, key, output):
+        """
+        :param version: The state version read before rendering the output.
+        :param key: Identifies the command and its arguments.
+        :param output: The rendered output.
+        :return: void
+        """
+
+        if version == self.version:
+            self.entries[key] = (version, output)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Weighted random selection of players for the roulette.
+
+The weight of a player decreases with its share of the total points:
+- A player with 0 points weighs ZERO_POINTS_WEIGHT, to assign more tasks to players who have none
+- Other players weigh BASE_WEIGHT * (1 - points / total_points)
+"""
+from __future__ import division
+
+import random
+from builtins import object
+from builtins import range
+
+ZERO_POINTS_WEIGHT = 150
+
+BASE_WEIGHT = 100
+
+INITIAL_CAPACITY = 16
+
+
+class Roulette(object):
+    """
+    Keeps, in Fenwick trees, the prefix sums of the number of players with and without points,
+    and of their points. As a weight only depends on these values and on the total points,
+    a player is picked in O(log n), and a score update also costs O(log n).
+
+    Weights are scaled by the total points, so that the computations are exact integer operations.
+    """
+
+    def __init__(self, players=(), rng=None):
+        """
+        :param players: Iterable of tuples (player_id, points).
+        :param rng: Random number generator, the random module by default.
+        """
+
+        if rng is not None:
+            self.rng = rng
+        else:
+            self.rng = random
+
+        self.slots = {}  # player_id -> slot index, slots start at 1
+        self.points_of = {}  # player_id -> points
+        self.free_slots = []
+        self.total_points = 0
+        self.zero_count = 0
+        self.scored_count = 0
+        self.allocate(INITIAL_CAPACITY)
+
+        for player_id, points in players:
+            self.add(player_id, points)
+
+    def __len__(self):
+        return len(self.slots)
+
+    def allocate(self, capacity):
+        self.capacity = capacity
+        self.ids = [None] * (capacity + 1)
+        self.zero_tree = [0] * (capacity + 1)
+        self.scored_tree = [0] * (capacity + 1)
+        self.points_tree = [0] * (capacity + 1)
+        self.free_slots = list(range(capacity, 0, -1))
+
+    def grow(self):
+        players = list(self.points_of.items())
+        self.slots = {}
+        self.points_of = {}
+        self.total_points = 0
+        self.zero_count = 0
+        self.scored_count = 0
+        self.allocate(self.capacity * 2)
+
+        for player_id, points in players:
+            self.add(player_id, points)
+
+    def update_tree(self, slot, zero_delta, scored_delta, points_delta):
+        while slot <= self.capacity:
+            self.zero_tree[slot] += zero_delta
+            self.scored_tree[slot] += scored_delta
+            self.points_tree[slot] += points_delta
+            slot += slot & -slot
+
+    def apply(self, slot, points, sign):
+        zero = 1 if points == 0 else 0
+        self.zero_count += sign * zero
+        self.scored_count += sign * (1 - zero)
+        self.total_points += sign * points
+        self.update_tree(slot, sign * zero, sign * (1 - zero), sign * points)
+
+    def add(self, player_id, points):
+        if player_id in self.slots:
+            self.set_points(player_id, points)
+            return
+
+        if len(self.free_slots) == 0:
+            self.grow()
+
+        slot = self.free_slots.pop()
+        self.slots[player_id] = slot
+        self.points_of[player_id] = points
+        self.ids[slot] = player_id
+        self.apply(slot, points, 1)
+
+    def remove(self, player_id):
+        slot = self.slots.pop(player_id, None)
+        if slot is None:
+            return
+
+        self.apply(slot, self.points_of.pop(player_id), -1)
+        self.ids[slot] = None
+        self.free_slots.append(slot)
+
+    def set_points(self, player_id, points):
+        slot = self.slots.get(player_id)
+        if slot is None:
+            return
+
+        self.apply(slot, self.points_of[player_id], -1)
+        self.points_of[player_id] = points
+        self.apply(slot, points, 1)
+
+    def scale(self):
+        return max(self.total_points, 1)
+
+    def scaled_weight(self, zero_count, scored_count, points):
+        scale = self.scale()
+        return ZERO_POINTS_WEIGHT * scale * zero_count + BASE_WEIGHT * (scale * scored_count - points)
+
+    def probability_of(self, player_id):
+        points = self.points_of[player_id]
+        zero = 1 if points == 0 else 0
+        return self.scaled_weight(zero, 1 - zero, points) / self.scaled_weight(
+            self.zero_count, self.scored_count, self.total_points)
+
+    def pick(self):
+        """
+        :return: The id of a randomly picked player, None if there is no player.
+        """
+
+        if len(self.slots) == 0:
+            return None
+
+        total = self.scaled_weight(self.zero_count, self.scored_count, self.total_points)
+        if total == 0:  # A single player owns all the points
+            return self.rng.choice(list(self.slots))
+
+        # Finds the slot where the prefix sum of the weights goes over the target
+        target = self.rng.randrange(total)
+        position = 0
+        step = 1
+        while step * 2 <= self.capacity:
+            step *= 2
+
+        while step > 0:
+            next_position = position + step
+            if next_position <= self.capacity:
+                weight = self.scaled_weight(self.zero_tree[next_position], self.scored_tree[next_position],
+                                            self.points_tree[next_position])
+                if weight <= target:
+                    position = next_position
+                    target -= weight
+            step //= 2
+
+        return self.ids[position + 1]
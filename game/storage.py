@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Storage backends of the game:
+- Storage describes what the game depends on, and is the base class of the backends
+- SqliteStorage keeps the game in a SQLite database, it is the backend used by the bot
+- MemoryStorage (see the memory module) keeps it in dicts and in-memory indexes, without any I/O
+"""
+from __future__ import absolute_import
+
+from builtins import object
+from contextlib import contextmanager
+
+from .assignment import AssignmentRepository
+from .buckets import ScoreBuckets
+from .commit import GroupCommitConnection
+from .connections import ConnectionManager
+from .events import EventLog, DEFAULT_SNAPSHOT_INTERVAL
+from .player import PlayerRepository
+from .task import TaskRepository
+from .timing import QueryTimer, TimedConnection
+from .transaction import TransactionalConnection
+from .upgrade import Upgrade
+
+
+class Storage(object):
+    """
+    A backend provides three repositories, offering the methods of the SQLite ones:
+    - players: PlayerRepository
+    - tasks: TaskRepository
+    - assignments: AssignmentRepository
+    - buckets: ScoreBuckets, the points earned per period
+    - events: EventLog, the source of truth for the scores
+
+    Writes performed by several repositories are made atomic by unit_of_work().
+    The time spent in the database by each thread is added to query_timer.
+    """
+
+    def __init__(self):
+        self.players = None
+        self.tasks = None
+        self.assignments = None
+        self.buckets = None
+        self.events = None
+        self.query_timer = QueryTimer()
+
+    def recover_scores(self):
+        """
+        Sets the points of the players to the scores folded from the event log.
+
+        :return: The number of players whose points were corrected.
+        """
+
+        scores = self.events.recover()
+        corrected = 0
+        for player in self.players.scores():
+            points = scores.get(player.player_id)
+            if points is not None and points != player.points:
+                self.players.set_points_for(player.player_id, points)
+                corrected += 1
+
+        return corrected
+
+    def unit_of_work(self):
+        """
+        :return: A context manager, the writes performed in its block are undone if it raises.
+        """
+
+        raise NotImplementedError()
+
+    def add_rollback_listener(self, listener):
+        """
+        Registers a function called without arguments when writes are undone.
+        """
+
+        raise NotImplementedError()
+
+    def add_commit_listener(self, listener):
+        """
+        Registers a function called without arguments when deferred writes are committed.
+        Backends whose writes are visible right away never call it.
+        """
+
+        pass
+
+    def has_snapshots(self):
+        """
+        :return: True if snapshot() reads without needing the game lock.
+        """
+
+        return False
+
+    def is_shared(self):
+        """
+        :return: True if other processes may write to the storage, see refresh().
+        """
+
+        return False
+
+    def refresh(self):
+        """
+        Drops the state the repositories keep in memory if other processes wrote to the storage since the last call.
+        Called at the start of the unit of work of a command, so that no other process can write until it ends.
+
+        :return: True if the state was dropped.
+        """
+
+        return False
+
+    @contextmanager
+    def snapshot(self):
+        """
+        :return: A tuple (tasks, players, buckets) of repositories to read from.
+        """
+
+        yield self.tasks, self.players, self.buckets
+
+    def wait_durable(self):
+        """
+        Blocks until the writes of the last command executed by the calling thread are persisted.
+        """
+
+        pass
+
+    def close(self):
+        pass
+
+
+class SqliteStorage(Storage):
+    """
+    Repositories sharing the writer connection of a SQLite database, upgraded to the current data model.
+
+    The database file of the configuration is opened, unless a connection is given.
+    Commits are batched when the configuration enables the group commit,
+    and reads are served from read-only connections when it enables readers.
+    When the database is shared by several bot processes, their writes are detected with PRAGMA data_version.
+    """
+
+    def __init__(self, config, lock, sqlite_con=None):
+        """
+        :param config: The bot configuration, may be None when a connection is given.
+        :param lock: The lock serializing the access to the game, used by the group commit.
+        :param sqlite_con: An open connection, for instance to an in-memory database.
+        """
+
+        super(SqliteStorage, self).__init__()
+        self.lock = lock
+        self.query_timer.slow_query_threshold = self.slow_query_threshold(config)
+
+        self.connections = None
+        if sqlite_con is not None:
+            self.connection = TransactionalConnection(TimedConnection(sqlite_con, self.query_timer))
+        else:
+            self.connection = TransactionalConnection(self.open_connection(config))
+
+        self.perform_upgrade()
+
+        self.players = PlayerRepository(self.connection, self.player_cache_size(config))
+        self.tasks = TaskRepository(self.connection)
+        self.assignments = AssignmentRepository(self.connection)
+        self.buckets = ScoreBuckets(self.connection)
+        self.events = EventLog(self.connection, self.snapshot_interval(config))
+        self.recover_scores()
+
+        self.shared = self.shared_database(config)
+        self.data_version = self.read_data_version() if self.shared else None
+
+    def open_connection(self, config):
+        self.connections = ConnectionManager(config.db_file_name(), config.pragmas(), config.db_readers(),
+                                             self.query_timer)
+        connection = TimedConnection(self.connections.writer, self.query_timer)
+
+        window = config.group_commit_window_ms()
+        if window is None or window <= 0:
+            return connection
+
+        return GroupCommitConnection(connection, self.lock, window / 1000.0, config.group_commit_max_batch())
+
+    @staticmethod
+    def player_cache_size(config):
+        if config is None:
+            return 0
+
+        return config.player_cache_size()
+
+    @staticmethod
+    def shared_database(config):
+        if config is None:
+            return False
+
+        return config.shared_database()
+
+    @staticmethod
+    def slow_query_threshold(config):
+        if config is None or config.slow_query_ms() is None:
+            return None
+
+        return config.slow_query_ms() / 1000.0
+
+    @staticmethod
+    def snapshot_interval(config):
+        if config is None:
+            return DEFAULT_SNAPSHOT_INTERVAL
+
+        return config.snapshot_interval()
+
+    def perform_upgrade(self):
+        upgrade = Upgrade(self.connection)
+        upgrade.detect_initial_state()
+        (status, msg) = upgrade.perform_upgrade()
+        if status is False:
+            raise ValueError("Error while performing data model upgrade: " + msg)
+
+    def unit_of_work(self):
+        return self.connection.unit_of_work()
+
+    def add_rollback_listener(self, listener):
+        self.connection.add_rollback_listener(listener)
+
+    def add_commit_listener(self, listener):
+        if isinstance(self.connection.connection, GroupCommitConnection):
+            self.connection.connection.add_commit_listener(listener)
+
+    def has_snapshots(self):
+        return self.connections is not None and self.connections.has_readers()
+
+    def is_shared(self):
+        return self.shared
+
+    def read_data_version(self):
+        # Changes when another connection commits, the commits of this one leave it unchanged
+        cursor = self.connection.cursor()
+        cursor.execute("PRAGMA data_version")
+        return cursor.fetchone()[0]
+
+    def refresh(self):
+        if not self.shared:
+            return False
+
+        data_version = self.read_data_version()
+        if data_version == self.data_version:
+            return False
+
+        self.data_version = data_version
+        self.players.invalidate()
+        self.events.invalidate()
+        return True
+
+    @contextmanager
+    def snapshot(self):
+        if not self.has_snapshots():
+            yield self.tasks, self.players, self.buckets
+            return
+
+        with self.connections.snapshot() as snapshot:
+            yield snapshot.tasks, snapshot.players, snapshot.buckets
+
+    def wait_durable(self):
+        if isinstance(self.connection.connection, GroupCommitConnection):
+            self.connection.connection.wait_durable()
+
+    def close(self):
+        self.connection.close()
+        if self.connections is not None:
+            self.connections.close()
@@ -25,8 +25,11 @@ class Task(object):
     def __str__(self):
         return "Task[" + str(self.uid) + "] '" + self.description + "' inserted at " + str(self.timestamp)
 
-    def has_expired(self):
-        return (time.time() - self.timestamp) > TASK_ASSIGNMENT_PERIOD
+    def has_expired(self, period=TASK_ASSIGNMENT_PERIOD):
+        return (time.time() - self.timestamp) > period
+
+    def deadline(self, period=TASK_ASSIGNMENT_PERIOD):
+        return self.timestamp + period
 
 
 class TaskRepository(object):
@@ -37,18 +40,44 @@ class TaskRepository(object):
     def __init__(self, connection):
         self.con = connection
 
+        # The upgrades only run when the major version changes, the column type is checked on every start
+        self.upgrade_from_2_to_3(self.con)
+
         cursor = self.con.cursor()
+        self.create_task_table(cursor)
+        self.con.commit()
+
+    @staticmethod
+    def create_task_table(cursor):
+        # Insertion times are epoch seconds, indexed for the age queries
         cursor.execute("CREATE TABLE IF NOT EXISTS TASK ("
                        "id INTEGER PRIMARY KEY ASC NOT NULL, "
-                       "inserted TEXT NOT NULL, "
+                       "inserted REAL NOT NULL, "
                        "points INTEGER NOT NULL, "
                        "description TEXT NOT NULL)")
-        self.con.commit()
+        cursor.execute("CREATE INDEX IF NOT EXISTS TASK_INSERTED ON TASK(inserted)")
+
+    @staticmethod
+    def upgrade_from_2_to_3(con):
+        cursor = con.cursor()
+
+        cursor.execute("PRAGMA table_info(TASK)")
+        column_types = dict((row[1], row[2]) for row in cursor.fetchall())
+        if column_types.get("inserted", "REAL") == "REAL":
+            return
+
+        cursor.execute("ALTER TABLE TASK RENAME TO TMP_TASK")
+        TaskRepository.create_task_table(cursor)
+        cursor.execute("INSERT INTO TASK(id, inserted, points, description) "
+                       "SELECT id, CAST(inserted AS REAL), points, description FROM TMP_TASK")
+        cursor.execute("DROP TABLE TMP_TASK")
+
+        con.commit()
 
     @staticmethod
     def task_from_row(row):
         uid, inserted, points, description = row
-        return Task(description, points, inserted, uid)
+        return Task(description, points, float(inserted), uid)
 
     def get(self, uid):
         cursor = self.con.cursor()
@@ -63,7 +92,7 @@ class TaskRepository(object):
     def insert(self, task):
         cursor = self.con.cursor()
         cursor.execute("INSERT INTO TASK(inserted, points, description) VALUES (?,?,?)",
-                       (str(task.timestamp), task.points, task.description))
+                       (task.timestamp, task.points, task.description))
         task_id = cursor.lastrowid
         self.con.commit()
         return task_id
@@ -82,6 +111,76 @@ class TaskRepository(object):
 
         return pending_tasks
 
+    def count(self):
+        cursor = self.con.cursor()
+        cursor.execute("SELECT COUNT(*) FROM TASK")
+        return cursor.fetchone()[0]
+
+    def pending_with_assignees(self, limit=None, offset=0):
+        """
+        Reads the pending tasks along with the name of their assignee, in a single query.
+
+        :param limit: Maximum number of tasks to return, all remaining tasks when None.
+        :param offset: Number of tasks to skip.
+        :return: A list of tuples (task:Task, assignee_name:string), assignee_name is None for unassigned tasks.
+        """
+
+        if limit is None:
+            limit = -1
+
+        cursor = self.con.cursor()
+        cursor.execute("SELECT TASK.id, TASK.inserted, TASK.points, TASK.description, PLAYER.name FROM TASK "
+                       "LEFT JOIN ASSIGNMENT ON ASSIGNMENT.task_id = TASK.id "
+                       "LEFT JOIN PLAYER ON PLAYER.id = ASSIGNMENT.player_id "
+                       "ORDER BY TASK.id LIMIT ? OFFSET ?", (limit, offset))
+
+        return [(self.task_from_row(row[:4]), row[4]) for row in cursor.fetchall()]
+
+    def unassigned(self):
+        cursor = self.con.cursor()
+        cursor.execute("SELECT TASK.id, TASK.inserted, TASK.points, TASK.description FROM TASK "
+                       "LEFT JOIN ASSIGNMENT ON ASSIGNMENT.task_id = TASK.id "
+                       "WHERE ASSIGNMENT.task_id IS NULL ORDER BY TASK.inserted")
+
+        return [self.task_from_row(row) for row in cursor.fetchall()]
+
+    def assigned_to(self, player_id):
+        """
+        :return: A list of the tasks assigned to the player, found with the ASSIGNMENT(player_id) index.
+        """
+
+        cursor = self.con.cursor()
+        cursor.execute("SELECT TASK.id, TASK.inserted, TASK.points, TASK.description FROM ASSIGNMENT "
+                       "JOIN TASK ON TASK.id = ASSIGNMENT.task_id "
+                       "WHERE ASSIGNMENT.player_id=? ORDER BY TASK.inserted", (player_id,))
+
+        return [self.task_from_row(row) for row in cursor.fetchall()]
+
+    def oldest(self, limit):
+        """
+        :param limit: Maximum number of tasks to return.
+        :return: A list of the tasks inserted first, oldest first.
+        """
+
+        cursor = self.con.cursor()
+        cursor.execute("SELECT * FROM TASK ORDER BY inserted LIMIT ?", (limit,))
+
+        return [self.task_from_row(row) for row in cursor.fetchall()]
+
+    def inserted_before(self, timestamp):
+        """
+        :param timestamp: Epoch time in seconds.
+        :return: A list of the tasks inserted before the given time, oldest first.
+        """
+
+        cursor = self.con.cursor()
+        cursor.execute("SELECT * FROM TASK WHERE inserted < ? ORDER BY inserted", (timestamp,))
+
+        return [self.task_from_row(row) for row in cursor.fetchall()]
+
+    def older_than(self, seconds):
+        return self.inserted_before(time.time() - seconds)
+
     def remove(self, uid):
         cursor = self.con.cursor()
         cursor.execute("DELETE FROM TASK WHERE id=?", (uid,))
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Measures the time spent in SQLite by each thread, so that commands can tell their database time apart:
+- The statements of a thread can be traced, with their duration and row count, for instance to check query budgets
+- Statements slower than a threshold can be logged
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+
+import threading
+import time
+from builtins import object
+from contextlib import contextmanager
+
+
+class Query(object):
+    """
+    A traced statement: its SQL, the seconds spent executing it and fetching its rows, and its row count
+    (rows fetched by a query, rows changed by a write).
+    """
+
+    __slots__ = ("sql", "duration", "rows", "logged")
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.duration = 0.0
+        self.rows = 0
+        self.logged = False
+
+    def __repr__(self):
+        return "%.3f ms, %d row(s): %s" % (self.duration * 1000, self.rows, self.sql)
+
+
+def print_slow_query(query):
+    print("Slow query (" + repr(query) + ")")
+
+
+class QueryTimer(object):
+    """
+    Accumulates the time spent in SQLite calls, separately for each thread.
+    Statements are only recorded while the thread traces them, or when slow queries are logged.
+    """
+
+    def __init__(self, slow_query_threshold=None, slow_query_log=print_slow_query):
+        """
+        :param slow_query_threshold: Seconds after which a statement is logged, None to log none.
+        :param slow_query_log: Function called with each slow Query.
+        """
+
+        self.local = threading.local()
+        self.slow_query_threshold = slow_query_threshold
+        self.slow_query_log = slow_query_log
+
+    def add(self, seconds):
+        self.local.elapsed = getattr(self.local, "elapsed", 0.0) + seconds
+
+    def take(self):
+        """
+        :return: The seconds spent in SQLite by the calling thread since the previous call.
+        """
+
+        elapsed = getattr(self.local, "elapsed", 0.0)
+        self.local.elapsed = 0.0
+        return elapsed
+
+    @contextmanager
+    def trace(self):
+        """
+        Records the statements executed by the calling thread in the block.
+
+        :return: A context manager giving the list of the recorded queries.
+        """
+
+        previous = getattr(self.local, "trace", None)
+        queries = []
+        self.local.trace = queries
+        try:
+            yield queries
+        finally:
+            self.local.trace = previous
+
+    def begin(self, sql):
+        """
+        :return: The Query recording a statement, None if it does not need to be recorded.
+        """
+
+        queries = getattr(self.local, "trace", None)
+        if queries is None and self.slow_query_threshold is None:
+            return None
+
+        query = Query(sql)
+        if queries is not None:
+            queries.append(query)
+        return query
+
+    def end(self, query, seconds, rows=0):
+        self.add(seconds)
+        if query is None:
+            return
+
+        query.duration += seconds
+        query.rows += rows
+        if self.slow_query_threshold is not None and not query.logged and query.duration >= self.slow_query_threshold:
+            query.logged = True
+            self.slow_query_log(query)
+
+
+class TimedConnection(object):
+    """
+    Wraps a SQLite connection, the time spent in its statements, fetches and commits is added to a timer.
+    """
+
+    def __init__(self, connection, timer):
+        self.connection = connection
+        self.timer = timer
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+    def cursor(self):
+        return TimedCursor(self.connection.cursor(), self.timer)
+
+    def execute(self, sql, params=()):
+        cursor = self.cursor()
+        cursor.execute(sql, params)
+        return cursor
+
+    def commit(self):
+        self.run("COMMIT", self.connection.commit)
+
+    def rollback(self):
+        self.run("ROLLBACK", self.connection.rollback)
+
+    def run(self, sql, func):
+        query = self.timer.begin(sql)
+        start = time.time()
+        try:
+            func()
+        finally:
+            self.timer.end(query, time.time() - start)
+
+
+class TimedCursor(object):
+
+    def __init__(self, cursor, timer):
+        self.cursor = cursor
+        self.timer = timer
+        self.query = None  # Last statement, its fetches are added to it
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def execute(self, sql, params=()):
+        return self.run(sql, self.cursor.execute, params)
+
+    def executemany(self, sql, params):
+        return self.run(sql, self.cursor.executemany, params)
+
+    def run(self, sql, func, params):
+        self.query = self.timer.begin(sql)
+        start = time.time()
+        try:
+            func(sql, params)
+        finally:
+            self.timer.end(self.query, time.time() - start, max(self.cursor.rowcount, 0))
+        return self
+
+    def fetchone(self):
+        start = time.time()
+        row = None
+        try:
+            row = self.cursor.fetchone()
+            return row
+        finally:
+            self.timer.end(self.query, time.time() - start, 0 if row is None else 1)
+
+    def fetchall(self):
+        start = time.time()
+        rows = []
+        try:
+            rows = self.cursor.fetchall()
+            return rows
+        finally:
+            self.timer.end(self.query, time.time() - start, len(rows))
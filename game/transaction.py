@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Units of work: running the statements of a compound command in a single transaction.
+"""
+from __future__ import absolute_import
+
+from builtins import object
+from contextlib import contextmanager
+
+SAVEPOINT_NAME = "unit_of_work"
+
+
+class TransactionalConnection(object):
+    """
+    Wraps a SQLite connection shared by the repositories.
+
+    Outside of a unit of work, commits requested by the repositories are forwarded to the connection.
+    Inside a unit of work, they are ignored: all the statements are committed at once when it ends,
+    or rolled back if it raises.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.depth = 0
+        self.rollback_listeners = []
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+    def commit(self):
+        if self.depth == 0:
+            self.connection.commit()
+
+    def rollback(self):
+        self.connection.rollback()
+        self.notify_rollback()
+
+    def add_rollback_listener(self, listener):
+        """
+        Registers a function called without arguments when writes are rolled back,
+        so that in-memory state derived from them can be invalidated.
+        """
+
+        self.rollback_listeners.append(listener)
+        if hasattr(self.connection, "add_rollback_listener"):
+            self.connection.add_rollback_listener(listener)
+
+    def notify_rollback(self):
+        for listener in self.rollback_listeners:
+            listener()
+
+    @contextmanager
+    def unit_of_work(self):
+        """
+        Opens a 'BEGIN IMMEDIATE' transaction, so that the write lock is taken before the first read.
+        If a transaction is already open (e.g. a batch of the group commit), a savepoint is used instead.
+        Nested units of work are merged into the outer one.
+        """
+
+        if self.depth > 0:
+            self.depth += 1
+            try:
+                yield self
+            finally:
+                self.depth -= 1
+            return
+
+        savepoint = self.connection.in_transaction
+        cursor = self.connection.cursor()
+        if savepoint:
+            cursor.execute("SAVEPOINT " + SAVEPOINT_NAME)
+        else:
+            cursor.execute("BEGIN IMMEDIATE")
+
+        self.depth = 1
+        try:
+            yield self
+        except BaseException:
+            self.depth = 0
+            if savepoint:
+                cursor.execute("ROLLBACK TO " + SAVEPOINT_NAME)
+                cursor.execute("RELEASE " + SAVEPOINT_NAME)
+                self.notify_rollback()
+            else:
+                self.rollback()
+            raise
+
+        self.depth = 0
+        if savepoint:
+            cursor.execute("RELEASE " + SAVEPOINT_NAME)
+        self.connection.commit()
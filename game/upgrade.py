@@ -7,6 +7,10 @@ from builtins import object
 from builtins import range
 
 from .assignment import AssignmentRepository
+from .buckets import ScoreBuckets
+from .events import EventLog
+from .player import PlayerRepository
+from .task import TaskRepository
 from .game import __version__
 
 NO_VERSION = "0.0"
@@ -23,7 +27,9 @@ class Upgrade(object):
             self.upgrade_procedures = upgrade_procedures
         else:
             # List each upgrade method from one major to another in this list
-            self.upgrade_procedures = [self.upgrade_from_0_to_1]
+            self.upgrade_procedures = [self.upgrade_from_0_to_1, self.upgrade_from_1_to_2,
+                                       self.upgrade_from_2_to_3, self.upgrade_from_3_to_4,
+                                       self.upgrade_from_4_to_5]
 
     ################################################################
     # Put the upgrade methods in this section,
@@ -33,8 +39,30 @@ class Upgrade(object):
     def upgrade_from_0_to_1(self):
         AssignmentRepository.upgrade_from_0_to_1(self.con)
 
+    def upgrade_from_1_to_2(self):
+        cursor = self.con.cursor()
+        if self.table_exists(cursor, "ASSIGNMENT"):
+            AssignmentRepository.create_indexes(cursor)
+        if self.table_exists(cursor, "PLAYER"):
+            PlayerRepository.create_indexes(cursor)
+        self.con.commit()
+
+    def upgrade_from_2_to_3(self):
+        TaskRepository.upgrade_from_2_to_3(self.con)
+
+    def upgrade_from_3_to_4(self):
+        EventLog.upgrade_from_3_to_4(self.con)
+
+    def upgrade_from_4_to_5(self):
+        ScoreBuckets.upgrade_from_4_to_5(self.con)
+
     ################################################################
 
+    @staticmethod
+    def table_exists(cursor, name):
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (name,))
+        return cursor.fetchone() is not None
+
     def detect_initial_state(self, target_version=__version__):
         self.previous_version = self.select_or_insert_version(target_version)
 
@@ -80,7 +108,7 @@ class Upgrade(object):
             return False, "Trying to downgrade the data model " \
                           "from " + self.previous_version + " to " + target_version + ", this is not supported."
 
-        for next_major in range(major_to - major_from):
+        for next_major in range(int(major_from), int(major_to)):
             self.upgrade_procedures[next_major]()
 
         cursor = self.con.cursor()
@@ -19,53 +19,190 @@ __version__ = "${GAMIFY_BOT_VERSION}"
 from builtins import object
 
 import os
+import threading
 import time
+from contextlib import contextmanager
 
 from slackclient import SlackClient
 
+from bot import RtmRuntime, OutboundQueue, EventsApiServer, WebApiSender, ChannelWorkerPool, AssignmentScheduler, \
+    CommandMetrics, MetricsServer, CommandTable, ChatterFilter
+from bot.messages import split_message
 from game import Game, Config
+from game.task import TASK_ASSIGNMENT_PERIOD
 
 ENV_BOT_TOKEN = 'SLACK_BOT_TOKEN'
+ENV_SIGNING_SECRET = 'SLACK_SIGNING_SECRET'
 
-RTM_READ_DELAY = 1  # delay between readings from RTM
+
+OVERLOADED_MESSAGE = "too many commands are pending, please try again later."
 
 
 class MessagesHandler(object):
 
-    def __init__(self, client, provided_game=None):
+    def __init__(self, client, provided_game=None, pool=None, metrics=None, query_listener=None, bot_id=None):
+        """
+        :param client: Sends the replies, with rtm_send_message(channel, message).
+        :param provided_game: The game, created from the configuration file when None.
+        :param pool: Worker pool executing the commands, they are executed inline when None.
+        :param metrics: CommandMetrics recording the commands, optional.
+        :param query_listener: Function called with the name of each command and the list of the queries it executed,
+        optional (see game.timing.Query).
+        :param bot_id: User id of the bot, its own messages are not parsed. Optional.
+        """
 
+        self.metrics_server = None
         if provided_game is None:
             self.conf = Config()
             self.game = Game(self.conf)
+            if pool is None:
+                pool = self.pool_from(self.conf)
+            if metrics is None and self.conf.metrics_port() is not None:
+                metrics = CommandMetrics()
+                self.metrics_server = MetricsServer(metrics, self.conf.metrics_port(), self.conf.metrics_host()).start()
         else:
             self.game = provided_game
 
-        self.commands = self.game.commands()
+        self.commands = self.game.commands_dict
+        # Aliases are counted in the metrics with the command they stand for
+        self.table = CommandTable(self.commands)
         self.slack_client = client
+        self.pool = pool
+        self.metrics = metrics
+        self.query_listener = query_listener
+        self.chatter = ChatterFilter(bot_id)
+        if metrics is not None and pool is not None:
+            pool.metrics.register(metrics)
+        if metrics is not None:
+            metrics.add_counter("gamify_events_skipped_total", "Events discarded before parsing, chatter included.",
+                                lambda: self.chatter.skipped)
+        self.scheduler = None
+        self.current = threading.local()  # Channel of the command being executed by this thread
+
+        if provided_game is None and self.conf.auto_assign():
+            self.start_auto_assign(self.conf.auto_assign_channel())
+
+    @staticmethod
+    def pool_from(conf):
+        """
+        :param conf: Bot configuration.
+        :return: The worker pool described in the configuration, None if commands must be executed inline.
+        """
+
+        if conf.dispatcher_workers() <= 0:
+            return None
 
-    def handle_bot_command(self, command, argument, channel, player_id):
+        kwargs = {"workers": conf.dispatcher_workers(), "timeout": conf.dispatcher_timeout()}
+        if conf.dispatcher_queue_depth() is not None:
+            kwargs["queue_depth"] = conf.dispatcher_queue_depth()
+        if conf.dispatcher_channel_queue_depth() is not None:
+            kwargs["channel_queue_depth"] = conf.dispatcher_channel_queue_depth()
+
+        return ChannelWorkerPool(**kwargs)
+
+    def dispatch(self, call):
         """
-        Forwards commands to the game engine using a commands dict for the mapping.
+        Executes a parsed command inline, or submits it to the worker pool.
 
-        :param command: The first word of the intercepted message.
-        :param argument: A string containing the rest of the intercepted message.
-        :param channel: Channel id from witch the message was received.
-        :param player_id: Id of the player that emitted the message.
+        :param call: The CommandCall parsed from a message.
         :return: void
         """
 
-        # Here we pass the arguments from the current method to the registered function in the commands dict
-        args = locals()
-        del args["self"]
-        del args["command"]
-        del args["channel"]
+        if self.pool is None:
+            self.execute_command(call)
+        elif not self.pool.submit(call.channel, self.execute_command, call, time.time()):
+            self.record(call.command, "rejected")
+            self.send(call.channel, self.game.header(call.player_id) + OVERLOADED_MESSAGE)
 
-        if command not in self.commands:
+    def start_auto_assign(self, default_channel=None, period=TASK_ASSIGNMENT_PERIOD):
+        """
+        Starts assigning the tasks nobody took before the end of the assignment period,
+        assignments are announced in the channel where the task was added.
+
+        :param default_channel: Channel announcing the assignment of the tasks added before the bot started.
+        :param period: Seconds after which a task is assigned.
+        :return: void
+        """
+
+        self.scheduler = AssignmentScheduler(self.game, self.send, default_channel, period)
+        self.game.task_listeners.append(self.on_task_added)
+        self.game.release_listeners.append(self.on_task_released)
+        self.scheduler.start()
+
+    def on_task_added(self, task):
+        self.scheduler.schedule(task, getattr(self.current, "channel", None))
+
+    def on_task_released(self, task):
+        # A new assignment period starts when the task is released
+        self.scheduler.schedule(task, getattr(self.current, "channel", None), time.time() + self.scheduler.period)
+
+    def execute_command(self, call, queued=None):
+        """
+        :param queued: Time at which the command was submitted to the worker pool, None when executed inline.
+        """
+
+        started = time.time()
+        self.game.take_query_time()  # Only the queries of this command are counted
+        try:
+            with self.traced(call.command):
+                if self.game.runs_on_snapshot(call.command.function):
+                    # Read-only commands do not wait for the writes in progress
+                    locked = started
+                    (status, out) = call.execute()
+                    released = time.time()
+                else:
+                    with self.game.lock:
+                        locked = time.time()
+                        self.current.channel = call.channel
+                        try:
+                            (status, out) = call.execute()
+                        finally:
+                            self.current.channel = None
+                    released = time.time()
+                    self.game.wait_durable()
+        except Exception:
+            self.record(call.command, "error")
+            raise
+
+        executed = time.time()
+        query_time = self.game.take_query_time()
+        self.send(call.channel, out)
+
+        if self.metrics is not None:
+            command = call.command.name
+            self.metrics.record(command, "success" if status else "failure")
+            self.metrics.observe(command, "queue", started - queued if queued is not None else 0.0)
+            self.metrics.observe(command, "lock", locked - started)
+            self.metrics.observe(command, "game", max(released - locked - query_time, 0.0))
+            self.metrics.observe(command, "db", query_time + executed - released)
+            # With an outbound queue, only the hand-over is timed here, see OutboundMetrics for the Slack calls
+            self.metrics.observe(command, "send", time.time() - executed)
+
+    @contextmanager
+    def traced(self, command):
+        if self.query_listener is None:
+            yield
             return
 
-        (command_func, desc) = self.commands[command]
-        (status, out) = command_func(**args)
-        self.slack_client.rtm_send_message(channel, out)
+        with self.game.trace_queries() as queries:
+            yield
+        self.query_listener(command.name, queries)
+
+    def record(self, command, result):
+        if self.metrics is not None:
+            self.metrics.record(command.name, result)
+
+    def send(self, channel, out):
+        for chunk in split_message(out):
+            self.slack_client.rtm_send_message(channel, chunk)
+
+    def close(self):
+        if self.scheduler is not None:
+            self.scheduler.stop()
+        if self.pool is not None:
+            self.pool.shutdown()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
 
     def on_message(self, channel, from_player_id, msg):
         """
@@ -77,32 +214,72 @@ class MessagesHandler(object):
         :return: void
         """
 
+        started = time.time()
         # noinspection PyBroadException
         try:
-            split = msg.split(None, 1)
-            if len(split) is 0:
+            call = self.table.parse(msg, channel, from_player_id)
+            if call is None:
                 return
 
-            command = split[0].lower()
-
-            if len(split) == 2:
-                argument = split[1]
-            else:
-                argument = ""
+            if self.metrics is not None:
+                self.metrics.observe(call.command.name, "parse", time.time() - started)
 
-            self.handle_bot_command(command, argument, channel, from_player_id)
+            self.dispatch(call)
         except Exception:
             import traceback
             print("Exception occurred while handling message: '" + msg + "'")
             traceback.print_exc()
 
 
-def is_message(received_event):
-    return "type" in received_event and received_event["type"] == "message"
+def dispatch_event(handler, received_event):
+    if handler.chatter.accepts(received_event):
+        handler.on_message(received_event["channel"], received_event["user"], received_event["text"])
+
+
+def run_rtm(slack_client):
+    if not slack_client.rtm_connect(with_team_state=False):
+        print("Connection to Slack failed.")
+        exit(1)
 
+    print("GamifyBot v" + __version__ + " connected and running!")
 
-def has_right_params(received_event):
-    return "user" in received_event and "text" in received_event and "channel" in received_event
+    sender = OutboundQueue(slack_client)
+    handler = MessagesHandler(sender, bot_id=slack_client.server.login_data["self"]["id"])
+    if handler.metrics is not None:
+        sender.metrics.register(handler.metrics)
+    runtime = RtmRuntime(slack_client, lambda event: dispatch_event(handler, event))
+    try:
+        runtime.run_forever()
+    finally:
+        runtime.close()
+        handler.close()
+        sender.close()
+
+
+def run_events_api(slack_client, conf):
+    signing_secret = os.environ.get(ENV_SIGNING_SECRET)
+    if signing_secret is None or signing_secret.strip() == "":
+        print("Please set the environment variable: " + ENV_SIGNING_SECRET)
+        exit(1)
+
+    auth = slack_client.api_call("auth.test")
+    if not auth.get("ok", False):
+        print("Connection to Slack failed.")
+        exit(1)
+
+    sender = OutboundQueue(WebApiSender(slack_client))
+    handler = MessagesHandler(sender, bot_id=auth["user_id"])
+    if handler.metrics is not None:
+        sender.metrics.register(handler.metrics)
+    server = EventsApiServer(lambda event: dispatch_event(handler, event), conf.events_api_port(),
+                             conf.events_api_host(), signing_secret)
+
+    print("GamifyBot v" + __version__ + " listening for Slack events on port " + str(server.port) + "!")
+    try:
+        server.run_forever()
+    finally:
+        handler.close()
+        sender.close()
 
 
 if __name__ == "__main__":
@@ -115,18 +292,8 @@ if __name__ == "__main__":
 
     slack_client = SlackClient(bot_token)
 
-    if not slack_client.rtm_connect(with_team_state=False):
-        print("Connection to Slack failed.")
-        exit(1)
-
-    print("GamifyBot v" + __version__ + " connected and running!")
-
-    handler = MessagesHandler(slack_client)
-    while True:
-        events = slack_client.rtm_read()
-
-        for event in events:
-            if is_message(event) and has_right_params(event):
-                handler.on_message(event["channel"], event["user"], event["text"])
-
-        time.sleep(RTM_READ_DELAY)
+    bot_conf = Config()
+    if bot_conf.events_api_port() is None:
+        run_rtm(slack_client)
+    else:
+        run_events_api(slack_client, bot_conf)
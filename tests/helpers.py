@@ -0,0 +1,12 @@
+# coding=utf-8
+"""
+Helpers shared by the test modules.
+"""
+
+
+def query_plan(con, query, params=()):
+    """
+    :return: The details of the EXPLAIN QUERY PLAN of a query, joined by spaces.
+    """
+
+    return " ".join(row[3] for row in con.execute("EXPLAIN QUERY PLAN " + query, params).fetchall())
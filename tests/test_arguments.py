@@ -0,0 +1,68 @@
+# coding=utf-8
+from datetime import date
+from unittest import TestCase
+
+from game.arguments import NameArgument, TaskIdArgument, name_from, new_task_from, page_from, score_from, \
+    task_id_from, tasks_page_from, window_from
+
+
+class TestArguments(TestCase):
+
+    def test_name_from_parses_valid_names(self):
+        self.assertEqual(name_from("User1").name, "User1")
+        self.assertTrue(name_from("").error.startswith("you have to provide a user name"))
+        self.assertTrue(name_from("no valid").error.startswith("User names can only contain"))
+
+    def test_new_task_from_parses_points_and_description(self):
+        argument = new_task_from("3 'Fix the build'")
+        self.assertEqual((argument.points, argument.description, argument.error), (3, "Fix the build", ""))
+
+        self.assertEqual(new_task_from("").error, "invalid arguments, usage: `!add &lt;points&gt; &lt;description&gt;`")
+        self.assertEqual(new_task_from("x task").error,
+                         "invalid format for points, usage: `!add &lt;points&gt; &lt;description&gt;`")
+        self.assertEqual(new_task_from("5 task", 4).error,
+                         "points must be between 1 and 4 included, usage: `!add &lt;points&gt; &lt;description&gt;`")
+        self.assertEqual(new_task_from("5").error, "invalid arguments: `!add &lt;points&gt; &lt;description&gt;`")
+
+    def test_task_id_from_parses_task_ids(self):
+        self.assertEqual(task_id_from(" 12 ").task_id, 12)
+        self.assertEqual(task_id_from("twelve").error, "invalid task id")
+        self.assertEqual(task_id_from("").error, "invalid task id")
+
+    def test_tasks_page_from_parses_optional_page(self):
+        self.assertEqual(tasks_page_from("").page, 1)
+        self.assertEqual(tasks_page_from("2").page, 2)
+        self.assertEqual(tasks_page_from("0").error, "invalid page number, usage: `!tasks [page]`")
+
+    def test_score_from_parses_window_then_page(self):
+        today = date(2026, 10, 17).toordinal()
+
+        argument = score_from("week 2", today)
+        self.assertEqual((argument.window, argument.page), ((date(2026, 10, 12).toordinal(), "of the week",
+                                                             "!score week"), 2))
+        self.assertEqual(score_from(None, today).page, 1)
+        self.assertTrue(score_from("since", today).error.startswith("missing date, usage: `!score "))
+        self.assertTrue(score_from("month garbage", today).error.startswith("invalid page number, usage: `!score "))
+
+    def test_parsers_return_typed_arguments_unchanged(self):
+        task_id = TaskIdArgument(12)
+        name = NameArgument("User1")
+
+        self.assertIs(task_id_from(task_id), task_id)
+        self.assertIs(name_from(name), name)
+
+    def test_window_from_parses_period_and_page(self):
+        today = date(2026, 10, 17).toordinal()
+
+        self.assertEqual(window_from("2", today), (None, "2", ""))
+        self.assertEqual(window_from("week 2", today),
+                         ((date(2026, 10, 12).toordinal(), "of the week", "!score week"), "2", ""))
+        self.assertEqual(window_from("Month", today),
+                         ((date(2026, 10, 1).toordinal(), "of the month", "!score month"), "", ""))
+        self.assertEqual(window_from("since 2026-09-15 3", today),
+                         ((date(2026, 9, 15).toordinal(), "since 2026-09-15", "!score since 2026-09-15"), "3", ""))
+
+    def test_page_from_parses_positive_pages(self):
+        self.assertEqual(page_from(None), (1, ""))
+        self.assertEqual(page_from(" 3 "), (3, ""))
+        self.assertEqual(page_from("-1"), (None, "invalid page number"))
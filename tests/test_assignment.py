@@ -4,6 +4,7 @@ import sqlite3
 from unittest import TestCase
 
 from game.assignment import AssignmentRepository
+from tests.helpers import query_plan
 
 TASK_ID = 1337
 OTHER_TASK_ID = 1334
@@ -43,6 +44,21 @@ class TestAssignmentRepository(TestCase):
 
         self.assertTrue(status)
 
+    def test_remove_all_of_deletes_assignments_of_player_only(self):
+        self.repo.assign(TASK_ID, USER)
+        self.repo.assign(OTHER_TASK_ID, USER)
+        self.repo.assign(42, OTHER_USER)
+
+        removed = self.repo.remove_all_of(USER)
+
+        self.assertEqual(removed, 2)
+        self.assertEqual(self.repo.list(), {42: OTHER_USER})
+
+    def test_remove_all_of_uses_player_index(self):
+        plan = query_plan(self.con, "DELETE FROM ASSIGNMENT WHERE player_id=?", (USER,))
+
+        self.assertTrue("USING INDEX ASSIGNMENT_PLAYER_ID" in plan, plan)
+
     def test_user_of_task_returns_user(self):
         self.repo.assign(TASK_ID, USER)
 
@@ -0,0 +1,61 @@
+# coding=utf-8
+import os
+import shutil
+import sys
+import tempfile
+from importlib import import_module
+from io import StringIO
+from unittest import TestCase
+
+
+class TestBenchmarks(TestCase):
+    """
+    Runs each benchmark on a tiny workload, so that a change of the game or of the bot cannot break them silently.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    @staticmethod
+    def run_benchmark(name, *args):
+        module = import_module("benchmarks." + name)
+        (argv, stdout) = (sys.argv, sys.stdout)
+        sys.argv = [name] + list(args)
+        sys.stdout = StringIO()
+        try:
+            module.main()
+            return sys.stdout.getvalue()
+        finally:
+            (sys.argv, sys.stdout) = (argv, stdout)
+
+    def test_dispatch(self):
+        self.assertTrue(len(self.run_benchmark("dispatch", "--rounds", "10")) > 0)
+
+    def test_group_commit(self):
+        self.assertTrue(len(self.run_benchmark("group_commit", "--commands", "10", "--channels", "2",
+                                               "--workers", "2")) > 0)
+
+    def test_leaderboard(self):
+        self.assertTrue(len(self.run_benchmark("leaderboard", "--players", "20", "--rounds", "2")) > 0)
+
+    def test_load(self):
+        output = os.path.join(self.directory, "load-results.jsonl")
+        for backend in ("sqlite-memory", "sqlite-file", "memory"):
+            self.run_benchmark("load", "--players", "5", "--tasks", "5", "--commands", "50", "--backend", backend,
+                               "--output", output)
+
+        with open(output) as results:
+            self.assertEqual(len(results.readlines()), 3)
+
+    def test_rtm_latency(self):
+        self.assertTrue(len(self.run_benchmark("rtm_latency", "--events", "3", "--interval", "0.01",
+                                               "--delay", "0.05", "--send-time", "0")) > 0)
+
+    def test_sqlite_pragmas(self):
+        self.assertTrue(len(self.run_benchmark("sqlite_pragmas", "--commands", "10")) > 0)
+
+    def test_storage(self):
+        self.assertTrue(len(self.run_benchmark("storage", "--players", "5", "--commands", "20")) > 0)
@@ -0,0 +1,132 @@
+# coding=utf-8
+import sqlite3
+import time
+from datetime import date, datetime
+from unittest import TestCase
+
+from game import events
+from game.buckets import ScoreBuckets, buckets_since, day_of
+from game.events import EventLog
+from game.player import PlayerRepository, Player
+from tests.helpers import query_plan
+
+USER_ID = "U1"
+USER_ID2 = "U2"
+
+
+def timestamp_of(day):
+    return time.mktime(datetime.strptime(day, "%Y-%m-%d").timetuple()) + 3600
+
+
+def ordinal_of(day):
+    return datetime.strptime(day, "%Y-%m-%d").date().toordinal()
+
+
+class TestBucketsSince(TestCase):
+
+    def test_window_starting_on_first_day_of_month_reads_month_buckets_only(self):
+        first_day = ordinal_of("2026-09-01")
+
+        self.assertEqual(buckets_since(first_day), (first_day, first_day, 2026 * 12 + 8))
+
+    def test_window_starting_in_a_month_reads_days_until_next_month(self):
+        first_day = ordinal_of("2026-09-20")
+
+        self.assertEqual(buckets_since(first_day), (first_day, ordinal_of("2026-10-01"), 2026 * 12 + 9))
+
+    def test_window_starting_in_december_continues_in_january(self):
+        self.assertEqual(buckets_since(ordinal_of("2026-12-31"))[1:], (ordinal_of("2027-01-01"), 2027 * 12))
+
+
+class TestScoreBuckets(TestCase):
+
+    def setUp(self):
+        self.con = sqlite3.connect(":memory:")
+        self.players = PlayerRepository(self.con)
+        self.buckets = ScoreBuckets(self.con)
+        self.players.add(Player(USER_ID, "user1"))
+        self.players.add(Player(USER_ID2, "user2"))
+
+    def tearDown(self):
+        self.con.close()
+
+    def test_scores_since_sums_day_and_month_buckets_of_the_window(self):
+        self.buckets.add(USER_ID, 5, timestamp_of("2026-08-31"))
+        self.buckets.add(USER_ID, 3, timestamp_of("2026-09-25"))
+        self.buckets.add(USER_ID2, 4, timestamp_of("2026-09-10"))
+        self.buckets.add(USER_ID2, 1, timestamp_of("2026-10-02"))
+
+        scores = self.buckets.scores_since(ordinal_of("2026-09-15"))
+
+        self.assertEqual([(player.player_id, player.points) for player in scores], [(USER_ID, 3), (USER_ID2, 1)])
+
+        scores = self.buckets.scores_since(ordinal_of("2026-09-01"))
+
+        self.assertEqual([(player.player_id, player.points) for player in scores], [(USER_ID2, 5), (USER_ID, 3)])
+
+    def test_dropped_points_are_subtracted(self):
+        self.buckets.add(USER_ID, 5)
+        self.buckets.add(USER_ID, -5)
+        self.buckets.add(USER_ID2, 2)
+
+        scores = self.buckets.scores_since(date.today().toordinal())
+
+        self.assertEqual([(player.player_id, player.points) for player in scores], [(USER_ID2, 2), (USER_ID, 0)])
+
+    def test_points_of_a_day_are_added_to_a_single_row_per_bucket(self):
+        for points in (1, 2, 3):
+            self.buckets.add(USER_ID, points, timestamp_of("2026-09-25"))
+
+        rows = self.con.execute("SELECT size, points FROM SCORE_BUCKET WHERE player_id=? ORDER BY size",
+                                (USER_ID,)).fetchall()
+
+        self.assertEqual([points for (size, points) in rows], [6, 6])
+
+    def test_removed_players_are_not_listed(self):
+        self.buckets.add(USER_ID, 5)
+        self.buckets.add(USER_ID2, 2)
+        self.buckets.remove_all_of(USER_ID)
+        self.players.remove(USER_ID2)
+
+        self.assertEqual(self.buckets.scores_since(date.today().toordinal()), [])
+
+    def test_window_lookups_use_the_primary_key(self):
+        plan = query_plan(self.con, "SELECT player_id, points FROM SCORE_BUCKET WHERE size=? AND bucket >= ? "
+                                    "AND bucket < ?", ("D", 1, 2))
+
+        self.assertTrue("USING PRIMARY KEY (size=? AND bucket>? AND bucket<?)" in plan)
+
+    def test_upgrade_from_4_to_5_fills_buckets_from_event_log(self):
+        con = sqlite3.connect(":memory:")
+        PlayerRepository(con).add(Player(USER_ID, "user1"))
+        log = EventLog(con)
+        log.append(events.JOIN, USER_ID)
+        log.append(events.TAKE, USER_ID, 1, 5)
+        log.append(events.TAKE, USER_ID, 2, 3)
+        log.append(events.DROP, USER_ID, 1, 5)
+
+        ScoreBuckets.upgrade_from_4_to_5(con)
+
+        scores = ScoreBuckets(con).scores_since(day_of(time.time()))
+        self.assertEqual([(player.player_id, player.points) for player in scores], [(USER_ID, 3)])
+        con.close()
+
+    def test_upgrade_from_4_to_5_replays_resets_and_floored_drops(self):
+        con = sqlite3.connect(":memory:")
+        players = PlayerRepository(con)
+        players.add(Player(USER_ID, "user1"))
+        players.add(Player(USER_ID2, "user2"))
+        log = EventLog(con)
+        log.append(events.JOIN, USER_ID)
+        log.append(events.JOIN, USER_ID2)
+        log.append(events.TAKE, USER_ID, 1, 5)
+        log.append(events.TAKE, USER_ID2, 2, 4)
+        log.append(events.RESET, USER_ID, points=0)
+        log.append(events.TAKE, USER_ID, 3, 2)
+        log.append(events.DROP, USER_ID, 1, 5)  # Score floored at 0: 2 points lost
+
+        ScoreBuckets.upgrade_from_4_to_5(con)
+
+        scores = ScoreBuckets(con).scores_since(day_of(time.time()))
+        self.assertEqual([(player.player_id, player.points) for player in scores], [(USER_ID, 0)])
+        con.close()
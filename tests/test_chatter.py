@@ -0,0 +1,45 @@
+# coding=utf-8
+from unittest import TestCase
+
+from bot.chatter import ChatterFilter
+
+BOT_ID = "UBOT"
+
+
+def message(text, user="U1", **fields):
+    event = {"type": "message", "channel": "C1", "user": user, "text": text}
+    event.update(fields)
+    return event
+
+
+class TestChatterFilter(TestCase):
+
+    def setUp(self):
+        self.chatter = ChatterFilter(BOT_ID)
+
+    def test_accepts_messages_starting_with_the_prefix(self):
+        self.assertTrue(self.chatter.accepts(message("!take 1")))
+        self.assertTrue(self.chatter.accepts(message("!unknown")))
+        self.assertEqual(self.chatter.skipped, 0)
+
+    def test_skips_chatter(self):
+        self.assertFalse(self.chatter.accepts(message("hello there")))
+        self.assertFalse(self.chatter.accepts(message("")))
+        self.assertFalse(self.chatter.accepts(message("what about !take 1?")))
+        self.assertEqual(self.chatter.skipped, 3)
+
+    def test_skips_the_messages_of_the_bot(self):
+        self.assertFalse(self.chatter.accepts(message("!help", BOT_ID)))
+        self.assertEqual(self.chatter.skipped, 1)
+
+    def test_skips_edits_and_other_subtypes(self):
+        self.assertFalse(self.chatter.accepts(message("!take 1", subtype="message_changed")))
+        self.assertFalse(self.chatter.accepts(message("!take 1", subtype="bot_message")))
+        self.assertEqual(self.chatter.skipped, 2)
+
+    def test_skips_other_events_and_incomplete_messages(self):
+        self.assertFalse(self.chatter.accepts({"type": "presence_change", "user": "U1"}))
+        self.assertFalse(self.chatter.accepts({"type": "user_typing", "channel": "C1", "text": "!x"}))
+        self.assertFalse(self.chatter.accepts({"type": "message", "channel": "C1", "text": "!tasks"}))
+        self.assertFalse(self.chatter.accepts({"type": "message", "user": "U1", "text": "!tasks"}))
+        self.assertEqual(self.chatter.skipped, 4)
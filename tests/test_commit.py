@@ -0,0 +1,120 @@
+# coding=utf-8
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from builtins import object
+from builtins import range
+from unittest import TestCase
+
+from game.commit import GroupCommitConnection
+
+WINDOW = 0.05
+
+
+class ConnectionMock(object):
+
+    def __init__(self):
+        self.commits = 0
+        self.rollbacks = 0
+        self.closed = False
+        self.failure = None
+
+    def commit(self):
+        if self.failure is not None:
+            raise self.failure
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class TestGroupCommitConnection(TestCase):
+
+    def setUp(self):
+        self.lock = threading.RLock()
+        self.mock = ConnectionMock()
+        self.con = GroupCommitConnection(self.mock, self.lock, WINDOW, 4)
+
+    def test_commit_is_deferred_until_window_has_elapsed(self):
+        self.con.commit()
+        self.con.commit()
+
+        self.assertEqual(self.mock.commits, 0)
+        self.con.wait_durable()
+        self.assertEqual(self.mock.commits, 1)
+
+    def test_commit_flushes_when_batch_is_full(self):
+        for _ in range(4):
+            self.con.commit()
+
+        self.assertEqual(self.mock.commits, 1)
+
+    def test_wait_durable_without_writes_returns_immediately(self):
+        self.con.wait_durable()
+
+        self.assertEqual(self.mock.commits, 0)
+
+    def test_wait_durable_batches_writes_of_concurrent_threads(self):
+        con = GroupCommitConnection(self.mock, self.lock, WINDOW, 100)
+
+        def write_and_wait():
+            with self.lock:
+                con.commit()
+            con.wait_durable()
+
+        threads = [threading.Thread(target=write_and_wait) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertTrue(1 <= self.mock.commits < 10)
+
+    def test_wait_durable_raises_commit_error(self):
+        self.mock.failure = sqlite3.OperationalError("disk I/O error")
+        self.con.commit()
+
+        with self.assertRaises(sqlite3.OperationalError):
+            self.con.wait_durable()
+        self.assertEqual(self.mock.rollbacks, 1)
+
+    def test_close_commits_open_batch(self):
+        self.con.commit()
+
+        self.con.close()
+
+        self.assertEqual(self.mock.commits, 1)
+        self.assertTrue(self.mock.closed)
+
+
+class TestGroupCommitConnectionWithSqlite(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "test.db")
+        self.lock = threading.RLock()
+        self.con = GroupCommitConnection(sqlite3.connect(self.path, check_same_thread=False), self.lock, WINDOW, 32)
+        self.con.execute("CREATE TABLE T (value INTEGER)")
+        self.con.flush()
+
+    def tearDown(self):
+        self.con.close()
+        shutil.rmtree(self.directory)
+
+    def test_writes_are_visible_from_another_connection_once_durable(self):
+        other = sqlite3.connect(self.path)
+
+        self.con.cursor().execute("INSERT INTO T(value) VALUES (1)")
+        self.con.commit()
+        before = other.execute("SELECT COUNT(*) FROM T").fetchone()[0]
+        self.con.wait_durable()
+        after = other.execute("SELECT COUNT(*) FROM T").fetchone()[0]
+        other.close()
+
+        self.assertEqual(before, 0)
+        self.assertEqual(after, 1)
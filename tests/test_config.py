@@ -24,6 +24,7 @@ class TestConfig(TestCase):
         self.assertEquals(config.max_task_points(), 1337)
         self.assertEquals(len(config.admin_list()), 1)
         self.assertEquals(config.admin_list()[0], "SLACK_USER")
+        self.assertFalse(config.shared_database())
 
     def test_init_config_with_unknown_config_file_throws_IOError(self):
         with self.assertRaises(IOError) as context:
@@ -48,3 +49,50 @@ class TestConfig(TestCase):
             self.config_from('conf-invalid-format.yml')
 
         self.assertTrue('invalid YAML file format' in context.exception.args[0])
+
+    def test_dispatcher_settings_have_defaults_when_section_is_missing(self):
+        config = self.config_from('valid-bot-conf.yml')
+
+        self.assertEquals(config.dispatcher_workers(), 0)
+        self.assertIsNone(config.dispatcher_queue_depth())
+        self.assertIsNone(config.dispatcher_channel_queue_depth())
+        self.assertIsNone(config.dispatcher_timeout())
+
+    def test_group_commit_settings_have_defaults_when_missing(self):
+        config = self.config_from('valid-bot-conf.yml')
+
+        self.assertIsNone(config.group_commit_window_ms())
+        self.assertEquals(config.group_commit_max_batch(), 32)
+
+    def test_pragmas_are_empty_when_missing(self):
+        config = self.config_from('valid-bot-conf.yml')
+
+        self.assertEquals(config.pragmas(), {})
+
+    def test_pragmas_are_read_in_order(self):
+        config = self.config_from('valid-bot-conf-pragmas.yml')
+
+        self.assertEquals(list(config.pragmas().items()),
+                          [("journal_mode", "WAL"), ("synchronous", "NORMAL"), ("cache_size", -2048)])
+
+    def test_metrics_are_not_served_when_section_is_missing(self):
+        config = self.config_from('valid-bot-conf.yml')
+
+        self.assertIsNone(config.metrics_port())
+
+    def test_metrics_are_served_on_loopback_by_default(self):
+        config = self.config_from('valid-bot-conf-pragmas.yml')
+
+        self.assertEqual(config.metrics_port(), 9118)
+        self.assertEqual(config.metrics_host(), "127.0.0.1")
+
+    def test_events_api_is_disabled_when_section_is_missing(self):
+        config = self.config_from('valid-bot-conf.yml')
+
+        self.assertIsNone(config.events_api_port())
+
+    def test_events_api_listens_on_loopback_by_default(self):
+        config = self.config_from('valid-bot-conf-pragmas.yml')
+
+        self.assertEqual(config.events_api_port(), 3000)
+        self.assertEqual(config.events_api_host(), "127.0.0.1")
@@ -0,0 +1,211 @@
+# coding=utf-8
+import collections
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from builtins import range
+from unittest import TestCase
+
+from game.buckets import ScoreBuckets
+from game.config import Config
+from game.connections import ConnectionManager, apply_pragmas
+from game.game import Game
+from game.player import PlayerRepository, Player
+from game.task import TaskRepository, Task
+from gamifybot import MessagesHandler
+from tests.helpers import query_plan
+from tests.test_handler import SlackClientMock
+
+TIMEOUT = 5
+
+
+class TestApplyPragmas(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_apply_pragmas_sets_connection_pragmas(self):
+        connection = sqlite3.connect(os.path.join(self.directory, "pragmas.db"))
+        apply_pragmas(connection, collections.OrderedDict(
+            [("journal_mode", "WAL"), ("synchronous", "NORMAL"), ("cache_size", -2048), ("temp_store", "MEMORY")]))
+
+        self.assertEqual(connection.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        self.assertEqual(connection.execute("PRAGMA synchronous").fetchone()[0], 1)
+        self.assertEqual(connection.execute("PRAGMA cache_size").fetchone()[0], -2048)
+        self.assertEqual(connection.execute("PRAGMA temp_store").fetchone()[0], 2)
+        connection.close()
+
+    def test_apply_pragmas_rejects_unsupported_pragma_or_value(self):
+        connection = sqlite3.connect(":memory:")
+
+        with self.assertRaises(ValueError):
+            apply_pragmas(connection, {"writable_schema": "ON"})
+        with self.assertRaises(ValueError):
+            apply_pragmas(connection, {"synchronous": "OFF; DROP TABLE PLAYER"})
+        connection.close()
+
+
+class TestConnectionManager(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.manager = ConnectionManager(os.path.join(self.directory, "game.db"), {"cache_size": -2048}, 2)
+        self.players = PlayerRepository(self.manager.writer)
+        self.tasks = TaskRepository(self.manager.writer)
+        ScoreBuckets(self.manager.writer)
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.directory)
+
+    def test_writer_is_switched_to_wal_when_readers_are_enabled(self):
+        self.assertEqual(self.manager.writer.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+    def test_snapshot_reads_with_reader_pragmas(self):
+        with self.manager.snapshot() as snapshot:
+            self.assertEqual(snapshot.con.execute("PRAGMA cache_size").fetchone()[0], -2048)
+
+    def test_snapshot_cannot_write(self):
+        with self.manager.snapshot() as snapshot:
+            with self.assertRaises(sqlite3.OperationalError):
+                snapshot.con.execute("DELETE FROM TASK")
+
+    def test_snapshot_does_not_see_writes_committed_after_it_started(self):
+        self.tasks.insert(Task("before"))
+
+        with self.manager.snapshot() as snapshot:
+            self.assertEqual(snapshot.tasks.count(), 1)
+            self.tasks.insert(Task("after"))
+            self.assertEqual(snapshot.tasks.count(), 1)
+
+        with self.manager.snapshot() as snapshot:
+            self.assertEqual(snapshot.tasks.count(), 2)
+
+    def test_readers_are_reused_and_bounded(self):
+        with self.manager.snapshot() as first:
+            with self.manager.snapshot() as second:
+                self.assertIsNot(first, second)
+
+        with self.manager.snapshot() as third:
+            self.assertTrue(third is first or third is second)
+        self.assertEqual(len(self.manager.opened), 2)
+
+    def test_snapshot_waits_for_a_free_reader(self):
+        self.tasks.insert(Task("task"))
+        counts = []
+
+        def read():
+            for _ in range(50):
+                with self.manager.snapshot() as snapshot:
+                    counts.append(snapshot.tasks.count())
+
+        threads = [threading.Thread(target=read) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(TIMEOUT)
+
+        self.assertEqual(counts, [1] * 300)
+        self.assertEqual(len(self.manager.opened), 2)
+
+    def test_player_scores_read_a_page_by_the_points_index(self):
+        with self.manager.snapshot() as snapshot:
+            plan = query_plan(snapshot.con, "SELECT id, name, points FROM PLAYER "
+                                            "ORDER BY points DESC, rowid LIMIT 10 OFFSET 20")
+
+        self.assertTrue("USING INDEX PLAYER_POINTS" in plan, plan)
+        self.assertFalse("TEMP B-TREE" in plan, plan)
+
+    def test_player_scores_match_the_leaderboard(self):
+        for index, points in enumerate([5, 9, 5, 0, 9, 3]):
+            self.players.add(Player("U" + str(index), "user" + str(index), points))
+
+        with self.manager.snapshot() as snapshot:
+            self.assertEqual(snapshot.players.count(), self.players.count())
+            self.assertEqual([player.player_id for player in snapshot.players.scores(3, 2)],
+                             [player.player_id for player in self.players.scores(3, 2)])
+            for points in [10, 9, 5, 4, 0]:
+                self.assertEqual(snapshot.players.place_of(points), self.players.place_of(points))
+                self.assertEqual(snapshot.players.place_of(points, 2), self.players.place_of(points, 2))
+
+
+class TestGameOnSnapshots(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        config_file = os.path.join(self.directory, "bot-config.yml")
+        with open(config_file, "w") as stream:
+            stream.write("db:\n"
+                         "  file_name: \"" + os.path.join(self.directory, "game.db") + "\"\n"
+                         "  readers: 2\n"
+                         "  group_commit_window_ms: 1000\n"
+                         "rules:\n"
+                         "  max_task_points: 42\n")
+        self.game = Game(Config(config_file))
+        self.game.join("U1", "user1")
+
+    def tearDown(self):
+        self.game.close()
+        shutil.rmtree(self.directory)
+
+    def run_holding_lock(self, command):
+        """
+        Runs a command while another thread holds the game lock, as a long write would.
+        """
+
+        locked = threading.Event()
+        release = threading.Event()
+
+        def hold_lock():
+            with self.game.lock:
+                locked.set()
+                release.wait(TIMEOUT)
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        locked.wait(TIMEOUT)
+        try:
+            return command()
+        finally:
+            release.set()
+            holder.join(TIMEOUT)
+
+    def test_only_read_commands_run_on_snapshots(self):
+        commands = self.game.commands_dict
+
+        self.assertTrue(self.game.runs_on_snapshot(commands["!tasks"][0]))
+        self.assertTrue(self.game.runs_on_snapshot(commands["!score"][0]))
+        self.assertTrue(self.game.runs_on_snapshot(commands["!help"][0]))
+        self.assertFalse(self.game.runs_on_snapshot(commands["!take"][0]))
+
+    def test_read_commands_are_not_blocked_by_writer(self):
+        self.game.storage.connection.flush()
+
+        (status, out) = self.run_holding_lock(lambda: self.game.list_high_scores())
+
+        self.assertTrue(status)
+        self.assertTrue("*user1*" in out)
+
+    def test_reads_see_committed_writes_only(self):
+        self.game.storage.connection.flush()
+        self.game.add_task("U1", "3 task")
+
+        self.assertEqual(self.game.list_tasks(), (True, "No pending task."))
+
+        self.game.storage.connection.flush()
+        (status, out) = self.game.list_tasks()
+        self.assertTrue("*task*" in out)
+
+    def test_handler_replies_to_read_commands_while_writer_holds_lock(self):
+        client = SlackClientMock()
+        handler = MessagesHandler(client, self.game)
+
+        self.run_holding_lock(lambda: handler.on_message("channel", "U1", "!help"))
+
+        self.assertEqual(len(client.invokes), 1)
+        self.assertTrue("*Commands*" in client.invokes[0][1])
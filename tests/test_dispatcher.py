@@ -0,0 +1,144 @@
+# coding=utf-8
+import collections
+import sqlite3
+from unittest import TestCase
+
+from bot.dispatcher import CommandTable
+from game.arguments import TaskIdArgument, task_id_from
+from game.game import Game
+
+
+def take(player_id, argument):
+    return True, "take " + argument
+
+
+def tasks(player_id, argument):
+    return True, "tasks " + argument
+
+
+def score(player_id, argument):
+    return True, "score " + argument
+
+
+def reset(player_id, argument):
+    return True, "reset"
+
+
+def drop(player_id, argument):
+    return True, "drop " + argument
+
+
+class TestCommandTable(TestCase):
+
+    def setUp(self):
+        commands = collections.OrderedDict()
+        commands["!take"] = (take, "Takes a task")
+        commands["!tasks"] = (tasks, "Lists the tasks")
+        commands["!score"] = (score, "Prints the scores")
+        commands["!scores"] = commands["!score"]
+        commands["!admin:reset"] = (reset, "Resets the scores")
+        self.table = CommandTable(commands)
+
+    def test_aliases_resolve_to_their_command(self):
+        self.assertEqual(list(self.table.commands), ["!take", "!tasks", "!score", "!admin:reset"])
+        self.assertEqual(self.table.commands["!score"].aliases, ["!scores"])
+        self.assertIs(self.table.resolve("!scores"), self.table.commands["!score"])
+
+    def test_unambiguous_prefixes_resolve_to_their_command(self):
+        self.assertEqual(self.table.resolve("!sco").name, "!score")
+        self.assertEqual(self.table.resolve("!tak").name, "!take")
+        self.assertEqual(self.table.resolve("!tas").name, "!tasks")
+
+    def test_ambiguous_or_short_prefixes_do_not_resolve(self):
+        self.assertIsNone(self.table.resolve("!ta"))
+        self.assertIsNone(self.table.resolve("!s"))
+        self.assertIsNone(self.table.resolve("!"))
+        self.assertIsNone(self.table.resolve("!takes"))
+
+    def test_admin_commands_require_their_full_name(self):
+        self.assertIsNone(self.table.resolve("!adm"))
+        self.assertIsNone(self.table.resolve("!admin:r"))
+        self.assertEqual(self.table.resolve("!admin:reset").name, "!admin:reset")
+
+    def test_commands_which_cannot_be_undone_require_their_full_name(self):
+        commands = collections.OrderedDict()
+        commands["!leave"] = (reset, "")
+        commands["!close"] = (tasks, "")
+        commands["!drop"] = (drop, "")
+        commands["!dropped"] = (take, "")
+        table = CommandTable(commands)
+
+        for name in ("!leave", "!close", "!drop"):
+            self.assertFalse(table.commands[name].prefixable)
+            self.assertEqual(table.resolve(name).name, name)
+        for prefix in ("!le", "!leav", "!cl", "!clos", "!dr", "!dro"):
+            self.assertIsNone(table.resolve(prefix))
+        self.assertTrue(table.commands["!dropped"].prefixable)
+        self.assertEqual(table.resolve("!dropp").name, "!dropped")
+
+    def test_game_commands_which_cannot_be_undone_require_their_full_name(self):
+        game = Game(None, sqlite3.connect(":memory:"))
+        try:
+            table = CommandTable(game.commands())
+
+            for prefix in ("!le", "!lea", "!cl", "!clo", "!dr", "!dro"):
+                self.assertIsNone(table.parse(prefix + " 1", "C1", "U1"))
+            self.assertEqual(table.resolve("!tak").name, "!take")
+        finally:
+            game.close()
+
+    def test_full_names_take_precedence_over_prefixes(self):
+        commands = collections.OrderedDict()
+        commands["!take"] = (take, "")
+        commands["!takeover"] = (tasks, "")
+        table = CommandTable(commands)
+
+        self.assertEqual(table.resolve("!take").name, "!take")
+        self.assertEqual(table.resolve("!takeo").name, "!takeover")
+
+    def test_parse_splits_the_command_from_its_argument(self):
+        call = self.table.parse("!TAKE  12 ", "C1", "U1")
+
+        self.assertEqual(call.command.name, "!take")
+        self.assertEqual((call.player_id, call.argument, call.channel), ("U1", "12 ", "C1"))
+        self.assertEqual(call.execute(), (True, "take 12 "))
+        self.assertEqual(self.table.parse("!scores", "C1", "U1").argument, "")
+
+    def test_parse_types_the_argument_with_the_parser_of_its_command(self):
+        parsed = []
+
+        def parser(argument):
+            parsed.append(argument)
+            return task_id_from(argument)
+
+        commands = collections.OrderedDict()
+        commands["!take"] = (lambda player_id, argument: (True, argument.task_id), "Takes a task", parser)
+        commands["!tasks"] = (tasks, "Lists the tasks")
+        table = CommandTable(commands)
+
+        call = table.parse("!tak 12", "C1", "U1")
+        self.assertEqual(call.argument.task_id, 12)
+        self.assertEqual(call.execute(), (True, 12))
+        self.assertEqual(parsed, ["12"])
+        self.assertEqual(table.parse("!tasks 2", "C1", "U1").argument, "2")
+
+    def test_game_commands_are_executed_with_their_typed_argument(self):
+        game = Game(None, sqlite3.connect(":memory:"))
+        try:
+            table = CommandTable(game.commands())
+            table.parse("!join User1", "C1", "U1").execute()
+            table.parse("!add 3 Fix the build", "C1", "U1").execute()
+
+            call = table.parse("!take 1", "C1", "U1")
+            self.assertIsInstance(call.argument, TaskIdArgument)
+            (status, msg) = call.execute()
+            self.assertTrue(status, msg)
+            self.assertEqual(table.parse("!drop one", "C1", "U1").execute(), (False, "invalid task id"))
+        finally:
+            game.close()
+
+    def test_parse_ignores_chatter(self):
+        self.assertIsNone(self.table.parse("", "C1", "U1"))
+        self.assertIsNone(self.table.parse("   ", "C1", "U1"))
+        self.assertIsNone(self.table.parse("hello !take 1", "C1", "U1"))
+        self.assertIsNone(self.table.parse("!unknown", "C1", "U1"))
@@ -0,0 +1,185 @@
+# coding=utf-8
+import sqlite3
+import threading
+from unittest import TestCase
+
+from game import events
+from game.events import EventLog, apply_event
+from game.game import Game
+from game.memory import MemoryStorage
+from game.player import Player, PlayerRepository
+from game.storage import SqliteStorage
+from game.transaction import TransactionalConnection
+
+USER_ID = "U1"
+USER_ID2 = "U2"
+
+
+class CountingConnection(object):
+
+    def __init__(self, connection, replayed):
+        self.connection = connection
+        self.replayed = replayed
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+    def cursor(self):
+        return CountingCursor(self.connection.cursor(), self.replayed)
+
+
+class CountingCursor(object):
+
+    def __init__(self, cursor, replayed):
+        self.cursor = cursor
+        self.replayed = replayed
+        self.counting = False
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def execute(self, query, params=()):
+        self.counting = query.startswith("SELECT id, kind")
+        return self.cursor.execute(query, params)
+
+    def fetchall(self):
+        rows = self.cursor.fetchall()
+        if self.counting:
+            self.replayed.append(len(rows))
+        return rows
+
+
+class TestApplyEvent(TestCase):
+
+    def test_scores_are_folded_and_never_negative(self):
+        scores = {}
+        apply_event(scores, events.JOIN, USER_ID, None)
+        apply_event(scores, events.JOIN, USER_ID2, None)
+        apply_event(scores, events.TAKE, USER_ID, 5)
+        apply_event(scores, events.DROP, USER_ID2, 3)
+        apply_event(scores, events.ADD, USER_ID, 8)
+
+        self.assertEqual(scores, {USER_ID: 5, USER_ID2: 0})
+
+        apply_event(scores, events.RESET, USER_ID, 0)
+        apply_event(scores, events.LEAVE, USER_ID2, None)
+        self.assertEqual(scores, {USER_ID: 0})
+
+
+class TestEventLog(TestCase):
+
+    def setUp(self):
+        self.con = sqlite3.connect(":memory:")
+        self.replayed = []
+        self.log = EventLog(CountingConnection(self.con, self.replayed), 3)
+
+    def tearDown(self):
+        self.con.close()
+
+    def test_append_returns_increasing_ids(self):
+        self.assertEqual(self.log.append(events.JOIN, USER_ID, data="user1"), 1)
+        self.assertEqual(self.log.append(events.TAKE, USER_ID, 1, 5), 2)
+
+        self.assertEqual(self.log.scores, {USER_ID: 5})
+
+    def test_snapshot_is_saved_every_interval_events(self):
+        for index in range(7):
+            self.log.append(events.JOIN, "U" + str(index))
+
+        self.assertEqual(self.log.last_snapshot()[0], 6)
+        self.assertEqual(len(self.log.last_snapshot()[1]), 6)
+
+    def test_recover_replays_events_after_last_snapshot_only(self):
+        self.log.append(events.JOIN, USER_ID)
+        for index in range(10):
+            self.log.append(events.TAKE, USER_ID, index, 1)
+
+        del self.replayed[:]
+        scores = EventLog(CountingConnection(self.con, self.replayed), 3).recover()
+
+        self.assertEqual(scores, {USER_ID: 10})
+        self.assertEqual(self.replayed, [2])
+
+    def test_old_snapshots_are_pruned(self):
+        for index in range(20):
+            self.log.append(events.JOIN, "U" + str(index))
+
+        cursor = self.con.cursor()
+        cursor.execute("SELECT COUNT(*) FROM SCORE_SNAPSHOT")
+        self.assertEqual(cursor.fetchone()[0], events.SNAPSHOTS_KEPT)
+
+    def test_baseline_is_taken_from_existing_players(self):
+        con = sqlite3.connect(":memory:")
+        players = PlayerRepository(con)
+        players.add(Player(USER_ID, "user1", 12))
+
+        log = EventLog(con)
+        log.append(events.TAKE, USER_ID, 1, 3)
+
+        self.assertEqual(EventLog(con).recover(), {USER_ID: 15})
+        con.close()
+
+    def test_history_returns_last_events_of_player(self):
+        self.log.append(events.JOIN, USER_ID, data="user1")
+        self.log.append(events.JOIN, USER_ID2, data="user2")
+        self.log.append(events.TAKE, USER_ID, 1, 5)
+        self.log.append(events.DROP, USER_ID, 1, 5)
+
+        history = self.log.history(USER_ID, 2)
+
+        self.assertEqual([(event[2], event[3], event[4], event[5]) for event in history],
+                         [(events.TAKE, USER_ID, 1, 5), (events.DROP, USER_ID, 1, 5)])
+        self.assertEqual(len(self.log.history()), 4)
+
+    def test_rolled_back_events_are_not_folded(self):
+        connection = TransactionalConnection(self.con)
+        log = EventLog(connection, 3)
+        log.append(events.JOIN, USER_ID)
+
+        with self.assertRaises(ValueError):
+            with connection.unit_of_work():
+                log.append(events.TAKE, USER_ID, 1, 5)
+                raise ValueError("Provoked error")
+
+        self.assertIsNone(log.scores)
+        self.assertEqual(log.recover(), {USER_ID: 0})
+
+
+class TestStorageRecovery(TestCase):
+
+    def test_player_points_are_rebuilt_from_the_log(self):
+        con = sqlite3.connect(":memory:")
+        game = Game(None, storage=SqliteStorage(None, threading.RLock(), con))
+        game.join(USER_ID, "user1")
+        game.add_task(USER_ID, "5 task")
+        game.take_task(USER_ID, "1")
+
+        con.cursor().execute("UPDATE PLAYER SET points=0")
+        con.commit()
+        storage = SqliteStorage(None, threading.RLock(), con)
+
+        self.assertEqual(storage.players.get_by_id(USER_ID).points, 5)
+        con.close()
+
+    def test_memory_storage_log_is_rolled_back(self):
+        storage = MemoryStorage()
+        storage.players.add(Player(USER_ID, "user1"))
+        storage.events.append(events.JOIN, USER_ID)
+
+        with self.assertRaises(ValueError):
+            with storage.unit_of_work():
+                storage.events.append(events.TAKE, USER_ID, 1, 5)
+                raise ValueError("Provoked error")
+
+        self.assertEqual(len(storage.events.history()), 1)
+        self.assertEqual(storage.events.recover(), {USER_ID: 0})
+
+    def test_commands_are_logged(self):
+        game = Game(None, storage=MemoryStorage())
+        game.join(USER_ID, "user1")
+        game.add_task(USER_ID, "5 task")
+        game.take_task(USER_ID, "1")
+        game.leave(USER_ID)
+
+        self.assertEqual([event[2] for event in game.events.history()],
+                         [events.JOIN, events.ADD, events.TAKE, events.LEAVE])
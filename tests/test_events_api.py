@@ -0,0 +1,154 @@
+# coding=utf-8
+import json
+import sqlite3
+import threading
+import time
+from builtins import object
+from builtins import str
+from unittest import TestCase
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from bot.events_api import EventsApiServer, WebApiSender, signature
+from game.game import Game
+from gamifybot import MessagesHandler, dispatch_event
+from tests.test_handler import SlackClientMock
+
+SECRET = "8f742231b10e8888abcd99yyyzzz85a5"
+
+TIMEOUT = 5
+
+
+class FakeEventPoster(object):
+    """
+    Posts callbacks to a local server the way Slack does, signed with the signing secret of the app.
+    """
+
+    def __init__(self, port, secret=SECRET):
+        self.url = "http://127.0.0.1:" + str(port) + "/slack/events"
+        self.secret = secret
+        self.count = 0
+
+    def post(self, payload, timestamp=None):
+        """
+        :return: A tuple, (HTTP status:int, response body:string)
+        """
+
+        body = json.dumps(payload).encode("utf-8")
+        if timestamp is None:
+            timestamp = str(int(time.time()))
+        request = Request(self.url, body, {"Content-Type": "application/json",
+                                           "X-Slack-Request-Timestamp": timestamp,
+                                           "X-Slack-Signature": signature(self.secret, timestamp, body)})
+        try:
+            response = urlopen(request, timeout=TIMEOUT)
+            return response.status, response.read().decode("utf-8")
+        except HTTPError as e:
+            return e.code, e.read().decode("utf-8")
+
+    def post_message(self, channel, user, text, event_id=None):
+        self.count += 1
+        if event_id is None:
+            event_id = "Ev" + str(self.count)
+        return self.post({"type": "event_callback", "event_id": event_id,
+                          "event": {"type": "message", "channel": channel, "user": user, "text": text}})
+
+
+class TestEventsApiServer(TestCase):
+
+    def setUp(self):
+        self.game = Game(None, sqlite3.connect(":memory:", check_same_thread=False))
+        self.client = SlackClientMock()
+        self.handler = MessagesHandler(self.client, self.game)
+        self.server = EventsApiServer(lambda event: dispatch_event(self.handler, event), 0,
+                                      signing_secret=SECRET).start()
+        self.poster = FakeEventPoster(self.server.port)
+
+    def tearDown(self):
+        self.server.stop()
+        self.game.close()
+
+    def test_url_verification_is_answered_with_the_challenge(self):
+        self.assertEqual(self.poster.post({"type": "url_verification", "challenge": "3eZbrw1a"}), (200, "3eZbrw1a"))
+
+    def test_messages_are_dispatched_to_the_handler(self):
+        self.assertEqual(self.poster.post_message("C1", "U1", "!join user1"), (200, ""))
+        self.assertEqual(self.poster.post_message("C1", "U1", "!tasks"), (200, ""))
+        self.assertEqual(self.poster.post({"type": "event_callback", "event": {"type": "presence_change"}}),
+                         (200, ""))
+        self.server.stop()
+
+        self.assertEqual(len(self.client.invokes), 2)
+        self.assertEqual(self.client.invokes[1], ("C1", "No pending task."))
+
+    def test_callbacks_retried_by_slack_are_dispatched_once(self):
+        self.poster.post_message("C1", "U1", "!tasks", "Ev42")
+        self.poster.post_message("C1", "U1", "!tasks", "Ev42")
+        self.server.stop()
+
+        self.assertEqual(len(self.client.invokes), 1)
+
+    def test_unsigned_or_stale_callbacks_are_rejected(self):
+        forger = FakeEventPoster(self.server.port, "wrong secret")
+        stale = str(int(time.time()) - 3600)
+
+        self.assertEqual(forger.post_message("C1", "U1", "!tasks")[0], 401)
+        self.assertEqual(self.poster.post({"type": "url_verification", "challenge": "x"}, stale)[0], 401)
+        self.server.stop()
+
+        self.assertEqual(self.client.invokes, [])
+
+
+class TestEventsApiAcknowledgement(TestCase):
+
+    def setUp(self):
+        self.released = threading.Event()
+        self.dispatched = []
+        self.server = EventsApiServer(self.dispatch, 0, queue_depth=1).start()
+        self.poster = FakeEventPoster(self.server.port)
+
+    def tearDown(self):
+        self.released.set()
+        self.server.stop()
+
+    def dispatch(self, event):
+        self.released.wait(TIMEOUT)
+        self.dispatched.append(event["text"])
+
+    def test_callbacks_are_acknowledged_before_being_processed(self):
+        self.assertEqual(self.poster.post_message("C1", "U1", "!tasks"), (200, ""))
+
+        self.assertEqual(self.dispatched, [])
+        self.released.set()
+        self.server.stop()
+        self.assertEqual(self.dispatched, ["!tasks"])
+
+    def test_callbacks_are_rejected_when_the_queue_is_full(self):
+        statuses = [self.poster.post_message("C1", "U1", "!tasks " + str(index))[0] for index in range(3)]
+
+        self.assertEqual(statuses[-1], 503)
+
+
+class ApiClientMock(object):
+
+    def __init__(self, response):
+        self.response = response
+        self.calls = []
+
+    def api_call(self, method, **kwargs):
+        self.calls.append((method, kwargs))
+        return self.response
+
+
+class TestWebApiSender(TestCase):
+
+    def test_replies_are_posted_with_chat_post_message(self):
+        client = ApiClientMock({"ok": True})
+
+        WebApiSender(client).rtm_send_message("C1", "out")
+
+        self.assertEqual(client.calls, [("chat.postMessage", {"channel": "C1", "text": "out"})])
+
+    def test_failed_post_raises(self):
+        with self.assertRaises(IOError):
+            WebApiSender(ApiClientMock({"ok": False, "error": "ratelimited"})).rtm_send_message("C1", "out")
@@ -3,10 +3,12 @@ from future import standard_library
 
 standard_library.install_aliases()
 from builtins import object
+from builtins import range
 import sqlite3
 from unittest import TestCase
 
-from game.game import Game
+from game.events import DEFAULT_SNAPSHOT_INTERVAL
+from game.game import Game, PAGE_SIZE
 
 USER_NAME = "User1"
 USER_NAME2 = "User2"
@@ -19,17 +21,47 @@ TEST_ADMIN_LIST = [USER_ID]
 
 class MockConf(object):
 
-    def __init__(self, admins):
+    def __init__(self, admins, cache_size=0, shared=False):
         self.admins = admins
+        self.cache_size = cache_size
+        self.shared = shared
 
     def admin_list(self):
         return self.admins
 
+    def player_cache_size(self):
+        return self.cache_size
+
+    def shared_database(self):
+        return self.shared
+
+    @staticmethod
+    def snapshot_interval():
+        return DEFAULT_SNAPSHOT_INTERVAL
+
+    @staticmethod
+    def slow_query_ms():
+        return None
+
     @staticmethod
     def max_task_points():
         return 42
 
 
+class CommitCountingConnection(object):
+
+    def __init__(self, connection, commits):
+        self.connection = connection
+        self.commits = commits
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+    def commit(self):
+        self.commits.append(True)
+        self.connection.commit()
+
+
 class TestGame(TestCase):
 
     def setUp(self):
@@ -163,6 +195,60 @@ class TestGame(TestCase):
 
         self.assert_success(status, msg, "you are taking ownership of *New task* for 3 point(s)")
 
+    def test_take_task_is_rolled_back_when_score_update_fails(self):
+        self.join_and_add_task()
+
+        def failure(player_id, points_earned):
+            raise sqlite3.OperationalError("Provoked error")
+
+        self.game.players.update_points = failure
+        with self.assertRaises(sqlite3.OperationalError):
+            self.game.take_task(USER_ID, TASK_ID)
+
+        self.assertIsNone(self.game.assignments.user_of_task(int(TASK_ID)))
+
+    def test_take_task_commits_once(self):
+        self.join_and_add_task()
+        commits = []
+        connection = self.game.storage.connection
+        connection.connection = CommitCountingConnection(connection.connection, commits)
+
+        self.game.take_task(USER_ID, TASK_ID)
+
+        self.assertEquals(len(commits), 1)
+
+    def test_take_task_with_player_cache_reads_player_row_once(self):
+        self.use_player_cache()
+        self.join_and_add_task()
+        self.game.players.invalidate()
+        statements = []
+        self.game.storage.connection.set_trace_callback(statements.append)
+
+        (status, msg) = self.game.take_task(USER_ID, TASK_ID)
+
+        self.assert_success(status, msg, "Your new score is *3* point(s)")
+        self.assertEquals(len([sql for sql in statements if sql.startswith("SELECT * FROM PLAYER")]), 1)
+
+    def test_take_task_without_player_cache_reads_player_row_twice(self):
+        self.join_and_add_task()
+        statements = []
+        self.game.storage.connection.set_trace_callback(statements.append)
+
+        self.game.take_task(USER_ID, TASK_ID)
+
+        self.assertEquals(len([sql for sql in statements if sql.startswith("SELECT * FROM PLAYER")]), 2)
+
+    def test_player_cache_is_invalidated_when_unit_of_work_is_rolled_back(self):
+        self.use_player_cache()
+        self.join_and_add_task()
+
+        with self.assertRaises(ValueError):
+            with self.game.unit_of_work():
+                self.game.players.update_points(USER_ID, 10)
+                raise ValueError("Provoked error")
+
+        self.assertEquals(self.game.players.get_by_id(USER_ID).points, 0)
+
     def test_take_unknown_task_id_returns_false(self):
         self.join_and_add_task()
 
@@ -297,12 +383,162 @@ class TestGame(TestCase):
                    "> :heavy_check_mark: [*5*] *Fifth task* [*10* points] :point_right: *User5*\n"
         self.assertTrue(expected in msg)
 
+    def test_list_tasks_executes_constant_number_of_statements(self):
+        self.populate_tasks_list_and_assignments()
+        small_backlog = self.count_statements(self.game.list_tasks)
+        for index in range(20):
+            self.game.add_task(USER_ID, "1 Task " + str(index))
+            self.game.take_task("U" + str(index % 5 + 1), str(index + 6))
+
+        large_backlog = self.count_statements(self.game.list_tasks)
+
+        self.assertEquals(small_backlog, 2)
+        self.assertEquals(large_backlog, small_backlog)
+
+    def test_list_tasks_is_served_from_render_cache_until_state_changes(self):
+        self.join_and_add_task()
+        (status, before) = self.game.list_tasks()
+
+        statements = self.count_statements(self.game.list_tasks)
+        self.game.take_task(USER_ID, TASK_ID)
+        (status, after) = self.game.list_tasks()
+
+        self.assertEquals(statements, 0)
+        self.assertTrue("`!take 1`" in before)
+        self.assertTrue(":point_right: *User1*" in after)
+
+    def test_mutating_commands_invalidate_render_cache(self):
+        self.join_and_add_task()
+        self.game.join(USER_ID2, USER_NAME2)
+        mutations = [lambda: self.game.add_task(USER_ID, "2 Other task"),
+                     lambda: self.game.take_task(USER_ID, TASK_ID),
+                     lambda: self.game.drop_task(USER_ID, TASK_ID),
+                     lambda: self.game.assign_with_weighted_random(USER_ID, TASK_ID),
+                     lambda: self.game.close_task(USER_ID, TASK_ID),
+                     lambda: self.game.reset_all_scores(USER_ID),
+                     lambda: self.game.leave(USER_ID2),
+                     lambda: self.game.join(USER_ID2, USER_NAME2)]
+
+        for mutation in mutations:
+            self.game.list_high_scores()
+            version = self.game.renders.version
+
+            (status, msg) = mutation()
+
+            self.assertTrue(status)
+            self.assertTrue(self.game.renders.version > version)
+
+    def test_list_tasks_returns_requested_page(self):
+        self.game.join(USER_ID, USER_NAME)
+        for index in range(PAGE_SIZE + 2):
+            self.game.add_task(USER_ID, "1 Task " + str(index + 1))
+
+        (status, first_page) = self.game.list_tasks(USER_ID, "")
+        (status, msg) = self.game.list_tasks(USER_ID, "2")
+
+        self.assertTrue("*27 pending tasks* (page 1/2):\n" in first_page)
+        self.assertTrue("Next page: `!tasks 2`" in first_page)
+        self.assertEquals(first_page.count("\n> "), PAGE_SIZE)
+        self.assertTrue(status)
+        self.assertTrue("*27 pending tasks* (page 2/2):\n> :white_square: [*26*] *Task 26*" in msg)
+        self.assertEquals(msg.count("\n> "), 2)
+        self.assertFalse("Next page" in msg)
+
+    def test_list_tasks_with_invalid_page_returns_false(self):
+        self.join_and_add_task()
+
+        (status, msg) = self.game.list_tasks(USER_ID, "garbage")
+        self.assert_error(status, msg, "invalid page number, usage: `!tasks [page]`")
+
+        (status, msg) = self.game.list_tasks(USER_ID, "0")
+        self.assert_error(status, msg, "invalid page number")
+
+        (status, msg) = self.game.list_tasks(USER_ID, "2")
+        self.assert_error(status, msg, "there are only 1 page(s) of tasks.")
+
+    def test_list_high_scores_returns_requested_page_with_places(self):
+        for index in range(PAGE_SIZE + 2):
+            self.game.join("U" + str(index), "User" + str(index))
+        self.game.players.update_points("U0", 5)
+
+        (status, first_page) = self.game.list_high_scores(USER_ID, "1")
+        (status, msg) = self.game.list_high_scores(USER_ID, "2")
+
+        self.assertTrue("(27 players, page 1/2):\n> 1. :first_place_medal: *User0*" in first_page)
+        self.assertTrue("> 2. :second_place_medal: *User1*" in first_page)
+        self.assertTrue("Next page: `!score 2`" in first_page)
+        self.assertTrue(status)
+        self.assertTrue("> 26. :second_place_medal: *User25* (<@U25>) with *0* point(s)\n" in msg)
+        self.assertTrue("> 27. :second_place_medal: *User26*" in msg)
+
+    def test_list_high_scores_with_invalid_page_returns_false(self):
+        self.game.join(USER_ID, USER_NAME)
+
+        (status, msg) = self.game.list_high_scores(USER_ID, "-1")
+
+        self.assert_error(status, msg,
+                          "invalid page number, usage: `!score [week|month|since &lt;yyyy-mm-dd&gt;] [page]`")
+
     def test_list_high_scores_returns_true_when_no_score(self):
         (status, msg) = self.game.list_high_scores()
 
         self.assertTrue(status)
         self.assertTrue("No scores yet." in msg)
 
+    def test_list_high_scores_of_the_week_lists_points_earned_this_week(self):
+        self.join_and_add_task()
+        self.game.join(USER_ID2, USER_NAME2)
+        self.game.add_task(USER_ID, "5 Other task")
+        self.game.take_task(USER_ID, TASK_ID)
+        self.game.take_task(USER_ID2, TASK_ID2)
+        self.game.drop_task(USER_ID, TASK_ID)
+
+        (status, msg) = self.game.list_high_scores(USER_ID, "week")
+
+        self.assert_success(status, msg, "*High scores of the week* (2 players)")
+        self.assertTrue(msg.index("*" + USER_NAME2 + "* (<@" + USER_ID2 + ">) with *5*") <
+                        msg.index("*" + USER_NAME + "* (<@" + USER_ID + ">) with *0*"))
+
+    def test_list_high_scores_of_the_week_starts_again_after_a_reset(self):
+        self.join_and_add_task()
+        self.game.add_task(USER_ID, "5 Other task")
+        self.game.take_task(USER_ID, TASK_ID)
+        self.game.reset_all_scores(USER_ID)
+
+        self.assertEqual(self.game.list_high_scores(USER_ID, "week"), (True, "No scores of the week yet."))
+
+        self.game.take_task(USER_ID, TASK_ID2)
+        (status, msg) = self.game.list_high_scores(USER_ID, "week")
+        self.assertTrue("*" + USER_NAME + "* (<@" + USER_ID + ">) with *5*" in msg)
+
+    def test_list_high_scores_of_the_week_only_counts_the_points_actually_lost(self):
+        self.join_and_add_task()
+        self.game.take_task(USER_ID, TASK_ID)
+        self.game.reset_all_scores(USER_ID)
+        self.game.add_task(USER_ID, "2 Other task")
+        self.game.take_task(USER_ID, TASK_ID2)
+
+        (status, msg) = self.game.drop_task(USER_ID, TASK_ID)
+
+        self.assertTrue("your new score is *0* point(s)" in msg)
+        (status, msg) = self.game.list_high_scores(USER_ID, "week")
+        self.assertTrue("*" + USER_NAME + "* (<@" + USER_ID + ">) with *0*" in msg)
+
+    def test_list_high_scores_since_date_returns_true_when_no_score(self):
+        (status, msg) = self.game.list_high_scores(USER_ID, "since 2026-01-01")
+
+        self.assert_success(status, msg, "No scores since 2026-01-01 yet.")
+
+    def test_list_high_scores_with_invalid_window_returns_false(self):
+        (status, msg) = self.game.list_high_scores(USER_ID, "since yesterday")
+        self.assert_error(status, msg, "invalid date")
+
+        (status, msg) = self.game.list_high_scores(USER_ID, "since")
+        self.assert_error(status, msg, "missing date")
+
+        (status, msg) = self.game.list_high_scores(USER_ID, "month garbage")
+        self.assert_error(status, msg, "invalid page number")
+
     def test_list_high_scores_returns_ordered_players_list(self):
         self.populate_tasks_list_and_assignments()
 
@@ -365,13 +601,54 @@ class TestGame(TestCase):
         self.assertTrue(status)
         self.assertTrue("congrats <@U1>" in msg or "congrats <@U2>" in msg)
 
+    def test_add_task_notifies_task_listeners(self):
+        added = []
+        self.game.task_listeners.append(added.append)
+
+        self.join_and_add_task()
+
+        self.assertEquals(len(added), 1)
+        self.assertEquals(added[0].uid, 1)
+
+    def test_auto_assign_assigns_expired_task(self):
+        self.join_and_add_task()
+
+        (status, msg) = self.game.auto_assign(1, period=-1)
+
+        self.assert_success(status, msg, "Nobody took task 1 in time, the universe has spoken, congrats <@U1>")
+        self.assertEquals(self.game.assignments.user_of_task(1), USER_ID)
+
+    def test_auto_assign_returns_false_when_task_has_not_expired(self):
+        self.join_and_add_task()
+
+        (status, msg) = self.game.auto_assign(1)
+
+        self.assert_error(status, msg, "this task can still be taken")
+
+    def test_auto_assign_returns_false_when_task_is_taken_or_closed(self):
+        self.join_and_add_task()
+        self.game.add_task(USER_ID, "1 other task")
+        self.game.take_task(USER_ID, TASK_ID)
+        self.game.close_task(USER_ID, TASK_ID2)
+
+        self.assert_error(*(self.game.auto_assign(1, period=-1) + ("a player is already assigned to this task",)))
+        self.assert_error(*(self.game.auto_assign(2, period=-1) + ("this task does not exist",)))
+
+    def test_auto_assign_returns_false_without_player(self):
+        self.join_and_add_task()
+        self.game.leave(USER_ID)
+
+        (status, msg) = self.game.auto_assign(1, period=-1)
+
+        self.assert_error(status, msg, "no player to assign this task to")
+
     def test_help_returns_list_of_commands(self):
         (status, help_output) = self.game.help()
 
         self.assertTrue(status)
-        for command, (function, description) in list(self.game.commands().items()):
+        for command, entry in list(self.game.commands().items()):
             self.assertTrue(command in help_output)
-            self.assertTrue(description in help_output)
+            self.assertTrue(entry[1] in help_output)
 
     def test_reset_all_scores_returns_false_if_not_registered(self):
         self.join_and_add_task()
@@ -397,6 +674,17 @@ class TestGame(TestCase):
         self.assertTrue(status)
         self.assertTrue("you successfully reset all player scores to 0" in msg)
 
+    def count_statements(self, command):
+        statements = []
+        self.game.storage.connection.set_trace_callback(statements.append)
+        command()
+        self.game.storage.connection.set_trace_callback(None)
+        return len(statements)
+
+    def use_player_cache(self):
+        self.game.close()
+        self.game = Game(MockConf(TEST_ADMIN_LIST, 16), sqlite3.connect(":memory:"))
+
     def assert_error(self, status, msg, expected_msg):
         self.assertFalse(status)
         self.assertTrue(expected_msg in msg)
@@ -1,10 +1,18 @@
 # coding=utf-8
+import os
+import shutil
 import sqlite3
+import tempfile
+import time
 from builtins import object
+from builtins import range
 from unittest import TestCase
 
+from bot.messages import MAX_MESSAGE_SIZE
+from bot.workers import ChannelWorkerPool
 from game.game import Game
-from gamifybot import MessagesHandler
+from gamifybot import MessagesHandler, dispatch_event, OVERLOADED_MESSAGE
+from tests.test_game import MockConf
 
 
 class SlackClientMock(object):
@@ -30,6 +38,40 @@ class TestMessagesHandler(TestCase):
     def tearDown(self):
         self.game.close()
 
+    def test_auto_assignment_is_announced_in_channel_of_added_task(self):
+        game = Game(None, sqlite3.connect(":memory:", check_same_thread=False))
+        handler = MessagesHandler(self.client, game)
+        handler.start_auto_assign(period=0.01)
+        try:
+            handler.on_message("channel", "U1", "!join player1")
+            handler.on_message("other", "U1", "!add 2 task")
+            deadline = time.time() + 5
+            while len(self.client.invokes) < 3 and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            handler.close()
+            game.close()
+
+        self.assertEquals(self.client.invokes[2][0], "other")
+        self.assertTrue("Nobody took task 1 in time" in self.client.invokes[2][1])
+
+    def test_commands_read_the_writes_of_another_process_on_a_shared_database(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "shared.db")
+        first = Game(MockConf([], shared=True), sqlite3.connect(path))
+        second = Game(MockConf([], shared=True), sqlite3.connect(path))
+        try:
+            MessagesHandler(self.client, second).on_message("channel", "U1", "!score")
+            MessagesHandler(self.client, first).on_message("channel", "U1", "!join player1")
+            MessagesHandler(self.client, second).on_message("channel", "U1", "!score")
+        finally:
+            first.close()
+            second.close()
+            shutil.rmtree(directory)
+
+        self.assertEquals(self.client.invokes[0][1], "No scores yet.")
+        self.assertTrue("*player1*" in self.client.invokes[2][1])
+
     def test_init_populates_command_list(self):
         self.assertEquals(len(self.msg_handler.commands), 12)
 
@@ -61,3 +103,60 @@ class TestMessagesHandler(TestCase):
         self.msg_handler.on_message("channel", "U1", "!help")
 
         self.assertEquals(len(self.client.invokes), 0)
+
+    def test_dispatch_event_forwards_messages_with_right_params(self):
+        dispatch_event(self.msg_handler, {"type": "message", "channel": "channel", "user": "U1", "text": "!tasks"})
+        dispatch_event(self.msg_handler, {"type": "presence_change", "user": "U1"})
+        dispatch_event(self.msg_handler, {"type": "message", "channel": "channel", "text": "!tasks"})
+
+        self.assertEquals(len(self.client.invokes), 1)
+
+    def test_dispatch_event_skips_the_messages_of_the_bot(self):
+        msg_handler = MessagesHandler(self.client, self.game, bot_id="UBOT")
+
+        dispatch_event(msg_handler, {"type": "message", "channel": "channel", "user": "UBOT", "text": "!help"})
+
+        self.assertEquals(len(self.client.invokes), 0)
+        self.assertEquals(msg_handler.chatter.skipped, 1)
+
+    def test_on_message_with_pool_replies_in_order_for_each_channel(self):
+        game = Game(None, sqlite3.connect(":memory:", check_same_thread=False))
+        msg_handler = MessagesHandler(self.client, game, ChannelWorkerPool(workers=2))
+
+        msg_handler.on_message("C1", "U1", "!join User1")
+        msg_handler.on_message("C2", "U2", "!tasks")
+        msg_handler.on_message("C1", "U1", "!add 1 Hello task")
+        msg_handler.on_message("C1", "U1", "!take 1")
+        msg_handler.close()
+        game.close()
+
+        replies = [out for (channel, out) in self.client.invokes if channel == "C1"]
+        self.assertEquals(len(self.client.invokes), 4)
+        self.assertTrue("you are now registered" in replies[0])
+        self.assertTrue("added with id *1*" in replies[1])
+        self.assertTrue("you are taking ownership" in replies[2])
+
+    def test_on_message_with_full_pool_replies_overloaded(self):
+        pool = ChannelWorkerPool(workers=1, queue_depth=1, timeout=0)
+        msg_handler = MessagesHandler(self.client, self.game, pool)
+
+        with self.game.lock:
+            for _ in range(3):
+                msg_handler.on_message("C1", "U1", "!tasks")
+            overloaded = [out for (channel, out) in self.client.invokes]
+        msg_handler.close()
+
+        self.assertTrue(len(overloaded) > 0)
+        self.assertTrue(OVERLOADED_MESSAGE in overloaded[0])
+
+    def test_on_message_splits_long_replies(self):
+        self.msg_handler.on_message("C1", "U1", "!join User1")
+        for index in range(25):
+            self.msg_handler.on_message("C1", "U1", "!add 1 " + "x" * 200 + str(index))
+        self.client.invokes = []
+
+        self.msg_handler.on_message("C1", "U1", "!tasks")
+
+        self.assertTrue(len(self.client.invokes) > 1)
+        self.assertTrue(all(len(out) <= MAX_MESSAGE_SIZE for (channel, out) in self.client.invokes))
+        self.assertTrue("*25 pending tasks*" in self.client.invokes[0][1])
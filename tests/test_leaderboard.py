@@ -0,0 +1,53 @@
+# coding=utf-8
+from unittest import TestCase
+
+from game.leaderboard import Leaderboard
+
+
+class TestLeaderboard(TestCase):
+
+    def setUp(self):
+        self.leaderboard = Leaderboard([(1, "U1", "user1", 5), (2, "U2", "user2", 10), (3, "U3", "user3", 5)])
+
+    def test_init_sorts_by_points_then_registration_order(self):
+        self.assertEqual(self.leaderboard.top(), [("U2", "user2", 10), ("U1", "user1", 5), ("U3", "user3", 5)])
+        self.assertEqual(len(self.leaderboard), 3)
+
+    def test_top_with_limit_and_offset_returns_slice(self):
+        self.assertEqual(self.leaderboard.top(1), [("U2", "user2", 10)])
+        self.assertEqual(self.leaderboard.top(1, 2), [("U3", "user3", 5)])
+        self.assertEqual(self.leaderboard.top(5, 3), [])
+
+    def test_add_inserts_player_at_its_rank(self):
+        self.leaderboard.add(4, "U4", "user4", 7)
+
+        self.assertEqual([row[0] for row in self.leaderboard.top()], ["U2", "U4", "U1", "U3"])
+
+    def test_remove_deletes_player(self):
+        self.leaderboard.remove("U1")
+        self.leaderboard.remove("unknown")
+
+        self.assertEqual([row[0] for row in self.leaderboard.top()], ["U2", "U3"])
+
+    def test_set_points_moves_player(self):
+        self.leaderboard.set_points("U3", 11)
+        self.leaderboard.set_points("U2", 0)
+        self.leaderboard.set_points("unknown", 3)
+
+        self.assertEqual(self.leaderboard.top(), [("U3", "user3", 11), ("U1", "user1", 5), ("U2", "user2", 0)])
+
+    def test_set_points_for_all_ranks_by_registration_order(self):
+        self.leaderboard.set_points_for_all(0)
+
+        self.assertEqual(self.leaderboard.top(), [("U1", "user1", 0), ("U2", "user2", 0), ("U3", "user3", 0)])
+
+    def test_place_of_counts_distinct_greater_scores(self):
+        self.leaderboard.add(4, "U4", "user4", 7)
+        self.leaderboard.add(5, "U5", "user5", 1)
+
+        self.assertEqual(self.leaderboard.place_of(10), 1)
+        self.assertEqual(self.leaderboard.place_of(7), 2)
+        self.assertEqual(self.leaderboard.place_of(5), 3)
+        self.assertEqual(self.leaderboard.place_of(1), 4)
+        self.assertEqual(self.leaderboard.place_of(0), 5)
+        self.assertEqual(self.leaderboard.place_of(0, 3), 3)
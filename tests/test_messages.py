@@ -0,0 +1,21 @@
+# coding=utf-8
+from unittest import TestCase
+
+from bot.messages import split_message
+
+
+class TestSplitMessage(TestCase):
+
+    def test_split_message_returns_short_message_as_is(self):
+        self.assertEqual(list(split_message("hello\nworld", 20)), ["hello\nworld"])
+
+    def test_split_message_splits_on_line_breaks(self):
+        chunks = list(split_message("line 1\nline 2\nline 3\n", 14))
+
+        self.assertEqual(chunks, ["line 1\nline 2\n", "line 3\n"])
+
+    def test_split_message_splits_lines_too_long_for_a_message(self):
+        chunks = list(split_message("short\n" + "x" * 25 + "\nend", 10))
+
+        self.assertEqual("".join(chunks), "short\n" + "x" * 25 + "\nend")
+        self.assertTrue(all(len(chunk) <= 10 for chunk in chunks))
@@ -0,0 +1,139 @@
+# coding=utf-8
+import sqlite3
+from unittest import TestCase
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+from bot.metrics import CommandMetrics, Histogram, MetricsServer
+from bot.workers import ChannelWorkerPool
+from game.game import Game
+from gamifybot import MessagesHandler, dispatch_event
+from tests.test_handler import SlackClientMock
+
+TIMEOUT = 5
+
+
+class TestHistogram(TestCase):
+
+    def test_buckets_are_cumulative(self):
+        histogram = Histogram()
+        histogram.observe(0.0001)
+        histogram.observe(0.003)
+        histogram.observe(10.0)
+
+        lines = histogram.lines("latency", 'command="!take"')
+
+        self.assertTrue('latency_bucket{command="!take",le="0.0005"} 1\n' in lines)
+        self.assertTrue('latency_bucket{command="!take",le="0.005"} 2\n' in lines)
+        self.assertTrue('latency_bucket{command="!take",le="5.0"} 2\n' in lines)
+        self.assertTrue('latency_bucket{command="!take",le="+Inf"} 3\n' in lines)
+        self.assertTrue('latency_count{command="!take"} 3\n' in lines)
+
+    def test_lines_without_labels(self):
+        histogram = Histogram()
+        histogram.observe(0.003)
+
+        lines = histogram.lines("latency")
+
+        self.assertTrue('latency_bucket{le="0.005"} 1\n' in lines)
+        self.assertTrue("latency_count 1\n" in lines)
+
+
+class TestCommandMetrics(TestCase):
+
+    def test_render_lists_counters_and_histograms(self):
+        metrics = CommandMetrics()
+        metrics.record("!take", "success")
+        metrics.record("!take", "success")
+        metrics.record("!take", "failure")
+        metrics.observe("!take", "db", 0.002)
+
+        out = metrics.render()
+
+        self.assertTrue('gamify_commands_total{command="!take",result="success"} 2\n' in out)
+        self.assertTrue('gamify_commands_total{command="!take",result="failure"} 1\n' in out)
+        self.assertTrue("# TYPE gamify_command_duration_seconds histogram\n" in out)
+        self.assertTrue('gamify_command_duration_seconds_count{command="!take",phase="db"} 1\n' in out)
+
+    def test_server_serves_metrics_in_text_format(self):
+        metrics = CommandMetrics()
+        metrics.record("!help", "success")
+        server = MetricsServer(metrics, 0).start()
+        try:
+            response = urlopen("http://127.0.0.1:" + str(server.port) + "/metrics", timeout=TIMEOUT)
+            body = response.read().decode("utf-8")
+
+            self.assertTrue(response.headers["Content-Type"].startswith("text/plain; version=0.0.4"))
+            self.assertTrue('gamify_commands_total{command="!help",result="success"} 1' in body)
+
+            with self.assertRaises(HTTPError):
+                urlopen("http://127.0.0.1:" + str(server.port) + "/other", timeout=TIMEOUT)
+        finally:
+            server.stop()
+
+    def test_collectors_are_rendered(self):
+        metrics = CommandMetrics()
+        metrics.add_counter("gamify_wait_seconds_max", "Longest wait.", lambda: 0.5, "gauge")
+        metrics.add_collector(lambda: ["gamify_collected 3\n"])
+
+        out = metrics.render()
+
+        self.assertTrue("# TYPE gamify_wait_seconds_max gauge\ngamify_wait_seconds_max 0.5\n" in out)
+        self.assertTrue("gamify_collected 3\n" in out)
+
+
+class TestHandlerMetrics(TestCase):
+
+    def setUp(self):
+        self.game = Game(None, sqlite3.connect(":memory:", check_same_thread=False))
+        self.metrics = CommandMetrics()
+        self.msg_handler = MessagesHandler(SlackClientMock(), self.game, metrics=self.metrics)
+
+    def tearDown(self):
+        self.game.close()
+
+    def test_commands_are_counted_by_result_and_timed_by_phase(self):
+        self.msg_handler.on_message("C1", "U1", "!join user1")
+        self.msg_handler.on_message("C1", "U1", "!join user1")
+        self.msg_handler.on_message("C1", "U1", "!scores")
+
+        self.assertEqual(self.metrics.count("!join", "success"), 1)
+        self.assertEqual(self.metrics.count("!join", "failure"), 1)
+        self.assertEqual(self.metrics.count("!score", "success"), 1)
+        for phase in ("parse", "queue", "lock", "game", "db", "send"):
+            self.assertEqual(self.metrics.histograms[("!join", phase)].count, 2)
+        self.assertTrue(self.metrics.histograms[("!join", "db")].total > 0)
+
+    def test_pool_is_served_with_the_command_metrics(self):
+        pool = ChannelWorkerPool(workers=1)
+        msg_handler = MessagesHandler(SlackClientMock(), self.game, pool=pool, metrics=self.metrics)
+        msg_handler.on_message("C1", "U1", "!join user1")
+        pool.shutdown()
+
+        out = self.metrics.render()
+        self.assertTrue("gamify_pool_submitted_total 1\n" in out)
+        self.assertTrue("gamify_pool_executed_total 1\n" in out)
+        self.assertTrue("# TYPE gamify_pool_wait_seconds_max gauge\n" in out)
+        self.assertEqual(self.metrics.histograms[("!join", "queue")].count, 1)
+
+    def test_errors_are_counted(self):
+        self.msg_handler.table.resolve("!help").function = self.fail_command
+
+        self.msg_handler.on_message("C1", "U1", "!help")
+
+        self.assertEqual(self.metrics.count("!help", "error"), 1)
+
+    def test_skipped_events_are_counted(self):
+        dispatch_event(self.msg_handler, {"type": "message", "channel": "C1", "user": "U1", "text": "hello there"})
+        dispatch_event(self.msg_handler, {"type": "message", "channel": "C1", "user": "U1", "text": "!help"})
+
+        self.assertTrue("gamify_events_skipped_total 1\n" in self.metrics.render())
+
+    def test_unknown_commands_are_not_recorded(self):
+        self.msg_handler.on_message("C1", "U1", "hello there")
+
+        self.assertEqual(self.metrics.histograms, {})
+
+    @staticmethod
+    def fail_command(player_id, argument):
+        raise ValueError("Provoked error")
@@ -0,0 +1,169 @@
+# coding=utf-8
+import sqlite3
+import threading
+import time
+from builtins import object
+from builtins import range
+from unittest import TestCase
+
+from bot.metrics import CommandMetrics
+from bot.outbound import OutboundQueue, TokenBucket
+from game.game import Game
+from gamifybot import MessagesHandler
+
+
+class RecordingClient(object):
+    """
+    Records the sent messages, after failing the given number of sends.
+    """
+
+    def __init__(self, failures=0):
+        self.lock = threading.Lock()
+        self.failures = failures
+        self.sent = []
+        self.times = []
+
+    def rtm_send_message(self, channel, out):
+        with self.lock:
+            if self.failures > 0:
+                self.failures -= 1
+                raise IOError("Provoked error")
+            self.sent.append((channel, out))
+            self.times.append(time.time())
+
+
+class TestTokenBucket(TestCase):
+
+    def test_tokens_are_refilled_at_the_rate_up_to_the_capacity(self):
+        bucket = TokenBucket(2.0, 2, 0.0)
+        bucket.take(0.0)
+        bucket.take(0.0)
+
+        self.assertAlmostEqual(bucket.delay(0.0), 0.5)
+        self.assertEqual(bucket.delay(0.5), 0.0)
+        self.assertEqual(bucket.delay(10.0), 0.0)
+        self.assertEqual(bucket.tokens, 2)
+
+
+class TestOutboundQueue(TestCase):
+
+    def setUp(self):
+        self.failures = []
+
+    def on_failure(self, channel, text, error):
+        self.failures.append((channel, text))
+
+    def create_queue(self, client, **kwargs):
+        kwargs.setdefault("backoff", 0.01)
+        return OutboundQueue(client, on_failure=self.on_failure, **kwargs)
+
+    def test_replies_are_sent_in_order_for_each_channel(self):
+        client = RecordingClient()
+        queue = self.create_queue(client, rate=1000.0)
+        for index in range(20):
+            queue.rtm_send_message("C" + str(index % 2), str(index))
+        queue.close()
+
+        for channel in ("C0", "C1"):
+            texts = "\n".join(out for (sent_channel, out) in client.sent if sent_channel == channel)
+            self.assertEqual(texts.split("\n"), [str(index) for index in range(20) if "C" + str(index % 2) == channel])
+        self.assertEqual(self.failures, [])
+
+    def test_burst_is_coalesced_into_few_messages(self):
+        client = RecordingClient()
+        queue = self.create_queue(client, rate=10.0, burst=1)
+        started = time.time()
+        for index in range(50):
+            queue.rtm_send_message("C1", str(index))
+        queue.close()
+
+        self.assertTrue(len(client.sent) <= 2)
+        self.assertEqual("\n".join(out for (channel, out) in client.sent), "\n".join(str(i) for i in range(50)))
+        self.assertTrue(time.time() - started < 1.0)
+        self.assertEqual(queue.metrics.snapshot()["coalesced"], 50 - len(client.sent))
+
+    def test_messages_are_not_coalesced_over_the_maximum_size(self):
+        client = RecordingClient()
+        queue = self.create_queue(client, rate=10.0, burst=1, max_size=5)
+        for index in range(4):
+            queue.rtm_send_message("C1", "abc")
+        queue.close()
+
+        self.assertEqual(client.sent, [("C1", "abc")] * 4)
+
+    def test_sends_are_limited_to_the_rate_of_the_channel(self):
+        client = RecordingClient()
+        queue = self.create_queue(client, rate=20.0, burst=2, max_size=1)
+        for index in range(6):
+            queue.rtm_send_message("C1", str(index))
+        queue.close()
+
+        self.assertEqual(len(client.sent), 6)
+        self.assertTrue(client.times[-1] - client.times[0] >= 0.15)
+
+    def test_failed_send_is_retried(self):
+        client = RecordingClient(failures=2)
+        queue = self.create_queue(client)
+        queue.rtm_send_message("C1", "reply")
+        queue.close()
+
+        self.assertEqual(client.sent, [("C1", "reply")])
+        self.assertEqual(queue.metrics.snapshot()["retried"], 2)
+        self.assertEqual(self.failures, [])
+
+    def test_failed_send_is_reported_after_its_last_retry(self):
+        client = RecordingClient(failures=10)
+        queue = self.create_queue(client, retries=2)
+        queue.rtm_send_message("C1", "reply")
+        queue.close()
+
+        self.assertEqual(client.sent, [])
+        self.assertEqual(self.failures, [("C1", "reply")])
+        self.assertEqual(queue.metrics.snapshot()["failed"], 1)
+
+    def test_messages_pending_on_close_timeout_are_reported(self):
+        client = RecordingClient(failures=10)
+        queue = self.create_queue(client, backoff=10.0)
+        queue.rtm_send_message("C1", "reply")
+        queue.close(timeout=0.1)
+
+        self.assertEqual(self.failures, [("C1", "reply")])
+
+    def test_counters_are_served_with_the_command_metrics(self):
+        metrics = CommandMetrics()
+        queue = self.create_queue(RecordingClient())
+        queue.metrics.register(metrics)
+        queue.rtm_send_message("C1", "reply")
+        queue.close()
+
+        out = metrics.render()
+        self.assertTrue("gamify_outbound_sent_total 1\n" in out)
+        self.assertTrue("gamify_outbound_send_seconds_count 1\n" in out)
+        self.assertTrue("gamify_outbound_latency_seconds_count 1\n" in out)
+
+    def test_failed_sends_are_timed(self):
+        queue = self.create_queue(RecordingClient(failures=1))
+        queue.rtm_send_message("C1", "reply")
+        queue.close()
+
+        self.assertEqual(queue.metrics.send_time.count, 2)
+        self.assertEqual(queue.metrics.latency.count, 1)
+
+    def test_closed_queue_rejects_replies(self):
+        queue = self.create_queue(RecordingClient())
+        queue.close()
+
+        with self.assertRaises(RuntimeError):
+            queue.rtm_send_message("C1", "reply")
+
+    def test_failed_reply_of_handler_is_not_lost(self):
+        client = RecordingClient(failures=1)
+        queue = self.create_queue(client)
+        game = Game(None, sqlite3.connect(":memory:"))
+        handler = MessagesHandler(queue, game)
+
+        handler.on_message("channel", "U1", "!tasks")
+        queue.close()
+        game.close()
+
+        self.assertEqual(client.sent, [("channel", "No pending task.")])
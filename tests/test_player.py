@@ -3,6 +3,7 @@ from builtins import range
 from unittest import TestCase
 
 from game.player import PlayerRepository, Player
+from tests.helpers import query_plan
 
 PLAYER_ID_1 = "U1"
 USER_1 = "user1"
@@ -50,6 +51,28 @@ class TestPlayerRepository(TestCase):
 
         self.assertFalse(self.players.name_exists("unknown"))
 
+    def test_name_exists_ignores_case(self):
+        self.players.add(PLAYER_1)
+
+        self.assertEqual(self.players.name_exists("USER1").player_id, PLAYER_ID_1)
+
+    def test_name_exists_does_not_treat_underscore_as_wildcard(self):
+        self.players.add(Player("U2", "user_2"))
+
+        self.assertIsNone(self.players.name_exists("userX2"))
+        self.assertIsNotNone(self.players.name_exists("User_2"))
+
+    def test_name_exists_uses_nocase_index(self):
+        plan = query_plan(self.con, "SELECT * FROM PLAYER WHERE name=? COLLATE NOCASE", (USER_1,))
+
+        self.assertTrue("USING INDEX PLAYER_NAME_NOCASE" in plan, plan)
+
+    def test_load_leaderboard_reads_points_index_without_sorting(self):
+        plan = query_plan(self.con, "SELECT rowid, id, name, points FROM PLAYER ORDER BY points DESC, rowid")
+
+        self.assertTrue("USING INDEX PLAYER_POINTS" in plan, plan)
+        self.assertFalse("TEMP B-TREE" in plan, plan)
+
     def test_remove_returns_false_when_user_unknown(self):
         self.players.add(PLAYER_1)
 
@@ -101,6 +124,56 @@ class TestPlayerRepository(TestCase):
         self.assertEquals(scores[1].name, USER_1)
         self.assertEquals(scores[2].name, "user3")
 
+    def test_scores_matches_table_after_updates(self):
+        for index in range(10):
+            self.players.add(Player("U" + str(index), "user" + str(index)))
+        self.players.scores()
+
+        self.players.update_points("U3", 5)
+        self.players.update_points("U7", 5)
+        self.players.remove("U0")
+        self.players.add(Player("U10", "user10", 8))
+        self.players.reset_points(9, "U1")
+
+        expected = [(row[0], row[2]) for row in
+                    self.con.execute("SELECT * FROM PLAYER ORDER BY points DESC, rowid").fetchall()]
+        self.assertEquals([(player.player_id, player.points) for player in self.players.scores()], expected)
+        self.assertEquals(self.players.count(), 10)
+
+    def test_scores_with_limit_and_offset_returns_page(self):
+        self.players.add(PLAYER_1)
+        self.players.add(Player("U2", "user2", 3))
+        self.players.add(Player("U3", "user3", 2))
+
+        scores = self.players.scores(1, 1)
+
+        self.assertEquals(len(scores), 1)
+        self.assertEquals(scores[0].name, "user3")
+
+    def test_scores_reloads_after_invalidate(self):
+        self.players.add(PLAYER_1)
+        self.players.scores()
+        self.con.execute("UPDATE PLAYER SET points=42")
+
+        self.players.invalidate()
+
+        self.assertEquals(self.players.scores()[0].points, 42)
+
+    def test_pick_random_user_picks_among_current_players(self):
+        self.players.add(PLAYER_1)
+        self.players.add(Player("U2", "user2"))
+        self.players.pick_random_user()
+
+        self.players.remove("U2")
+        self.players.add(Player("U3", "user3"))
+        self.players.update_points("U3", 10)
+
+        picked = set(self.players.pick_random_user().player_id for _ in range(200))
+        self.assertEquals(picked, {PLAYER_ID_1})
+
+    def test_pick_random_user_returns_none_without_player(self):
+        self.assertIsNone(self.players.pick_random_user())
+
     def test_scores_returns_empty_list_of_players(self):
         scores = self.players.scores()
 
@@ -153,3 +226,79 @@ class TestPlayerRepository(TestCase):
         valid = self.players.validate_name_format("hey-hello_Ok1")
 
         self.assertTrue(valid)
+
+
+class TestPlayerRepositoryWithCache(TestCase):
+
+    def setUp(self):
+        self.con = sqlite3.connect(":memory:")
+        self.players = PlayerRepository(self.con, 2)
+
+    def tearDown(self):
+        self.con.close()
+
+    def test_get_by_id_is_served_from_cache(self):
+        self.players.add(PLAYER_1)
+
+        self.players.get_by_id(PLAYER_ID_1)
+        self.players.get_by_id(PLAYER_ID_1)
+
+        self.assertEquals(self.players.cache.hits, 2)
+        self.assertEquals(self.players.cache.misses, 1)  # Checked by add()
+
+    def test_get_by_id_caches_unknown_player(self):
+        self.assertIsNone(self.players.get_by_id("unknown"))
+        self.assertIsNone(self.players.get_by_id("unknown"))
+
+        self.assertEquals(self.players.cache.hits, 1)
+
+    def test_add_replaces_cached_unknown_player(self):
+        self.players.get_by_id(PLAYER_ID_1)
+
+        self.players.add(PLAYER_1)
+
+        self.assertEquals(self.players.get_by_id(PLAYER_ID_1).name, USER_1)
+
+    def test_remove_is_visible_through_cache(self):
+        self.players.add(PLAYER_1)
+
+        self.players.remove(PLAYER_ID_1)
+
+        self.assertIsNone(self.players.get_by_id(PLAYER_ID_1))
+
+    def test_update_and_reset_points_are_visible_through_cache(self):
+        self.players.add(PLAYER_1)
+        self.players.add(Player("U2", "user2"))
+
+        self.players.update_points(PLAYER_ID_1, 10)
+        self.assertEquals(self.players.get_by_id(PLAYER_ID_1).points, 10)
+
+        self.players.reset_points(3)
+        self.assertEquals(self.players.get_by_id(PLAYER_ID_1).points, 3)
+        self.assertEquals(self.players.get_by_id("U2").points, 3)
+
+    def test_cached_player_is_not_modified_by_caller(self):
+        self.players.add(PLAYER_1)
+
+        self.players.get_by_id(PLAYER_ID_1).points = 1337
+
+        self.assertEquals(self.players.get_by_id(PLAYER_ID_1).points, 0)
+
+    def test_cache_evicts_least_recently_used_player(self):
+        self.players.add(PLAYER_1)
+        self.players.add(Player("U2", "user2"))
+        self.players.get_by_id(PLAYER_ID_1)
+
+        self.players.add(Player("U3", "user3"))
+
+        self.assertTrue(PLAYER_ID_1 in self.players.cache.entries)
+        self.assertFalse("U2" in self.players.cache.entries)
+        self.assertEquals(len(self.players.cache.entries), 2)
+
+    def test_invalidate_drops_cached_player(self):
+        self.players.add(PLAYER_1)
+        self.con.execute("UPDATE PLAYER SET points=42")
+
+        self.players.invalidate(PLAYER_ID_1)
+
+        self.assertEquals(self.players.get_by_id(PLAYER_ID_1).points, 42)
@@ -0,0 +1,151 @@
+# coding=utf-8
+import sqlite3
+from unittest import TestCase
+
+from game.game import Game
+from game.timing import QueryTimer, TimedConnection
+from gamifybot import MessagesHandler
+from tests.test_game import MockConf
+from tests.test_handler import SlackClientMock
+
+USER_ID = "U1"
+USER_ID2 = "U2"
+
+# Maximum number of statements of each command, BEGIN and COMMIT included.
+# A score update inserts its day and month buckets when the player has none yet, after an UPDATE changing no row.
+QUERY_BUDGETS = {
+    "!join": 7,
+    "!add": 5,
+    "!take": 13,
+    "!roulette": 16,
+    "!drop": 13,
+    "!close": 7,
+    "!leave": 8,
+    "!tasks": 2,
+    "!score": 2,
+    "!admin:reset": 6,
+    "!help": 0
+}
+
+
+class QueryBudgetAssertions(object):
+    """
+    Runs commands through a MessagesHandler and checks the statements they execute.
+    """
+
+    def create_handler(self, game):
+        self.traces = []
+        return MessagesHandler(SlackClientMock(), game, query_listener=self.on_queries)
+
+    def on_queries(self, command, queries):
+        self.traces.append((command, queries))
+
+    def assert_query_budget(self, handler, player_id, message, budget):
+        """
+        :param budget: Maximum number of statements of the command.
+        :return: The list of the queries of the command.
+        """
+
+        del self.traces[:]
+        handler.on_message("C1", player_id, message)
+        self.assertEqual(len(self.traces), 1, "'" + message + "' was not executed")
+
+        (command, queries) = self.traces[0]
+        self.assertTrue(len(queries) <= budget,
+                        "'" + message + "' executed " + str(len(queries)) + " statements, the budget is " +
+                        str(budget) + ":\n" + "\n".join(repr(query) for query in queries))
+        return queries
+
+
+class TestQueryBudgets(QueryBudgetAssertions, TestCase):
+
+    def setUp(self):
+        self.game = Game(MockConf([USER_ID]), sqlite3.connect(":memory:"))
+        self.handler = self.create_handler(self.game)
+
+    def tearDown(self):
+        self.game.close()
+
+    def command(self, message, player_id=USER_ID):
+        return self.assert_query_budget(self.handler, player_id, message, QUERY_BUDGETS[message.split()[0]])
+
+    def test_commands_stay_within_their_query_budget(self):
+        self.command("!join user1")
+        self.command("!join user2", USER_ID2)
+        self.command("!add 3 first task")
+        self.command("!add 5 second task")
+        self.command("!take 1")
+        self.command("!roulette 2")
+        self.command("!drop 1")
+        self.command("!tasks")
+        self.command("!score")
+        self.command("!score week")
+        self.command("!close 2")
+        self.command("!admin:reset")
+        self.command("!help")
+        self.command("!leave", USER_ID2)
+
+    def test_leave_with_auto_assign_reads_only_the_tasks_of_the_player(self):
+        game = Game(MockConf([USER_ID]), sqlite3.connect(":memory:", check_same_thread=False))
+        handler = self.create_handler(game)
+        handler.start_auto_assign(period=3600)
+        released = []
+        game.release_listeners.append(lambda task: released.append(task.uid))
+        try:
+            self.assert_query_budget(handler, USER_ID, "!join user1", QUERY_BUDGETS["!join"])
+            self.assert_query_budget(handler, USER_ID2, "!join user2", QUERY_BUDGETS["!join"])
+            for index in range(30):
+                self.assert_query_budget(handler, USER_ID, "!add 1 task " + str(index), QUERY_BUDGETS["!add"])
+                self.assert_query_budget(handler, USER_ID if index < 28 else USER_ID2, "!take " + str(index + 1),
+                                         QUERY_BUDGETS["!take"])
+
+            # One more statement than without auto-assign, listing the released tasks
+            queries = self.assert_query_budget(handler, USER_ID2, "!leave", QUERY_BUDGETS["!leave"] + 1)
+
+            self.assertTrue(sum(query.rows for query in queries) < 28)
+            self.assertEqual(released, [29, 30])
+        finally:
+            handler.close()
+            game.close()
+
+    def test_read_only_commands_scale_with_the_page_not_the_game(self):
+        self.command("!join user1")
+        for index in range(60):
+            self.command("!add 3 task " + str(index))
+
+        queries = self.command("!tasks 2")
+
+        self.assertEqual(sum(query.rows for query in queries), 1 + 25)
+
+    def test_statements_are_recorded_with_their_row_count(self):
+        self.command("!join user1")
+
+        queries = self.command("!add 3 task")
+
+        self.assertEqual([(query.sql.split()[0], query.rows) for query in queries],
+                         [("SELECT", 1), ("BEGIN", 0), ("INSERT", 1), ("INSERT", 1), ("COMMIT", 0)])
+
+
+class TestSlowQueryLog(TestCase):
+
+    def test_statements_slower_than_threshold_are_logged_once(self):
+        slow = []
+        timer = QueryTimer(0.0, slow.append)
+        con = TimedConnection(sqlite3.connect(":memory:"), timer)
+
+        cursor = con.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchall()
+
+        self.assertEqual([query.sql for query in slow], ["SELECT 1"])
+        con.close()
+
+    def test_statements_are_not_recorded_without_trace_nor_threshold(self):
+        timer = QueryTimer()
+
+        self.assertIsNone(timer.begin("SELECT 1"))
+        with timer.trace() as queries:
+            timer.end(timer.begin("SELECT 1"), 0.001, 1)
+
+        self.assertEqual([(query.sql, query.rows) for query in queries], [("SELECT 1", 1)])
+        self.assertIsNone(timer.begin("SELECT 1"))
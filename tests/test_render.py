@@ -0,0 +1,32 @@
+# coding=utf-8
+from unittest import TestCase
+
+from game.render import RenderCache
+
+
+class TestRenderCache(TestCase):
+
+    def setUp(self):
+        self.cache = RenderCache()
+
+    def test_get_returns_output_put_at_current_version(self):
+        self.cache.put(self.cache.version, "key", "output")
+
+        self.assertEqual(self.cache.get("key"), "output")
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_get_returns_none_after_invalidate(self):
+        self.cache.put(self.cache.version, "key", "output")
+
+        self.cache.invalidate()
+
+        self.assertIsNone(self.cache.get("key"))
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_put_ignores_output_rendered_from_previous_version(self):
+        version = self.cache.version
+        self.cache.invalidate()
+
+        self.cache.put(version, "key", "output")
+
+        self.assertIsNone(self.cache.get("key"))
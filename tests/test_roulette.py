@@ -0,0 +1,69 @@
+# coding=utf-8
+from __future__ import division
+
+import random
+from builtins import range
+from unittest import TestCase
+
+from game.roulette import Roulette
+
+DRAWS = 20000
+
+# Critical value of the chi-squared distribution for 3 degrees of freedom at p = 0.001
+CHI_SQUARED_CRITICAL_VALUE = 16.27
+
+
+class TestRoulette(TestCase):
+
+    def setUp(self):
+        self.roulette = Roulette([("U1", 0), ("U2", 10), ("U3", 30), ("U4", 0)], random.Random(42))
+
+    def draw(self, count=DRAWS):
+        counts = dict((player_id, 0) for player_id in self.roulette.slots)
+        for _ in range(count):
+            counts[self.roulette.pick()] += 1
+        return counts
+
+    def assert_follows_weights(self, counts):
+        chi_squared = 0.0
+        for player_id, observed in counts.items():
+            expected = self.roulette.probability_of(player_id) * DRAWS
+            chi_squared += (observed - expected) ** 2 / expected
+
+        self.assertTrue(chi_squared < CHI_SQUARED_CRITICAL_VALUE, "chi squared: " + str(chi_squared))
+
+    def test_probability_of_is_inverse_of_score_share(self):
+        # Weights: 150 for players without points, else 100 * (1 - points / total)
+        self.assertAlmostEqual(self.roulette.probability_of("U1"), 150 / 400)
+        self.assertAlmostEqual(self.roulette.probability_of("U2"), 75 / 400)
+        self.assertAlmostEqual(self.roulette.probability_of("U3"), 25 / 400)
+        self.assertAlmostEqual(self.roulette.probability_of("U4"), 150 / 400)
+
+    def test_pick_follows_inverse_score_distribution(self):
+        self.assert_follows_weights(self.draw())
+
+    def test_pick_follows_distribution_after_updates(self):
+        for index in range(40):
+            self.roulette.add("X" + str(index), index)
+        for index in range(40):
+            self.roulette.remove("X" + str(index))
+        self.roulette.set_points("U1", 20)
+        self.roulette.set_points("U3", 0)
+
+        self.assertAlmostEqual(self.roulette.probability_of("U3"), 150 / (100 / 3 + 200 / 3 + 300))
+        self.assert_follows_weights(self.draw())
+
+    def test_pick_returns_none_without_player(self):
+        self.assertIsNone(Roulette().pick())
+
+    def test_pick_returns_single_player_owning_all_points(self):
+        roulette = Roulette([("U1", 12)])
+
+        self.assertEqual(roulette.pick(), "U1")
+
+    def test_pick_never_returns_removed_player(self):
+        self.roulette.remove("U1")
+        self.roulette.remove("U4")
+
+        self.assertEqual(set(self.draw(1000).keys()), {"U2", "U3"})
+        self.assertEqual(len(self.roulette), 2)
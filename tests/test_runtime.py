@@ -0,0 +1,98 @@
+# coding=utf-8
+import socket
+import threading
+from builtins import object
+from unittest import TestCase
+
+from bot.runtime import RtmRuntime
+
+
+class FakeWebsocket(object):
+
+    def __init__(self, sock):
+        self.sock = sock
+
+
+class FakeServer(object):
+
+    def __init__(self, sock):
+        self.websocket = FakeWebsocket(sock)
+
+
+class FakeRtmClient(object):
+    """
+    Mimics slackclient's RTM API: a byte written on the socket pair signals each pushed event.
+    """
+
+    def __init__(self):
+        self.reader, self.writer = socket.socketpair()
+        self.reader.setblocking(False)
+        self.server = FakeServer(self.reader)
+        self.events = []
+        self.lock = threading.Lock()
+        self.fail_read = False
+
+    def push(self, event):
+        with self.lock:
+            self.events.append(event)
+        self.writer.send(b"x")
+
+    def rtm_read(self):
+        if self.fail_read:
+            raise IOError("Connection closed")
+
+        try:
+            self.reader.recv(1)
+        except socket.error:
+            pass
+
+        with self.lock:
+            if len(self.events) == 0:
+                return []
+            return [self.events.pop(0)]
+
+    def close(self):
+        self.reader.close()
+        self.writer.close()
+
+
+class TestRtmRuntime(TestCase):
+
+    def setUp(self):
+        self.client = FakeRtmClient()
+        self.dispatched = []
+        self.runtime = RtmRuntime(self.client, self.dispatch)
+
+    def tearDown(self):
+        self.runtime.close()
+        self.client.close()
+
+    def dispatch(self, event):
+        self.dispatched.append(event)
+        if event.get("last"):
+            self.runtime.stop()
+
+    def test_run_forever_dispatches_events_in_order(self):
+        self.client.push({"id": 1})
+        self.client.push({"id": 2})
+        self.client.push({"id": 3, "last": True})
+
+        self.runtime.run_forever()
+
+        self.assertEqual([event["id"] for event in self.dispatched], [1, 2, 3])
+
+    def test_run_forever_wakes_up_on_event_pushed_later(self):
+        timer = threading.Timer(0.05, self.client.push, [{"id": 1, "last": True}])
+        timer.start()
+
+        self.runtime.run_forever()
+
+        self.assertEqual(len(self.dispatched), 1)
+
+    def test_run_forever_raises_read_error(self):
+        self.client.fail_read = True
+        self.client.push({"id": 1})
+
+        with self.assertRaises(IOError):
+            self.runtime.run_forever()
+
@@ -0,0 +1,134 @@
+# coding=utf-8
+import sqlite3
+import threading
+import time
+from unittest import TestCase
+
+from bot.scheduler import AssignmentScheduler
+from game.game import Game
+from game.task import Task
+from gamifybot import MessagesHandler
+from tests.test_game import MockConf
+
+PERIOD = 0.05
+
+TIMEOUT = 5
+
+
+class Announcements(object):
+
+    def __init__(self):
+        self.sent = []
+        self.event = threading.Event()
+
+    def send(self, channel, out):
+        self.sent.append((channel, out))
+        self.event.set()
+
+    def rtm_send_message(self, channel, out):
+        if "Nobody took task" in out:
+            self.send(channel, out)
+
+
+class TestAssignmentScheduler(TestCase):
+
+    def setUp(self):
+        self.game = Game(MockConf([]), sqlite3.connect(":memory:", check_same_thread=False))
+        self.game.join("U1", "player1")
+        self.announcements = Announcements()
+        self.scheduler = AssignmentScheduler(self.game, self.announcements.send, "default", PERIOD, PERIOD)
+
+    def tearDown(self):
+        self.scheduler.stop()
+        self.game.close()
+
+    def wait_for_announcement(self):
+        self.assertTrue(self.announcements.event.wait(TIMEOUT))
+
+    def test_start_schedules_unassigned_tasks_only(self):
+        self.game.tasks.insert(Task("pending"))
+        taken_id = self.game.tasks.insert(Task("taken"))
+        self.game.assignments.assign(taken_id, "U1")
+
+        self.scheduler.start()
+        self.wait_for_announcement()
+
+        self.assertEqual(len(self.announcements.sent), 1)
+        self.assertEqual(self.announcements.sent[0][0], "default")
+        self.assertIn("Nobody took task 1 in time", self.announcements.sent[0][1])
+        self.assertEqual(self.game.assignments.user_of_task(1), "U1")
+
+    def test_schedule_assigns_task_once_expired(self):
+        self.scheduler.start()
+        task_id = self.game.tasks.insert(Task("description", 3))
+        started = time.time()
+        self.scheduler.schedule(self.game.tasks.get(task_id), "channel")
+
+        self.wait_for_announcement()
+
+        self.assertTrue(time.time() - started >= PERIOD)
+        self.assertEqual(self.announcements.sent[0][0], "channel")
+        self.assertEqual(self.game.players.get_by_id("U1").points, 3)
+        self.assertEqual(len(self.scheduler), 0)
+
+    def test_schedule_wakes_up_for_a_nearer_deadline(self):
+        self.scheduler.start()
+        later_id = self.game.tasks.insert(Task("later", 1, time.time() + 60))
+        self.scheduler.schedule(self.game.tasks.get(later_id))
+        sooner_id = self.game.tasks.insert(Task("sooner"))
+        self.scheduler.schedule(self.game.tasks.get(sooner_id), "channel")
+
+        self.wait_for_announcement()
+
+        self.assertEqual(self.game.assignments.user_of_task(sooner_id), "U1")
+        self.assertIsNone(self.game.assignments.user_of_task(later_id))
+        self.assertEqual(len(self.scheduler), 1)
+
+    def test_taken_task_is_skipped(self):
+        self.scheduler.start()
+        task_id = self.game.tasks.insert(Task("taken"))
+        self.scheduler.schedule(self.game.tasks.get(task_id), "channel")
+        self.game.take_task("U1", str(task_id))
+        next_id = self.game.tasks.insert(Task("next"))
+        self.scheduler.schedule(self.game.tasks.get(next_id), "channel")
+
+        self.wait_for_announcement()
+
+        self.assertEqual(len(self.announcements.sent), 1)
+        self.assertIn("Nobody took task " + str(next_id), self.announcements.sent[0][1])
+
+    def test_stop_returns_while_waiting(self):
+        self.scheduler.start()
+        task_id = self.game.tasks.insert(Task("later", 1, time.time() + 60))
+        self.scheduler.schedule(self.game.tasks.get(task_id))
+
+        self.scheduler.stop()
+
+        self.assertFalse(self.scheduler.thread.is_alive())
+
+    def test_dropped_task_is_assigned_after_a_new_period(self):
+        handler = MessagesHandler(self.announcements, self.game)
+        handler.start_auto_assign("default", PERIOD)
+        task_id = self.game.tasks.insert(Task("expired", 1, time.time() - 60))
+        self.game.assignments.assign(task_id, "U1")
+
+        dropped = time.time()
+        handler.on_message("channel", "U1", "!drop " + str(task_id))
+        self.wait_for_announcement()
+        handler.close()
+
+        self.assertTrue(time.time() - dropped >= PERIOD)
+        self.assertEqual(self.announcements.sent[0][0], "channel")
+        self.assertEqual(self.game.assignments.user_of_task(task_id), "U1")
+
+    def test_task_is_retried_when_it_cannot_be_assigned(self):
+        self.game.leave("U1")
+        self.game.tasks.insert(Task("expired", 1, time.time() - 60))
+        self.scheduler.start()
+
+        time.sleep(PERIOD * 2)  # Assignments fail without players
+        self.assertEqual(self.announcements.sent, [])
+        self.game.join("U2", "player2")
+        self.wait_for_announcement()
+
+        self.assertEqual(self.game.assignments.user_of_task(1), "U2")
@@ -0,0 +1,260 @@
+# coding=utf-8
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from datetime import date
+from unittest import TestCase
+
+from game.game import Game
+from game.memory import MemoryStorage
+from game.player import Player
+from game.storage import SqliteStorage
+from game.task import Task
+from tests.test_game import MockConf
+
+
+class StorageContract(object):
+    """
+    Behaviour expected from every storage backend, run against each of them by the test cases below.
+    """
+
+    def create_storage(self):
+        raise NotImplementedError()
+
+    def setUp(self):
+        self.storage = self.create_storage()
+        self.players = self.storage.players
+        self.tasks = self.storage.tasks
+        self.assignments = self.storage.assignments
+
+    def tearDown(self):
+        self.storage.close()
+
+    def test_players_are_added_found_and_removed(self):
+        self.assertTrue(self.players.add(Player("U1", "user1")))
+        self.assertFalse(self.players.add(Player("U1", "user1")))
+
+        self.assertEqual(self.players.get_by_id("U1").name, "user1")
+        self.assertEqual(self.players.name_exists("USER1").player_id, "U1")
+        self.assertIsNone(self.players.name_exists("user2"))
+
+        self.assertTrue(self.players.remove("U1"))
+        self.assertFalse(self.players.remove("U1"))
+        self.assertIsNone(self.players.get_by_id("U1"))
+        self.assertIsNone(self.players.name_exists("user1"))
+
+    def test_returned_player_is_a_copy(self):
+        self.players.add(Player("U1", "user1"))
+
+        self.players.get_by_id("U1").points = 42
+
+        self.assertEqual(self.players.get_by_id("U1").points, 0)
+
+    def test_points_updates_are_ranked(self):
+        for index in range(4):
+            self.players.add(Player("U" + str(index), "user" + str(index)))
+        self.players.update_points("U2", 5)
+        self.players.update_points("U1", 5)
+        self.players.update_points("U3", -5)
+
+        self.assertEqual([player.player_id for player in self.players.scores()], ["U1", "U2", "U0", "U3"])
+        self.assertEqual([player.player_id for player in self.players.scores(2, 1)], ["U2", "U0"])
+        self.assertEqual(self.players.place_of(0), 2)
+        self.assertEqual(self.players.count(), 4)
+
+        self.players.reset_points(0)
+        self.assertEqual([player.points for player in self.players.scores()], [0, 0, 0, 0])
+
+    def test_pick_random_user_picks_a_player(self):
+        self.assertIsNone(self.players.pick_random_user())
+        self.players.add(Player("U1", "user1"))
+
+        self.assertEqual(self.players.pick_random_user().player_id, "U1")
+
+    def test_tasks_are_inserted_listed_and_removed(self):
+        first = self.tasks.insert(Task("first", 3, 200.0))
+        second = self.tasks.insert(Task("second", 5, 100.0))
+
+        self.assertEqual(self.tasks.get(first).description, "first")
+        self.assertEqual(self.tasks.get(first).timestamp, 200.0)
+        self.assertEqual([task.uid for task in self.tasks.pending()], [first, second])
+        self.assertEqual([task.uid for task in self.tasks.oldest(1)], [second])
+        self.assertEqual([task.uid for task in self.tasks.inserted_before(150.0)], [second])
+        self.assertEqual(self.tasks.count(), 2)
+
+        self.tasks.remove(first)
+        self.assertIsNone(self.tasks.get(first))
+        self.assertEqual(self.tasks.validate_task(str(first)), (None, "this task does not exist."))
+        self.assertEqual(self.tasks.count(), 1)
+
+    def test_assignments_are_listed_with_tasks(self):
+        self.players.add(Player("U1", "user1"))
+        first = self.tasks.insert(Task("first"))
+        second = self.tasks.insert(Task("second"))
+
+        self.assertTrue(self.assignments.assign(second, "U1"))
+        self.assertFalse(self.assignments.assign(second, "U1"))
+
+        pending = self.tasks.pending_with_assignees()
+        self.assertEqual([(task.uid, name) for task, name in pending], [(first, None), (second, "user1")])
+        self.assertEqual([task.uid for task, name in self.tasks.pending_with_assignees(1, 1)], [second])
+        self.assertEqual([task.uid for task in self.tasks.unassigned()], [first])
+
+    def test_tasks_assigned_to_a_player_are_listed(self):
+        first = self.tasks.insert(Task("first", 1, 2.0))
+        second = self.tasks.insert(Task("second", 1, 1.0))
+        third = self.tasks.insert(Task("third"))
+        self.assignments.assign(first, "U1")
+        self.assignments.assign(second, "U1")
+        self.assignments.assign(third, "U2")
+
+        self.assertEqual([task.uid for task in self.tasks.assigned_to("U1")], [second, first])
+        self.assertEqual(self.tasks.assigned_to("U3"), [])
+
+    def test_remove_all_of_removes_assignments_of_player(self):
+        self.assignments.assign(1, "U1")
+        self.assignments.assign(2, "U1")
+        self.assignments.assign(3, "U2")
+
+        self.assertEqual(self.assignments.remove_all_of("U1"), 2)
+        self.assertEqual(self.assignments.list(), {3: "U2"})
+        self.assertIsNone(self.assignments.user_of_task(1))
+
+    def test_buckets_sum_points_of_the_window(self):
+        self.players.add(Player("U1", "user1"))
+        self.players.add(Player("U2", "user2"))
+        today = date.today().toordinal()
+        self.storage.buckets.add("U1", 3)
+        self.storage.buckets.add("U2", 5)
+        self.storage.buckets.add("U1", 4)
+
+        scores = self.storage.buckets.scores_since(today)
+        self.assertEqual([(player.player_id, player.points) for player in scores], [("U1", 7), ("U2", 5)])
+        self.assertEqual(self.storage.buckets.scores_since(today + 1), [])
+
+        with self.assertRaises(ValueError):
+            with self.storage.unit_of_work():
+                self.storage.buckets.add("U2", 5)
+                self.storage.buckets.remove_all_of("U1")
+                raise ValueError("Provoked error")
+
+        scores = self.storage.buckets.scores_since(today)
+        self.assertEqual([(player.player_id, player.points) for player in scores], [("U1", 7), ("U2", 5)])
+
+    def test_buckets_are_cleared(self):
+        self.players.add(Player("U1", "user1"))
+        today = date.today().toordinal()
+        self.storage.buckets.add("U1", 3)
+
+        with self.assertRaises(ValueError):
+            with self.storage.unit_of_work():
+                self.storage.buckets.clear()
+                raise ValueError("Provoked error")
+        self.assertEqual(len(self.storage.buckets.scores_since(today)), 1)
+
+        self.storage.buckets.clear()
+        self.assertEqual(self.storage.buckets.scores_since(today), [])
+
+    def test_unit_of_work_undoes_writes_when_it_raises(self):
+        rollbacks = []
+        self.storage.add_rollback_listener(lambda: rollbacks.append(True))
+        self.players.add(Player("U1", "user1"))
+        task_id = self.tasks.insert(Task("task", 3))
+
+        with self.assertRaises(ValueError):
+            with self.storage.unit_of_work():
+                self.assignments.assign(task_id, "U1")
+                self.players.update_points("U1", 3)
+                self.tasks.remove(task_id)
+                self.players.remove("U1")
+                raise ValueError("Provoked error")
+
+        self.players.invalidate()
+        self.assertEqual(self.players.get_by_id("U1").points, 0)
+        self.assertEqual(self.tasks.get(task_id).description, "task")
+        self.assertIsNone(self.assignments.user_of_task(task_id))
+        self.assertEqual(len(rollbacks), 1)
+
+    def test_game_plays_on_the_storage(self):
+        game = Game(None, storage=self.storage)
+        game.join("U1", "user1")
+        game.add_task("U1", "3 task")
+        game.take_task("U1", "1")
+
+        self.assertTrue("*user1* (<@U1>) with *3* point(s)" in game.list_high_scores()[1])
+        self.assertTrue(":point_right: *user1*" in game.list_tasks()[1])
+
+
+class TestSqliteStorage(StorageContract, TestCase):
+
+    def create_storage(self):
+        return SqliteStorage(None, threading.RLock(), sqlite3.connect(":memory:"))
+
+
+class TestMemoryStorage(StorageContract, TestCase):
+
+    def create_storage(self):
+        return MemoryStorage()
+
+    def test_memory_storage_reads_without_snapshots(self):
+        self.assertFalse(self.storage.has_snapshots())
+        with self.storage.snapshot() as (tasks, players, buckets):
+            self.assertIs(tasks, self.tasks)
+            self.assertIs(players, self.players)
+
+
+class TestSharedSqliteStorage(TestCase):
+    """
+    Two games on the same database file, as two bot processes behind a load balancer.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        path = os.path.join(self.directory, "shared.db")
+        self.first = Game(MockConf([], cache_size=16, shared=True), sqlite3.connect(path))
+        self.second = Game(MockConf([], cache_size=16, shared=True), sqlite3.connect(path))
+
+    def tearDown(self):
+        self.first.close()
+        self.second.close()
+        shutil.rmtree(self.directory)
+
+    @staticmethod
+    def run_command(game, command, *args):
+        with game.lock:
+            return command(*args)
+
+    def test_players_of_another_process_are_read_after_refresh(self):
+        self.assertFalse(self.run_command(self.second, self.second.take_task, "U1", "1")[0])  # Cached as unknown
+        self.run_command(self.first, self.first.join, "U1", "user1")
+        self.run_command(self.first, self.first.add_task, "U1", "3 task")
+
+        self.assertTrue(self.run_command(self.second, self.second.take_task, "U1", "1")[0])
+
+    def test_points_earned_in_another_process_are_not_lost(self):
+        self.run_command(self.first, self.first.join, "U1", "user1")
+        self.run_command(self.first, self.first.add_task, "U1", "3 task")
+        self.run_command(self.first, self.first.add_task, "U1", "5 other")
+        self.run_command(self.second, self.second.list_high_scores, "U1")  # Cached by the second process
+
+        self.run_command(self.second, self.second.take_task, "U1", "1")
+        self.run_command(self.first, self.first.take_task, "U1", "2")
+
+        out = self.run_command(self.second, self.second.list_high_scores, "U1")[1]
+        self.assertTrue("*user1* (<@U1>) with *8* point(s)" in out)
+        self.assertEqual(self.first.events.recover()["U1"], 8)
+
+    def test_own_writes_do_not_drop_the_state(self):
+        self.run_command(self.first, self.first.join, "U1", "user1")
+
+        with self.first.unit_of_work():
+            self.assertFalse(self.first.storage.refresh())
+
+    def test_storage_is_not_shared_by_default(self):
+        game = Game(MockConf([]), sqlite3.connect(":memory:"))
+        try:
+            self.assertFalse(game.storage.is_shared())
+        finally:
+            game.close()
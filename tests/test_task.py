@@ -1,9 +1,13 @@
 # coding=utf-8
 
 import sqlite3
+import time
 from unittest import TestCase
 
+from game.assignment import AssignmentRepository
+from game.player import PlayerRepository, Player
 from game.task import TaskRepository, Task
+from tests.helpers import query_plan
 
 
 class TestTaskRepository(TestCase):
@@ -29,7 +33,97 @@ class TestTaskRepository(TestCase):
         self.assertEquals(task.description, "Hello world")
         self.assertEquals(task.points, 3)
         self.assertEquals(task.uid, 1)
-        self.assertTrue(float(task.timestamp) > 0.0)
+        self.assertTrue(task.timestamp > 0.0)
+
+    def test_insert_keeps_timestamp_as_number(self):
+        task = Task("Hello world", 3, 1500000000.25)
+        task_id = self.tasks.insert(task)
+
+        self.assertEquals(self.tasks.get(task_id).timestamp, 1500000000.25)
+
+    def test_oldest_returns_tasks_by_insertion_time(self):
+        self.tasks.insert(Task("recent", 1, 300.0))
+        self.tasks.insert(Task("oldest", 1, 100.0))
+        self.tasks.insert(Task("old", 1, 200.0))
+
+        oldest = self.tasks.oldest(2)
+
+        self.assertEquals([task.description for task in oldest], ["oldest", "old"])
+
+    def test_inserted_before_returns_older_tasks_only(self):
+        self.tasks.insert(Task("recent", 1, 300.0))
+        self.tasks.insert(Task("oldest", 1, 100.0))
+
+        self.assertEquals([task.description for task in self.tasks.inserted_before(200.0)], ["oldest"])
+
+    def test_older_than_returns_tasks_inserted_seconds_ago(self):
+        self.tasks.insert(Task("recent"))
+        self.tasks.insert(Task("old", 1, time.time() - 3600))
+
+        self.assertEquals([task.description for task in self.tasks.older_than(60)], ["old"])
+
+    def test_age_queries_scan_inserted_index(self):
+        for query in ["SELECT * FROM TASK ORDER BY inserted LIMIT 10",
+                      "SELECT * FROM TASK WHERE inserted < 1.0 ORDER BY inserted"]:
+            plan = query_plan(self.con, query)
+
+            self.assertTrue("USING INDEX TASK_INSERTED" in plan, plan)
+            self.assertFalse("TEMP B-TREE" in plan, plan)
+
+    def test_tasks_of_a_player_are_found_with_assignment_index(self):
+        assignments = AssignmentRepository(self.con)
+        first = self.tasks.insert(Task("first", 3, 1.0))
+        second = self.tasks.insert(Task("second", 5, 2.0))
+        assignments.assign(second, "U1")
+        assignments.assign(first, "U2")
+
+        self.assertEqual([task.uid for task in self.tasks.assigned_to("U1")], [second])
+        plan = query_plan(self.con, "SELECT TASK.id FROM ASSIGNMENT JOIN TASK ON TASK.id = ASSIGNMENT.task_id "
+                                    "WHERE ASSIGNMENT.player_id=?", ("U1",))
+        self.assertTrue("USING INDEX ASSIGNMENT_PLAYER_ID" in plan, plan)
+
+    def test_upgrade_from_2_to_3_converts_text_timestamps(self):
+        cursor = self.con.cursor()
+        cursor.execute("DROP TABLE TASK")
+        cursor.execute("CREATE TABLE TASK (id INTEGER PRIMARY KEY ASC NOT NULL, inserted TEXT NOT NULL, "
+                       "points INTEGER NOT NULL, description TEXT NOT NULL)")
+        cursor.execute("INSERT INTO TASK(id, inserted, points, description) VALUES (7, '1500000000.5', 3, 'old')")
+        self.con.commit()
+
+        TaskRepository.upgrade_from_2_to_3(self.con)
+
+        cursor.execute("SELECT typeof(inserted) FROM TASK")
+        self.assertEquals(cursor.fetchone()[0], "real")
+        task = self.tasks.get(7)
+        self.assertEquals(task.timestamp, 1500000000.5)
+        self.assertEquals(task.description, "old")
+        self.assertTrue("USING INDEX TASK_INSERTED" in query_plan(self.con, "SELECT * FROM TASK ORDER BY inserted"))
+
+    def test_text_timestamps_are_converted_when_repository_is_opened(self):
+        con = sqlite3.connect(":memory:")
+        con.execute("CREATE TABLE TASK (id INTEGER PRIMARY KEY ASC NOT NULL, inserted TEXT NOT NULL, "
+                    "points INTEGER NOT NULL, description TEXT NOT NULL)")
+        con.execute("INSERT INTO TASK(id, inserted, points, description) VALUES (7, '150.5', 3, 'old')")
+        con.commit()
+
+        tasks = TaskRepository(con)
+
+        self.assertEquals(tasks.get(7).deadline(10), 160.5)
+        self.assertEquals([task.uid for task in tasks.inserted_before(200.0)], [7])
+        self.assertTrue("USING INDEX TASK_INSERTED" in query_plan(con, "SELECT * FROM TASK ORDER BY inserted"))
+        con.close()
+
+    def test_upgrade_from_2_to_3_does_nothing_when_already_numeric(self):
+        task_id = self.tasks.insert(Task("Hello world", 3, 10.0))
+
+        TaskRepository.upgrade_from_2_to_3(self.con)
+
+        self.assertEquals(self.tasks.get(task_id).timestamp, 10.0)
+
+    def test_upgrade_from_2_to_3_does_not_throw_if_task_table_not_here(self):
+        self.con.execute("DROP TABLE TASK")
+
+        TaskRepository.upgrade_from_2_to_3(self.con)
 
     def test_get_unknown_task_returns_none(self):
         self.tasks.insert(Task("Hello world", 3))
@@ -49,6 +143,24 @@ class TestTaskRepository(TestCase):
         self.assertEquals(tasks_pending[1].description, "Task2")
         self.assertEquals(tasks_pending[1].uid, task_id_2)
 
+    def test_pending_with_assignees_returns_tasks_and_assignee_names(self):
+        players = PlayerRepository(self.con)
+        assignments = AssignmentRepository(self.con)
+        players.add(Player("U1", "user1"))
+        task_id_1 = self.tasks.insert(Task("Task1", 3))
+        task_id_2 = self.tasks.insert(Task("Task2", 9))
+        assignments.assign(task_id_2, "U1")
+
+        pending = self.tasks.pending_with_assignees()
+
+        self.assertEquals(len(pending), 2)
+        self.assertEquals(pending[0][0].uid, task_id_1)
+        self.assertEquals(pending[0][0].description, "Task1")
+        self.assertIsNone(pending[0][1])
+        self.assertEquals(pending[1][0].uid, task_id_2)
+        self.assertEquals(pending[1][0].points, 9)
+        self.assertEquals(pending[1][1], "user1")
+
     def test_remove_unknown_task_does_nothing(self):
         self.tasks.insert(Task("Task1", 3))
 
@@ -0,0 +1,39 @@
+# coding=utf-8
+import sqlite3
+import threading
+from unittest import TestCase
+
+from game.timing import QueryTimer, TimedConnection
+
+
+class TestTimedConnection(TestCase):
+
+    def setUp(self):
+        self.timer = QueryTimer()
+        self.con = TimedConnection(sqlite3.connect(":memory:"), self.timer)
+
+    def tearDown(self):
+        self.con.close()
+
+    def test_statements_fetches_and_commits_are_timed(self):
+        cursor = self.con.cursor()
+        cursor.execute("CREATE TABLE T (id INTEGER)")
+        cursor.executemany("INSERT INTO T(id) VALUES (?)", [(index,) for index in range(10)])
+        self.con.commit()
+        cursor.execute("SELECT COUNT(*) FROM T")
+
+        self.assertEqual(cursor.fetchone()[0], 10)
+        self.assertEqual(cursor.rowcount, -1)
+        self.assertTrue(self.timer.take() > 0)
+        self.assertEqual(self.timer.take(), 0.0)
+
+    def test_time_is_accumulated_per_thread(self):
+        self.timer.add(1.0)
+        elapsed = []
+
+        thread = threading.Thread(target=lambda: elapsed.append(self.timer.take()))
+        thread.start()
+        thread.join()
+
+        self.assertEqual(elapsed, [0.0])
+        self.assertEqual(self.timer.take(), 1.0)
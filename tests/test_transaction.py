@@ -0,0 +1,73 @@
+# coding=utf-8
+import os
+import shutil
+import sqlite3
+import tempfile
+from unittest import TestCase
+
+from game.transaction import TransactionalConnection
+
+
+class TestTransactionalConnection(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "test.db")
+        self.con = TransactionalConnection(sqlite3.connect(self.path))
+        self.con.cursor().execute("CREATE TABLE T (value INTEGER)")
+        self.con.commit()
+        self.other = sqlite3.connect(self.path)
+
+    def tearDown(self):
+        self.other.close()
+        self.con.close()
+        shutil.rmtree(self.directory)
+
+    def insert(self, value):
+        self.con.cursor().execute("INSERT INTO T(value) VALUES (?)", (value,))
+        self.con.commit()
+
+    def committed_count(self):
+        return self.other.execute("SELECT COUNT(*) FROM T").fetchone()[0]
+
+    def test_commit_outside_unit_of_work_is_forwarded(self):
+        self.insert(1)
+
+        self.assertEqual(self.committed_count(), 1)
+
+    def test_commits_inside_unit_of_work_are_deferred_to_its_end(self):
+        with self.con.unit_of_work():
+            self.insert(1)
+            self.insert(2)
+            self.assertEqual(self.committed_count(), 0)
+
+        self.assertEqual(self.committed_count(), 2)
+
+    def test_unit_of_work_is_rolled_back_on_error(self):
+        with self.assertRaises(ValueError):
+            with self.con.unit_of_work():
+                self.insert(1)
+                raise ValueError("Provoked error")
+
+        self.assertFalse(self.con.in_transaction)
+        self.assertEqual(self.con.execute("SELECT COUNT(*) FROM T").fetchone()[0], 0)
+
+    def test_nested_unit_of_work_is_merged_into_outer_one(self):
+        with self.con.unit_of_work():
+            with self.con.unit_of_work():
+                self.insert(1)
+            self.assertEqual(self.committed_count(), 0)
+
+        self.assertEqual(self.committed_count(), 1)
+
+    def test_unit_of_work_uses_savepoint_when_transaction_is_open(self):
+        self.con.cursor().execute("INSERT INTO T(value) VALUES (1)")
+
+        with self.assertRaises(ValueError):
+            with self.con.unit_of_work():
+                self.insert(2)
+                raise ValueError("Provoked error")
+
+        self.assertTrue(self.con.in_transaction)
+        self.con.commit()
+        self.assertEqual(self.other.execute("SELECT value FROM T").fetchall(), [(1,)])
@@ -1,6 +1,9 @@
 import sqlite3
 from unittest import TestCase
 
+from game.assignment import AssignmentRepository
+from game.events import EventLog
+from game.player import PlayerRepository
 from game.upgrade import Upgrade
 
 CURRENT_VERSION = "0.7"
@@ -65,8 +68,48 @@ class TestUpgrade(TestCase):
         self.assertTrue(self.called_1)
         self.assertTrue(self.called_2)
 
+    def test_perform_upgrade_only_runs_procedures_after_previous_version(self):
+        self.upgrade = Upgrade(self.con, [self.upgrade_call_1, self.upgrade_call_2])
+        self.upgrade.select_or_insert_version("1.0")
+        self.upgrade.detect_initial_state("2.0")
+
+        (status, msg) = self.upgrade.perform_upgrade("2.0")
+
+        self.assertTrue(status)
+        self.assertFalse(self.called_1)
+        self.assertTrue(self.called_2)
+
+    def test_upgrade_from_1_to_2_indexes_existing_tables(self):
+        cursor = self.con.cursor()
+        cursor.execute("CREATE TABLE PLAYER (id TEXT PRIMARY KEY NOT NULL, name TEXT NOT NULL UNIQUE, "
+                       "points INTEGER NOT NULL)")
+        cursor.execute("CREATE TABLE ASSIGNMENT (task_id INTEGER NOT NULL UNIQUE, player_id TEXT NOT NULL, "
+                       "UNIQUE(task_id, player_id))")
+
+        self.upgrade.upgrade_from_1_to_2()
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='index' AND sql IS NOT NULL ORDER BY name")
+        self.assertEquals([row[0] for row in cursor.fetchall()],
+                          ["ASSIGNMENT_PLAYER_ID", "PLAYER_NAME_NOCASE", "PLAYER_POINTS"])
+
+    def test_upgrade_from_1_to_2_does_not_throw_without_tables(self):
+        self.upgrade.upgrade_from_1_to_2()
+
+        # Tables created afterwards by the repositories get their indexes
+        PlayerRepository(self.con)
+        AssignmentRepository(self.con)
+
     def upgrade_call_1(self):
         self.called_1 = True
 
     def upgrade_call_2(self):
         self.called_2 = True
+
+    def test_upgrade_from_3_to_4_saves_existing_scores_as_baseline(self):
+        cursor = self.con.cursor()
+        cursor.execute("CREATE TABLE PLAYER (id TEXT PRIMARY KEY NOT NULL, name TEXT, points INTEGER)")
+        cursor.execute("INSERT INTO PLAYER(id, name, points) VALUES ('U1', 'user1', 7)")
+
+        self.upgrade.upgrade_from_3_to_4()
+
+        self.assertEqual(EventLog(self.con).recover(), {"U1": 7})
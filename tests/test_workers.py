@@ -0,0 +1,116 @@
+# coding=utf-8
+import threading
+import time
+from builtins import range
+from unittest import TestCase
+
+from bot.workers import ChannelWorkerPool
+
+WAIT_TIMEOUT = 5
+
+
+class TestChannelWorkerPool(TestCase):
+
+    def setUp(self):
+        self.pool = ChannelWorkerPool(workers=2, queue_depth=4, channel_queue_depth=2, timeout=0.05)
+        self.executed = []
+        self.release = threading.Event()
+        self.started = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        self.pool.shutdown()
+
+    def record(self, channel, value):
+        self.executed.append((channel, value))
+
+    def block(self):
+        self.started.set()
+        self.release.wait(WAIT_TIMEOUT)
+
+    def test_init_without_worker_throws_ValueError(self):
+        with self.assertRaises(ValueError):
+            ChannelWorkerPool(workers=0)
+
+    def test_submit_executes_functions_of_a_channel_in_order(self):
+        pool = ChannelWorkerPool(workers=4)
+        for index in range(50):
+            pool.submit("C1", self.record, "C1", index)
+        pool.shutdown()
+
+        self.assertEqual(self.executed, [("C1", index) for index in range(50)])
+
+    def test_submit_executes_other_channels_while_one_is_blocked(self):
+        self.pool.submit("C1", self.block)
+        self.started.wait(WAIT_TIMEOUT)
+        done = threading.Event()
+
+        self.pool.submit("C2", done.set)
+
+        self.assertTrue(done.wait(WAIT_TIMEOUT))
+
+    def test_submit_returns_false_when_channel_queue_is_full(self):
+        self.pool.submit("C1", self.block)
+        self.started.wait(WAIT_TIMEOUT)
+        self.pool.submit("C1", self.record, "C1", 1)
+        self.pool.submit("C1", self.record, "C1", 2)
+
+        status = self.pool.submit("C1", self.record, "C1", 3)
+
+        self.assertFalse(status)
+        self.assertTrue(self.pool.submit("C2", self.record, "C2", 1))
+        self.assertEqual(self.pool.metrics.snapshot()["rejected"], 1)
+
+    def test_submit_returns_false_when_pool_is_full(self):
+        self.pool.submit("C1", self.block)
+        self.pool.submit("C2", self.block)
+        for channel in ["C1", "C1", "C2", "C2"]:
+            self.pool.submit(channel, self.record, channel, 0)
+
+        status = self.pool.submit("C3", self.record, "C3", 0)
+
+        self.assertFalse(status)
+
+    def test_submit_blocks_until_a_slot_is_freed(self):
+        pool = ChannelWorkerPool(workers=1, queue_depth=1, channel_queue_depth=1)
+        pool.submit("C1", self.block)
+        self.started.wait(WAIT_TIMEOUT)
+        pool.submit("C1", self.record, "C1", 1)
+        threading.Timer(0.05, self.release.set).start()
+
+        status = pool.submit("C1", self.record, "C1", 2)
+        pool.shutdown()
+
+        self.assertTrue(status)
+        self.assertEqual(self.executed, [("C1", 1), ("C1", 2)])
+
+    def test_submit_after_shutdown_throws_RuntimeError(self):
+        self.pool.shutdown()
+
+        with self.assertRaises(RuntimeError):
+            self.pool.submit("C1", self.record, "C1", 0)
+
+    def test_failing_function_does_not_stop_the_channel(self):
+        def failure():
+            raise ValueError("Provoked error")
+
+        self.pool.submit("C1", failure)
+        self.pool.submit("C1", self.record, "C1", 1)
+        self.pool.shutdown()
+
+        self.assertEqual(self.executed, [("C1", 1)])
+        self.assertEqual(self.pool.metrics.snapshot()["errors"], 1)
+
+    def test_metrics_record_queue_wait_time(self):
+        self.pool.submit("C1", self.block)
+        self.started.wait(WAIT_TIMEOUT)
+        self.pool.submit("C1", self.record, "C1", 1)
+        time.sleep(0.02)
+        self.release.set()
+        self.pool.shutdown()
+
+        metrics = self.pool.metrics.snapshot()
+        self.assertEqual(metrics["submitted"], 2)
+        self.assertEqual(metrics["executed"], 2)
+        self.assertTrue(metrics["max_wait"] >= 0.02)
+        self.assertTrue(0 < metrics["mean_wait"] <= metrics["max_wait"])